@@ -0,0 +1,74 @@
+"""Compare handler latency under a burst of updates: worker threads vs native async engine.
+
+Each simulated update runs what the /drink handler does against the service:
+ensure_user, record_glass, then the goal-notified check.
+
+Usage: python -m benchmarks.async_engine [--updates 300] [--users 100] [--rounds 3]
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from oazis.config import Settings
+from oazis.db.session import get_async_engine, get_engine, init_db
+from oazis.services.hydration import HydrationService
+
+
+async def _simulate_update(service: HydrationService, user_id: int) -> float:
+    started = time.perf_counter()
+    await service.ensure_user(user_id)
+    await service.record_glass(user_id)
+    await service.has_goal_been_notified(user_id)
+    return time.perf_counter() - started
+
+
+async def _run_mode(settings: Settings, use_async: bool, updates: int, users: int, rounds: int) -> list[float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        engine = get_engine(url, settings=settings)
+        init_db(engine)
+        async_engine = get_async_engine(url, settings=settings) if use_async else None
+        service = HydrationService(engine, settings, async_engine=async_engine)
+        for user_id in range(1, users + 1):
+            await service.ensure_user(user_id)
+
+        latencies: list[float] = []
+        for _ in range(rounds):
+            burst = [_simulate_update(service, i % users + 1) for i in range(updates)]
+            latencies.extend(await asyncio.gather(*burst))
+
+        if async_engine is not None:
+            await async_engine.dispose()
+        engine.dispose()
+    return latencies
+
+
+def _report(label: str, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p50 = statistics.median(ordered) * 1000
+    p95 = ordered[int(len(ordered) * 0.95)] * 1000
+    p99 = ordered[int(len(ordered) * 0.99)] * 1000
+    print(f"{label:<8} p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   p99 {p99:7.1f} ms   max {ordered[-1] * 1000:7.1f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=300, help="Concurrent updates per burst.")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    logger.remove()
+    settings = Settings(TELEGRAM_BOT_TOKEN="benchmark", _env_file=None)
+    for label, use_async in (("threads", False), ("async", True)):
+        _report(label, await _run_mode(settings, use_async, args.updates, args.users, args.rounds))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
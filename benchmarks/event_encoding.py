@@ -0,0 +1,100 @@
+"""Report the on-disk size of the event timeline before and after the compact encoding.
+
+Seeds a database with the legacy string-encoded hydrationevent table, runs the same
+init_db + batched migration the bot runs at startup, and compares VACUUMed sizes.
+
+Usage: python -m benchmarks.event_encoding [--users 2000] [--events 500000]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from loguru import logger
+from sqlalchemy import text
+
+from oazis.db.migrations import migrate_legacy_events
+from oazis.db.session import get_engine, init_db
+
+_LEGACY_NOTES = {
+    "glass_logged": "250ml",
+    "reminders_paused": "paused_until_end_of_day",
+    "reminders_resumed": "resumed_until_end_of_day",
+    "goal_notified": "daily goal reached",
+}
+
+
+def _seed_legacy(engine, users: int, events: int) -> None:
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE hydrationevent (id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER NOT NULL, "
+                "timestamp DATETIME NOT NULL, event_type VARCHAR NOT NULL, notes VARCHAR)"
+            )
+        )
+        connection.execute(
+            text("CREATE INDEX ix_hydrationevent_user_type_ts ON hydrationevent (user_id, event_type, timestamp)")
+        )
+        start = datetime(2025, 1, 1)
+        kinds = ["glass_logged"] * 8 + ["reminders_paused", "reminders_resumed", "goal_notified"]
+        batch = []
+        for i in range(events):
+            kind = random.choice(kinds)
+            batch.append(
+                {
+                    "u": random.randint(1, users),
+                    "t": (start + timedelta(seconds=i * 37)).isoformat(sep=" ", timespec="microseconds"),
+                    "e": kind,
+                    "n": _LEGACY_NOTES[kind],
+                }
+            )
+            if len(batch) == 10_000:
+                connection.execute(
+                    text("INSERT INTO hydrationevent (user_id, timestamp, event_type, notes) VALUES (:u, :t, :e, :n)"),
+                    batch,
+                )
+                batch.clear()
+        if batch:
+            connection.execute(
+                text("INSERT INTO hydrationevent (user_id, timestamp, event_type, notes) VALUES (:u, :t, :e, :n)"),
+                batch,
+            )
+
+
+def _vacuumed_size(engine, path: Path) -> int:
+    with engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+    return path.stat().st_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=500_000)
+    args = parser.parse_args()
+
+    logger.remove()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "events.db"
+        engine = get_engine(f"sqlite:///{path}")
+        _seed_legacy(engine, args.users, args.events)
+        before = _vacuumed_size(engine, path)
+
+        init_db(engine)
+        started = time.perf_counter()
+        moved = migrate_legacy_events(engine, pause_seconds=0)
+        elapsed = time.perf_counter() - started
+        after = _vacuumed_size(engine, path)
+        engine.dispose()
+
+    print(f"events migrated   {moved:>12,}  in {elapsed:.1f}s ({moved / elapsed:,.0f} rows/s)")
+    print(f"legacy encoding   {before / 1024 / 1024:>10.1f} MiB  ({before / moved:.0f} B/event incl. index)")
+    print(f"compact encoding  {after / 1024 / 1024:>10.1f} MiB  ({after / moved:.0f} B/event incl. index)")
+    print(f"reduction         {100 * (1 - after / before):>10.1f} %")
+
+
+if __name__ == "__main__":
+    main()
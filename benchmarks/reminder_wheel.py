@@ -0,0 +1,182 @@
+"""Compare the memory and tick cost of per-user APScheduler jobs with the timing wheel.
+
+Each simulated user gets a reminder profile drawn from the choices offered by the bot
+keyboards. The jobs mode registers one IntervalTrigger job per user in a memory job
+store; the wheel mode schedules the same users in a TimingWheel and then replays one
+day of minute ticks, re-arming each popped user on its grid. The groups mode attaches
+users to shared ProfileSchedules, as ReminderScheduler does, and replays the same day
+with one wheel entry per group.
+
+Usage: python -m benchmarks.reminder_wheel [--users 10000 100000 1000000] [--jobs-limit 100000]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+import oazis.bot  # noqa: F401 - import order used by main.py; oazis.scheduler imports back into oazis.bot
+from oazis.scheduler.profiles import ProfileSchedule, ReminderProfile
+from oazis.scheduler.wheel import TimingWheel, epoch_minute, minute_to_datetime
+
+_WINDOWS = [(8, 20), (9, 21), (7, 22), (10, 18)]
+_INTERVALS = [30, 60, 90, 120, 180]
+_TIMEZONES = ["Europe/Paris", "Europe/London", "America/Montreal", "Africa/Casablanca"]
+
+
+def _profiles(users: int) -> list[ReminderProfile]:
+    pool: dict[ReminderProfile, ReminderProfile] = {}
+    rng = random.Random(users)
+    result = []
+    for _ in range(users):
+        start, end = rng.choice(_WINDOWS)
+        profile = ReminderProfile(start, end, rng.choice(_INTERVALS), rng.choice(_TIMEZONES))
+        result.append(pool.setdefault(profile, profile))
+    return result
+
+
+async def _noop(*args) -> None:
+    return None
+
+
+def _measure_jobs(profiles: list[ReminderProfile], now: datetime) -> tuple[float, float]:
+    scheduler = AsyncIOScheduler(timezone="UTC")
+    tracemalloc.start()
+    started = time.perf_counter()
+    for user_id, profile in enumerate(profiles):
+        scheduler.add_job(
+            _noop,
+            trigger=IntervalTrigger(
+                minutes=profile.interval_minutes,
+                start_date=profile.next_run(now.astimezone(ZoneInfo(profile.timezone))),
+                timezone=ZoneInfo(profile.timezone),
+            ),
+            args=[None, None, None, user_id],
+            id=f"hydration_reminder_user_{user_id}",
+            replace_existing=True,
+        )
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 2**20, elapsed
+
+
+def _measure_wheel(profiles: list[ReminderProfile], now: datetime) -> dict[str, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    wheel = TimingWheel()
+    for user_id, profile in enumerate(profiles):
+        wheel.schedule(user_id, epoch_minute(profile.next_run(now.astimezone(ZoneInfo(profile.timezone)))))
+    schedule_seconds = time.perf_counter() - started
+    memory_mib = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+
+    first_minute = epoch_minute(now)
+    busiest = 0
+    fired = 0
+    tick_seconds = 0.0
+    worst_tick = 0.0
+    for minute in range(first_minute, first_minute + 24 * 60):
+        tick_started = time.perf_counter()
+        for due_minute, user_ids in wheel.pop_due(minute):
+            after = minute_to_datetime(due_minute) + timedelta(minutes=1)
+            for user_id in user_ids:
+                profile = profiles[user_id]
+                next_run = profile.next_run(after.astimezone(ZoneInfo(profile.timezone)))
+                wheel.schedule(user_id, epoch_minute(next_run))
+            busiest = max(busiest, len(user_ids))
+            fired += len(user_ids)
+        tick = time.perf_counter() - tick_started
+        tick_seconds += tick
+        worst_tick = max(worst_tick, tick)
+
+    return {
+        "memory_mib": memory_mib,
+        "schedule_s": schedule_seconds,
+        "fired": fired,
+        "busiest": busiest,
+        "rearm_us": tick_seconds / max(fired, 1) * 1e6,
+        "worst_tick_s": worst_tick,
+    }
+
+
+def _measure_groups(profiles: list[ReminderProfile], now: datetime) -> dict[str, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    groups: dict[ReminderProfile, ProfileSchedule] = {}
+    membership: dict[int, ProfileSchedule] = {}
+    wheel = TimingWheel()
+    for user_id, profile in enumerate(profiles):
+        group = groups.get(profile)
+        if group is None:
+            group = groups[profile] = ProfileSchedule(profile)
+            wheel.schedule(profile, epoch_minute(group.next_fire(now)))
+        group.members.add(user_id)
+        membership[user_id] = group
+    schedule_seconds = time.perf_counter() - started
+    memory_mib = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+
+    first_minute = epoch_minute(now)
+    fired = 0
+    worst_tick = 0.0
+    tick_seconds = 0.0
+    for minute in range(first_minute, first_minute + 24 * 60):
+        tick_started = time.perf_counter()
+        for due_minute, keys in wheel.pop_due(minute):
+            after = minute_to_datetime(due_minute) + timedelta(minutes=1)
+            user_ids = []
+            for key in keys:
+                group = groups[key]
+                wheel.schedule(key, epoch_minute(group.next_fire(after)))
+                user_ids.extend(group.members)
+            fired += len(user_ids)
+        tick = time.perf_counter() - tick_started
+        tick_seconds += tick
+        worst_tick = max(worst_tick, tick)
+
+    return {
+        "memory_mib": memory_mib,
+        "schedule_s": schedule_seconds,
+        "groups": len(groups),
+        "fired": fired,
+        "rearm_us": tick_seconds / max(fired, 1) * 1e6,
+        "worst_tick_s": worst_tick,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--jobs-limit", type=int, default=100_000, help="Skip the jobs mode above this many users.")
+    args = parser.parse_args()
+
+    now = datetime.now(ZoneInfo("UTC")).replace(hour=0, minute=0, second=0, microsecond=0)
+    for users in args.users:
+        profiles = _profiles(users)
+        if users <= args.jobs_limit:
+            jobs_mib, jobs_s = _measure_jobs(profiles, now)
+            jobs = f"jobs: {jobs_mib:8.1f} MiB, scheduled in {jobs_s:6.2f}s"
+        else:
+            jobs = "jobs: skipped"
+        wheel = _measure_wheel(profiles, now)
+        print(
+            f"{users:>9} users | {jobs} | wheel: {wheel['memory_mib']:6.1f} MiB, scheduled in "
+            f"{wheel['schedule_s']:5.2f}s, {wheel['fired']} fires/day, busiest minute {wheel['busiest']}, "
+            f"{wheel['rearm_us']:.1f}us per fire, worst tick {wheel['worst_tick_s'] * 1000:.0f}ms"
+        )
+        grouped = _measure_groups(profiles, now)
+        print(
+            f"{'':>9}       | groups: {grouped['groups']} schedules, {grouped['memory_mib']:6.1f} MiB, scheduled in "
+            f"{grouped['schedule_s']:5.2f}s, {grouped['fired']} fires/day, "
+            f"{grouped['rearm_us']:.2f}us per fire, worst tick {grouped['worst_tick_s'] * 1000:.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
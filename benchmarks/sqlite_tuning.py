@@ -0,0 +1,68 @@
+"""Compare concurrent record_glass/get_stats throughput with and without the SQLite profile.
+
+Usage: python -m benchmarks.sqlite_tuning [--users 200] [--ops 4000] [--concurrency 64] [--write-ratio 0.5]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from oazis.config import Settings
+from oazis.db.session import get_engine, init_db
+from oazis.services.hydration import HydrationService
+
+
+async def _run_profile(settings: Settings, tuned: bool, users: int, ops: int, concurrency: int, write_ratio: float) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        engine = get_engine(url, settings=settings if tuned else None)
+        init_db(engine)
+        service = HydrationService(engine, settings)
+        for user_id in range(1, users + 1):
+            await service.record_glass(user_id)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: list[float] = []
+
+        async def one(i: int) -> None:
+            user_id = i % users + 1
+            async with semaphore:
+                started = time.perf_counter()
+                # Spread writes evenly: operation i writes when the running quota ticks over.
+                if int((i + 1) * write_ratio) > int(i * write_ratio):
+                    await service.record_glass(user_id)
+                else:
+                    await service.get_stats(user_id, days=30)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(ops)))
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    return ops / elapsed, p95
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--ops", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--write-ratio", type=float, default=0.5, help="Share of operations that log a glass.")
+    args = parser.parse_args()
+
+    logger.remove()
+    settings = Settings(TELEGRAM_BOT_TOKEN="benchmark", _env_file=None)
+    for label, tuned in (("default", False), ("tuned", True)):
+        throughput, p95 = await _run_profile(settings, tuned, args.users, args.ops, args.concurrency, args.write_ratio)
+        print(f"{label:<8} {throughput:8.0f} ops/s   p95 {p95:7.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
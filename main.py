@@ -2,13 +2,17 @@
 
 import asyncio
 import inspect
+import threading
 from pathlib import Path
 
 from loguru import logger
 
-from oazis.bot import create_bot, create_dispatcher
+from oazis.bot import OutboundSender, create_bot, create_dispatcher
+from oazis.bot.outbox import OutboxWorker
+from oazis.bot.webhook import run_webhook
 from oazis.config import get_settings
-from oazis.db.session import get_engine, init_db
+from oazis.db.migrations import has_legacy_events, migrate_legacy_events
+from oazis.db.session import get_async_engine, get_engine, init_db
 from oazis.logger import configure_logging
 from oazis.scheduler import ReminderScheduler, create_scheduler
 from oazis.services.hydration import HydrationService
@@ -24,35 +28,109 @@ def _ensure_sqlite_dir(database_url: str) -> None:
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
 
 
+def _log_send_stats(sender: OutboundSender) -> None:
+    logger.info("event=telegram_send_stats {stats}", stats=sender.stats())
+
+
+def _log_migration_result(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.opt(exception=task.exception()).error(
+            "event=legacy_events_migration_failed error={error}; it resumes on next start", error=task.exception()
+        )
+
+
 async def main() -> None:
     settings = get_settings()
     configure_logging(settings.debug)
     logger.info("Starting Oazis bot")
 
     _ensure_sqlite_dir(settings.database_url)
-    engine = get_engine(settings.database_url, echo=settings.debug)
+    engine = get_engine(settings.database_url, echo=settings.debug, settings=settings)
     init_db(engine)
     logger.info("Database initialized")
 
-    hydration_service = HydrationService(engine, settings)
+    migration_stop = threading.Event()
+    migration_task = None
+    if has_legacy_events(engine):
+        logger.info("Migrating legacy hydration events in the background")
+        migration_task = asyncio.create_task(
+            asyncio.to_thread(migrate_legacy_events, engine, stop=migration_stop)
+        )
+        migration_task.add_done_callback(_log_migration_result)
+
+    async_engine = None
+    if settings.database_async:
+        try:
+            async_engine = get_async_engine(settings.database_url, echo=settings.debug, settings=settings)
+            logger.info("Async database engine enabled")
+        except ImportError as exc:
+            logger.warning("Async database engine unavailable, using worker threads: {error}", error=exc)
+
+    hydration_service = HydrationService(engine, settings, async_engine=async_engine)
 
-    bot = create_bot(settings)
+    sender = OutboundSender.from_settings(settings)
+    bot = create_bot(settings, sender)
     await configure_bot_commands(bot)
     me = await bot.get_me()
     if me.username:
         logger.info("Start link: https://t.me/{username}?start=go", username=me.username)
     scheduler = create_scheduler(settings)
     reminder_scheduler = ReminderScheduler(scheduler, bot, hydration_service, settings)
-    await reminder_scheduler.schedule_for_all_users()
+    sender.on_chat_unreachable = reminder_scheduler.deactivate_user
+    if settings.scheduler_metrics_log_minutes:
+        scheduler.add_job(
+            _log_send_stats,
+            trigger="interval",
+            minutes=settings.scheduler_metrics_log_minutes,
+            args=[sender],
+            id="telegram_send_stats",
+        )
+    outbox_worker = None
+    if settings.outbox_enabled:
+        outbox_worker = OutboxWorker(bot, hydration_service, settings)
+        outbox_worker.start()
+        if settings.scheduler_metrics_log_minutes:
+            scheduler.add_job(
+                outbox_worker.log_stats,
+                trigger="interval",
+                minutes=settings.scheduler_metrics_log_minutes,
+                id="outbox_stats",
+            )
+        logger.info("Outbox worker started")
+    await reminder_scheduler.restore()
     scheduler.start()
     dispatcher = create_dispatcher(hydration_service, reminder_scheduler)
     logger.info("Scheduler started")
+    # Users without a persisted schedule, or everyone when the schedule settings changed.
+    backfill_task = asyncio.create_task(reminder_scheduler.reconcile())
 
     try:
-        await dispatcher.start_polling(bot)
+        if settings.bot_mode == "webhook":
+            await run_webhook(dispatcher, bot, settings)
+        else:
+            # getUpdates is refused while a webhook is set (e.g. after running in webhook mode).
+            await bot.delete_webhook()
+            await dispatcher.start_polling(bot)
     finally:
+        backfill_task.cancel()
+        # Let the backfill finish its in-flight page writes before the service and engines close.
+        await asyncio.gather(backfill_task, return_exceptions=True)
+        migration_stop.set()
+        if migration_task is not None:
+            # A failure was already logged by _log_migration_result; shutdown must go on.
+            await asyncio.gather(migration_task, return_exceptions=True)
         scheduler.shutdown(wait=False)
+        if outbox_worker is not None:
+            await outbox_worker.stop()
+            await outbox_worker.log_stats()
+        await hydration_service.close()
+        logger.info("event=user_cache_stats {stats}", stats=hydration_service.user_cache.stats())
+        logger.info("event=reminder_schedule_stats {stats}", stats=reminder_scheduler.stats())
+        reminder_scheduler.log_metrics()
+        _log_send_stats(sender)
         await bot.session.close()
+        if async_engine is not None:
+            await async_engine.dispose()
 
 
 if __name__ == "__main__":
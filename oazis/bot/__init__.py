@@ -9,21 +9,30 @@ from oazis.scheduler import ReminderScheduler
 from oazis.services.hydration import HydrationService
 
 from .handlers import build_router
+from .middlewares import ActivityMiddleware
+from .sender import OutboundSender
 
 
-def create_bot(settings: Settings) -> Bot:
-    """Instantiate aiogram Bot with common defaults."""
-    return Bot(
+def create_bot(settings: Settings, sender: OutboundSender | None = None) -> Bot:
+    """Instantiate aiogram Bot with common defaults.
+
+    Every request of the bot goes through `sender` (rate limits and retries),
+    built from the settings when not given.
+    """
+    bot = Bot(
         token=settings.telegram_bot_token.get_secret_value(),
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    bot.session.middleware(sender or OutboundSender.from_settings(settings))
+    return bot
 
 
 def create_dispatcher(service: HydrationService, reminder_scheduler: ReminderScheduler) -> Dispatcher:
     """Create a dispatcher and attach routers."""
     dispatcher = Dispatcher()
+    dispatcher.update.outer_middleware(ActivityMiddleware(service, reminder_scheduler))
     dispatcher.include_router(build_router(service, reminder_scheduler))
     return dispatcher
 
 
-__all__ = ["create_bot", "create_dispatcher"]
+__all__ = ["OutboundSender", "create_bot", "create_dispatcher"]
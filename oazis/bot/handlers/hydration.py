@@ -7,6 +7,7 @@ from loguru import logger
 
 from oazis.bot.formatting import format_progress
 from oazis.bot.keyboards import DRINK_CALLBACK_PREFIX, hydration_log_keyboard, reminder_actions_keyboard
+from oazis.db import OutboxMessage, OutboxPriority
 from oazis.scheduler import ReminderScheduler
 from oazis.services.hydration import HydrationService
 
@@ -37,6 +38,7 @@ def build_router(service: HydrationService, reminder_scheduler: ReminderSchedule
         )
         await _maybe_notify_goal(
             service,
+            reminder_scheduler,
             message.from_user.id,
             entry,
             hydration_log_keyboard,
@@ -77,6 +79,7 @@ def build_router(service: HydrationService, reminder_scheduler: ReminderSchedule
             await callback.message.answer(response_text, reply_markup=reminder_actions_keyboard(volume_ml))
             await _maybe_notify_goal(
                 service,
+                reminder_scheduler,
                 callback.from_user.id,
                 entry,
                 lambda: reminder_actions_keyboard(volume_ml),
@@ -104,6 +107,7 @@ def _extract_volume(callback_data: str) -> int | None:
 
 async def _maybe_notify_goal(
     service: HydrationService,
+    reminder_scheduler: ReminderScheduler,
     user_id: int,
     entry,
     keyboard_factory,
@@ -124,6 +128,7 @@ async def _maybe_notify_goal(
         return
 
     await service.record_goal_notified(user_id)
+    await reminder_scheduler.suspend_for_today(user_id)
     logger.info(
         "event=goal_notified user_id={user_id} chat_id={chat_id} chat_type={chat_type} source={source} consumed_ml={consumed_ml} goal_ml={goal_ml}",
         user_id=user_id,
@@ -133,10 +138,24 @@ async def _maybe_notify_goal(
         consumed_ml=consumed_ml,
         goal_ml=goal_ml,
     )
-    await send_func(
+    text = (
         "🎉 <b>Objectif du jour atteint</b>\n\n"
         f"Total du jour : <b>{format_progress(consumed_ml, goal_ml)}</b>.\n\n"
         "Les rappels sont coupés pour aujourd'hui.\n"
-        "Tu peux toujours enregistrer un verre si tu en prends un 👇",
-        reply_markup=keyboard_factory(),
+        "Tu peux toujours enregistrer un verre si tu en prends un 👇"
     )
+    if service.settings.outbox_enabled:
+        # Shares its dedupe key with the reminder slot's celebration: only one is sent.
+        await service.enqueue_messages(
+            [
+                {
+                    "chat_id": chat_id or user_id,
+                    "priority": OutboxPriority.INTERACTIVE,
+                    "text": text,
+                    "reply_markup": keyboard_factory().model_dump_json(exclude_none=True),
+                    "dedupe_key": OutboxMessage.goal_key(user_id, entry.date),
+                }
+            ]
+        )
+        return
+    await send_func(text, reply_markup=keyboard_factory())
@@ -185,6 +185,7 @@ def build_router(service: HydrationService, reminder_scheduler: ReminderSchedule
         if not callback.from_user or not callback.message:
             return
         await service.pause_reminders_today(callback.from_user.id)
+        await reminder_scheduler.suspend_for_today(callback.from_user.id)
         logger.info(
             "event=reminders_paused_today user_id={user_id} chat_id={chat_id} chat_type={chat_type} language={language} is_premium={is_premium}",
             user_id=callback.from_user.id,
@@ -205,6 +206,7 @@ def build_router(service: HydrationService, reminder_scheduler: ReminderSchedule
         if not callback.from_user or not callback.message:
             return
         await service.resume_reminders_today(callback.from_user.id)
+        await reminder_scheduler.resume_today(callback.from_user.id)
         logger.info(
             "event=reminders_resumed_today user_id={user_id} chat_id={chat_id} chat_type={chat_type} language={language} is_premium={is_premium}",
             user_id=callback.from_user.id,
@@ -0,0 +1,39 @@
+"""Dispatcher middlewares."""
+
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from oazis.scheduler import ActivityTier, ReminderScheduler
+from oazis.services.hydration import HydrationService
+
+
+class ActivityMiddleware(BaseMiddleware):
+    """Track user activity on every update and restore users who come back.
+
+    Stamps `last_active_at` (at most once an hour), reactivates users marked
+    unreachable and puts dormant users back on their own reminder grid. The
+    checks read the cached user snapshot, so active users cost no query.
+    """
+
+    def __init__(self, service: HydrationService, reminder_scheduler: ReminderScheduler) -> None:
+        self.service = service
+        self.reminder_scheduler = reminder_scheduler
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is not None and not user.is_bot:
+            snapshot = (await self.service.get_users_many([user.id])).get(user.id)
+            if snapshot is not None:
+                stamped = await self.service.record_activity(snapshot)
+                if snapshot.blocked_at is not None:
+                    await self.reminder_scheduler.reactivate_user(user.id)
+                elif stamped and self.reminder_scheduler.tier_of(user.id) not in (None, ActivityTier.ACTIVE):
+                    await self.reminder_scheduler.schedule_for_user(user.id)
+        return await handler(event, data)
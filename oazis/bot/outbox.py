@@ -0,0 +1,185 @@
+"""Drain worker sending the messages persisted in the outbox."""
+
+import asyncio
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramNotFound
+from aiogram.types import InlineKeyboardMarkup
+from loguru import logger
+
+from oazis.config import Settings
+from oazis.db import OutboxMessage
+from oazis.db.models import epoch_now
+from oazis.services.hydration import HydrationService
+
+# Telegram refuses these for good: retrying cannot help.
+_REJECTED = (TelegramForbiddenError, TelegramBadRequest, TelegramNotFound)
+_PURGE_EVERY_SECONDS = 60
+_MAX_ERROR_BACKOFF_SECONDS = 30
+
+
+class OutboxWorker:
+    """Send outbox messages by priority with a bounded number of sends in flight.
+
+    Messages are claimed in batches: once half of the in-flight sends are done,
+    the free slots are refilled with the most urgent pending messages, so an
+    interactive reply queued behind a reminder backlog waits for at most one
+    refill. Delivery is at least once: a message is marked sent after Telegram
+    accepted it, and a send lost in a crash is retried when its lease runs out.
+
+    Only reminders and goal celebrations go through the outbox. Replies to
+    commands and buttons are answered inline by the handlers, still paced by
+    `OutboundSender`, so they never wait behind the outbox.
+    """
+
+    def __init__(self, bot: Bot, service: HydrationService, settings: Settings) -> None:
+        self.bot = bot
+        self.service = service
+        self.settings = settings
+        self.max_in_flight = settings.outbox_max_in_flight
+        self._in_flight: set[asyncio.Task[None]] = set()
+        self._sent: list[int] = []
+        self._dropped: list[int] = []
+        self._task: asyncio.Task[None] | None = None
+        self._next_purge = 0
+        self._failures = 0
+        self.sent = 0
+        self.dropped = 0
+        self.retried = 0
+        self.expired = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop claiming, let the sends in flight finish and record their results."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as exc:  # noqa: BLE001 - shutdown must go on
+                logger.error("event=outbox_worker_failed error={error}", error=exc)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        try:
+            await self._flush()
+        except Exception as exc:  # noqa: BLE001 - unrecorded sends are retried after their lease
+            logger.error("event=outbox_flush_failed error={error}", error=exc)
+
+    async def run(self) -> None:
+        """Drain until cancelled; database errors are logged and retried with a growing pause."""
+        while True:
+            try:
+                claimed = await self.drain_once()
+            except Exception as exc:  # noqa: BLE001 - e.g. "database is locked": keep draining
+                self.errors += 1
+                self._failures += 1
+                delay = min(self.settings.outbox_poll_seconds * 2**self._failures, _MAX_ERROR_BACKOFF_SECONDS)
+                logger.opt(exception=exc).warning(
+                    "event=outbox_drain_failed failures={failures} retry_in_s={delay:.1f} error={error}",
+                    failures=self._failures,
+                    delay=delay,
+                    error=exc,
+                )
+                await asyncio.sleep(delay)
+                continue
+            self._failures = 0
+            if not claimed:
+                await asyncio.sleep(self.settings.outbox_poll_seconds)
+
+    async def drain_once(self) -> int:
+        """Record finished sends, then refill the free send slots; return how many were claimed."""
+        await self._flush()
+        if epoch_now() >= self._next_purge:
+            await self._purge()
+        while len(self._in_flight) > self.max_in_flight // 2:
+            await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+            await self._flush()
+
+        messages = await self.service.claim_messages(
+            self.max_in_flight - len(self._in_flight), self.settings.outbox_lease_seconds
+        )
+        for message in messages:
+            task = asyncio.create_task(self._send(message))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+        return len(messages)
+
+    async def _send(self, message: OutboxMessage) -> None:
+        markup = InlineKeyboardMarkup.model_validate_json(message.reply_markup) if message.reply_markup else None
+        try:
+            await self.bot.send_message(message.chat_id, message.text, reply_markup=markup)
+        except _REJECTED as exc:
+            logger.warning(
+                "event=outbox_rejected chat_id={chat_id} priority={priority} error={error}",
+                chat_id=message.chat_id,
+                priority=message.priority,
+                error=exc,
+            )
+            self._dropped.append(message.id)
+        except Exception as exc:  # noqa: BLE001 - keep the message for a later attempt
+            attempts = message.attempts + 1
+            if attempts >= self.settings.outbox_max_attempts:
+                logger.error(
+                    "event=outbox_gave_up chat_id={chat_id} attempts={attempts} error={error}",
+                    chat_id=message.chat_id,
+                    attempts=attempts,
+                    error=exc,
+                )
+                self._dropped.append(message.id)
+                return
+            self.retried += 1
+            try:
+                await self.service.retry_message_later(message.id, 2**attempts)
+            except Exception as retry_exc:  # noqa: BLE001 - nobody awaits this task; the lease retries it anyway
+                self.errors += 1
+                logger.error(
+                    "event=outbox_retry_failed message_id={message_id} error={error}",
+                    message_id=message.id,
+                    error=retry_exc,
+                )
+        else:
+            self._sent.append(message.id)
+
+    async def _flush(self) -> None:
+        sent, self._sent = self._sent, []
+        dropped, self._dropped = self._dropped, []
+        try:
+            await self.service.mark_messages_sent(sent)
+            await self.service.drop_messages(dropped)
+        except Exception:
+            # Keep the results for the next flush rather than re-sending after the lease.
+            self._sent[:0] = sent
+            self._dropped[:0] = dropped
+            raise
+        self.sent += len(sent)
+        self.dropped += len(dropped)
+
+    async def _purge(self) -> None:
+        now = epoch_now()
+        self._next_purge = now + _PURGE_EVERY_SECONDS
+        expired, _ = await self.service.purge_outbox(now - self.settings.outbox_sent_retention_hours * 3600)
+        if expired:
+            self.expired += expired
+            logger.info("event=outbox_expired count={count}", count=expired)
+
+    async def log_stats(self) -> None:
+        logger.info(
+            "event=outbox_stats pending={pending} {stats}",
+            pending=await self.service.count_pending_messages(),
+            stats=self.stats(),
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": len(self._in_flight),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "expired": self.expired,
+            "errors": self.errors,
+        }
@@ -0,0 +1,219 @@
+"""Outbound Telegram sends: rate limiting and retries shared by every bot call."""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from loguru import logger
+
+from oazis.config import Settings
+from oazis.scheduler.metrics import Histogram
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+# Per-chat buckets idle long enough to be full again are forgotten past this many chats.
+_CHAT_BUCKETS_SOFT_LIMIT = 10_000
+
+
+def is_chat_unreachable(exc: BaseException) -> bool:
+    """Return True when Telegram says the chat can no longer receive messages.
+
+    Covers a bot blocked by the user, a deleted account and a chat that does not exist.
+    """
+    if isinstance(exc, TelegramForbiddenError):
+        return True
+    return isinstance(exc, (TelegramBadRequest, TelegramNotFound)) and "chat not found" in exc.message.lower()
+
+
+class TokenBucket:
+    """Token bucket handing out send slots in arrival order.
+
+    `reserve` takes a token immediately, letting the balance go negative, and
+    returns how long the caller must wait for it. Concurrent callers thus queue
+    up without a lock.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "clock")
+
+    def __init__(self, rate: float, capacity: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.updated = clock()
+
+    def reserve(self) -> float:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def is_idle(self) -> bool:
+        return self.tokens + (self.clock() - self.updated) * self.rate >= self.capacity
+
+
+class OutboundSender(BaseRequestMiddleware):
+    """Session middleware pacing and retrying every message the bot sends.
+
+    Calls targeting a chat (messages, edits, media...) wait for a token of their
+    chat's bucket, then of the global bucket, so a large reminder slot stays
+    under Telegram's limits. A flood wait (`TelegramRetryAfter`) pauses all
+    sends for the advertised delay; network and server errors are retried with
+    exponential backoff. Other errors (blocked bot, bad request) are raised at once;
+    when a private chat is gone for good, `on_chat_unreachable` is awaited with its
+    id (the user's id) first. Groups and channels never trigger it.
+    Calls without a chat, such as polling for updates, are passed through.
+    """
+
+    def __init__(
+        self,
+        *,
+        global_rate: float = 25.0,
+        global_burst: int = 25,
+        chat_rate: float = 1.0,
+        chat_burst: int = 3,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+    ) -> None:
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._chat_buckets: dict[Any, TokenBucket] = {}
+        self._paused_until = 0.0
+        self.latency_seconds = Histogram(LATENCY_BUCKETS)
+        self.queued = 0
+        self.sent = 0
+        self.retries = 0
+        self.flood_waits = 0
+        self.failed = 0
+        self.unreachable = 0
+        self.on_chat_unreachable: Callable[[int], Awaitable[None]] | None = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "OutboundSender":
+        return cls(
+            global_rate=settings.telegram_global_rate,
+            global_burst=settings.telegram_global_burst,
+            chat_rate=settings.telegram_chat_rate,
+            chat_burst=settings.telegram_chat_burst,
+            max_retries=settings.telegram_max_retries,
+            backoff_seconds=settings.telegram_retry_backoff_seconds,
+        )
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            await self._wait_turn(chat_id)
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as exc:
+                self.flood_waits += 1
+                logger.warning(
+                    "event=telegram_flood_wait method={method} chat_id={chat_id} retry_after={delay}",
+                    method=type(method).__name__,
+                    chat_id=chat_id,
+                    delay=exc.retry_after,
+                )
+                if attempt >= self.max_retries:
+                    self.failed += 1
+                    raise
+                # Telegram throttles the whole bot: every send waits, not just this one.
+                self._paused_until = max(self._paused_until, time.monotonic() + exc.retry_after)
+                backoff = 0.0
+            except (TelegramNetworkError, TelegramServerError) as exc:
+                logger.warning(
+                    "event=telegram_send_retry method={method} chat_id={chat_id} attempt={attempt} error={error}",
+                    method=type(method).__name__,
+                    chat_id=chat_id,
+                    attempt=attempt + 1,
+                    error=exc,
+                )
+                if attempt >= self.max_retries:
+                    self.failed += 1
+                    raise
+                backoff = self.backoff_seconds * 2**attempt * (1 + random.random() / 2)
+            except TelegramAPIError as exc:
+                self.failed += 1
+                if is_chat_unreachable(exc):
+                    await self._chat_unreachable(chat_id)
+                raise
+            except Exception:
+                self.failed += 1
+                raise
+            else:
+                self.sent += 1
+                self.latency_seconds.observe(time.monotonic() - started)
+                return response
+
+            attempt += 1
+            self.retries += 1
+            if backoff:
+                await asyncio.sleep(backoff)
+
+    async def _chat_unreachable(self, chat_id: Any) -> None:
+        self.unreachable += 1
+        # Only private chats share their id with a user; group ids are negative, channels may be "@name".
+        if self.on_chat_unreachable is None or not isinstance(chat_id, int) or chat_id <= 0:
+            return
+        try:
+            await self.on_chat_unreachable(chat_id)
+        except Exception as exc:  # noqa: BLE001 - the send error is what the caller must see
+            logger.error("event=chat_unreachable_failed chat_id={chat_id} error={error}", chat_id=chat_id, error=exc)
+
+    async def _wait_turn(self, chat_id: Any) -> None:
+        """Sleep until a flood wait is over and both buckets grant a token."""
+        self.queued += 1
+        try:
+            while (pause := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(pause)
+            if delay := self._chat_bucket(chat_id).reserve():
+                await asyncio.sleep(delay)
+            if delay := self.global_bucket.reserve():
+                await asyncio.sleep(delay)
+        finally:
+            self.queued -= 1
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= _CHAT_BUCKETS_SOFT_LIMIT:
+                self._chat_buckets = {key: known for key, known in self._chat_buckets.items() if not known.is_idle()}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "retries": self.retries,
+            "flood_waits": self.flood_waits,
+            "failed": self.failed,
+            "unreachable": self.unreachable,
+            "latency_s": self.latency_seconds.snapshot(),
+        }
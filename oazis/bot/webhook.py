@@ -0,0 +1,57 @@
+"""Webhook ingestion: an aiohttp server receiving the updates Telegram posts."""
+
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from loguru import logger
+
+from oazis.config import Settings
+
+
+def create_webhook_app(dispatcher: Dispatcher, bot: Bot, settings: Settings) -> web.Application:
+    """Build the aiohttp application serving `Settings.webhook_path`.
+
+    Requests without the configured secret token get a 401. Updates are
+    acknowledged at once and handled in the background, so a slow handler never
+    makes Telegram retry or hold back the next update. The bot session is left
+    open on shutdown: the caller closes it once the outbox worker has stopped.
+    """
+    app = web.Application()
+    secret = settings.webhook_secret.get_secret_value() if settings.webhook_secret else None
+    handler = SimpleRequestHandler(dispatcher, bot, secret_token=secret)
+    # Not `handler.register()`, which also closes the bot session when the app shuts down.
+    app.router.add_route("POST", settings.webhook_path, handler.handle)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot, settings: Settings) -> None:
+    """Register the webhook with Telegram and serve updates until cancelled.
+
+    Run a single instance: each process also runs the reminder scheduler, the
+    outbox worker and its own user cache, so several instances would send every
+    reminder several times. The webhook is left in place on shutdown: Telegram
+    keeps pending updates until the bot is back.
+    """
+    app = create_webhook_app(dispatcher, bot, settings)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+        await site.start()
+        await bot.set_webhook(
+            settings.webhook_url.rstrip("/") + settings.webhook_path,
+            secret_token=settings.webhook_secret.get_secret_value(),
+            allowed_updates=dispatcher.resolve_used_update_types(),
+        )
+        logger.info(
+            "event=webhook_started host={host} port={port} path={path}",
+            host=settings.webhook_host,
+            port=settings.webhook_port,
+            path=settings.webhook_path,
+        )
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
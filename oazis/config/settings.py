@@ -1,7 +1,10 @@
 """Application settings loaded from environment variables."""
 
+import re
 from functools import lru_cache
-from pydantic import AliasChoices, Field, SecretStr
+from typing import Literal
+
+from pydantic import AliasChoices, Field, SecretStr, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,6 +22,11 @@ class Settings(BaseSettings):
         default="sqlite:///./data/oazis.db",
     validation_alias=AliasChoices("DATABASE_URL", "OAZIS_DATABASE_URL"),
     )
+    database_async: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("DATABASE_ASYNC", "OAZIS_DATABASE_ASYNC"),
+        description="Run queries natively on the event loop (requires aiosqlite) instead of worker threads.",
+    )
     timezone: str = Field(
         default="Europe/Paris",
         validation_alias=AliasChoices("TIMEZONE", "TZ"),
@@ -33,6 +41,93 @@ class Settings(BaseSettings):
         gt=0,
         description="Granularity for evaluating reminder windows (smaller = more precise, more load).",
     )
+    reminder_dispatcher: Literal["jobs", "wheel"] = Field(
+        default="jobs",
+        description=(
+            "'jobs': one APScheduler job per profile group (users sharing a reminder window and offset). "
+            "'wheel': one minute tick firing due groups in bulk."
+        ),
+    )
+    reminder_spread_fraction: float = Field(
+        default=0.0,
+        ge=0.0,
+        lt=1.0,
+        description="Delay each user's reminders by a stable offset within this fraction of their interval.",
+    )
+    reminder_dormant_after_days: int = Field(
+        default=0,
+        ge=0,
+        description="Days without any interaction before a user gets one reminder a day (0 = no activity tiers).",
+    )
+    reminder_inactive_after_days: int = Field(
+        default=45, gt=0, description="Days without any interaction before reminders drop to the inactive tier."
+    )
+    reminder_inactive_every_days: int = Field(
+        default=7, gt=1, description="Inactive users get one reminder every this many days."
+    )
+    reminder_reschedule_concurrency: int = Field(
+        default=4, gt=0, description="Pages of schedules written in parallel during a full reschedule."
+    )
+    reminder_send_concurrency: int = Field(default=20, gt=0, description="Reminders sent in parallel per slot.")
+    scheduler_coalesce: bool = Field(
+        default=True,
+        description="Run a job once, not once per missed fire, when several of its fires were missed.",
+    )
+    scheduler_misfire_grace_seconds: int = Field(
+        default=300,
+        gt=0,
+        description="Fires running later than this are dropped instead of sent late (e.g. after an outage).",
+    )
+    scheduler_max_instances: int = Field(
+        default=1,
+        gt=0,
+        description="Concurrent runs allowed per job; further fires are skipped while a run is still going.",
+    )
+    scheduler_metrics_log_minutes: int = Field(
+        default=15, ge=0, description="Log reminder lag and outcome metrics every N minutes (0 = only at shutdown)."
+    )
+    telegram_global_rate: float = Field(
+        default=25.0, gt=0, description="Messages per second across all chats (Telegram allows about 30)."
+    )
+    telegram_global_burst: int = Field(default=25, gt=0, description="Messages sent back to back before the global rate applies.")
+    telegram_chat_rate: float = Field(default=1.0, gt=0, description="Messages per second to a single chat.")
+    telegram_chat_burst: int = Field(default=3, gt=0, description="Messages to one chat sent back to back before its rate applies.")
+    telegram_max_retries: int = Field(
+        default=3, ge=0, description="Retries of a send after a flood wait, network or server error."
+    )
+    telegram_retry_backoff_seconds: float = Field(
+        default=0.5, gt=0, description="First retry delay after a network or server error; doubles on each retry."
+    )
+    bot_mode: Literal["polling", "webhook"] = Field(
+        default="polling",
+        description="'polling': fetch updates with getUpdates. 'webhook': Telegram posts them to an HTTP server.",
+    )
+    webhook_url: str | None = Field(
+        default=None, description="Public base URL Telegram posts updates to, e.g. https://bot.example.com."
+    )
+    webhook_path: str = Field(default="/telegram/webhook", pattern=r"^/", description="Path of the webhook endpoint.")
+    webhook_host: str = Field(default="0.0.0.0", description="Interface the webhook server listens on.")
+    webhook_port: int = Field(default=8080, ge=0, le=65535, description="Port the webhook server listens on.")
+    webhook_secret: SecretStr | None = Field(
+        default=None,
+        description="Token Telegram sends in X-Telegram-Bot-Api-Secret-Token; other requests are rejected.",
+    )
+    outbox_enabled: bool = Field(
+        default=False,
+        description="Queue reminders and celebrations in a durable outbox drained by priority instead of sending inline. Handler replies are always sent inline.",
+    )
+    outbox_max_in_flight: int = Field(default=20, gt=0, description="Outbox messages being sent at the same time.")
+    outbox_poll_seconds: float = Field(default=0.5, gt=0, description="How often an idle outbox is checked for new messages.")
+    outbox_reminder_ttl_seconds: int = Field(
+        default=900, gt=0, description="Reminders still unsent this long after their slot are dropped."
+    )
+    outbox_max_attempts: int = Field(default=5, gt=0, description="Sends of one message before it is dropped.")
+    outbox_lease_seconds: int = Field(
+        default=120, gt=0, description="A claimed message not confirmed within this delay is sent again."
+    )
+    outbox_sent_retention_hours: int = Field(
+        default=48, gt=0, description="Sent messages are kept this long so late duplicates are still recognised."
+    )
     glass_volume_ml: int = Field(default=250, gt=0)
     default_daily_glasses: int = Field(
         default=8,
@@ -41,6 +136,54 @@ class Settings(BaseSettings):
         description="Used to derive default daily target if user has no preference.",
     )
     default_daily_target_ml: int = Field(default=2000, gt=0)
+    user_cache_size: int = Field(default=50_000, gt=0, description="Most user preference snapshots kept in memory.")
+    user_cache_ttl_seconds: float = Field(
+        default=600,
+        gt=0,
+        description="Snapshot lifetime; bounds staleness when rows change outside this process.",
+    )
+    write_queue_enabled: bool = Field(
+        default=False,
+        description="Group glass logs and reminder flags from many users into shared transactions.",
+    )
+    write_queue_max_batch: int = Field(default=200, gt=0, description="Flush as soon as this many writes are queued.")
+    write_queue_flush_ms: int = Field(default=5, gt=0, description="Longest a queued write waits for companions.")
+    sqlite_tuning: bool = Field(
+        default=True,
+        description="Apply the production PRAGMA profile below to every SQLite connection.",
+    )
+    sqlite_journal_mode: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] = Field(
+        default="WAL", description="WAL lets readers run while a write is in progress."
+    )
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = Field(
+        default="NORMAL", description="NORMAL is durable enough under WAL and skips most fsyncs."
+    )
+    sqlite_busy_timeout_ms: int = Field(default=5000, ge=0, description="How long a writer waits for the lock before failing.")
+    sqlite_mmap_size: int = Field(default=256 * 1024 * 1024, ge=0, description="Bytes of the database file mapped in memory.")
+    sqlite_cache_size_kib: int = Field(default=64 * 1024, gt=0, description="Page cache size per connection, in KiB.")
+    sqlite_pool_size: int = Field(
+        default=8,
+        gt=0,
+        description="Pooled SQLite connections shared by the worker threads running database calls.",
+    )
+
+    @field_validator("sqlite_journal_mode", "sqlite_synchronous", mode="before")
+    @classmethod
+    def _upper_pragma(cls, value: object) -> object:
+        # PRAGMA values are case-insensitive; accept "wal" as well as "WAL".
+        return value.upper() if isinstance(value, str) else value
+
+    @model_validator(mode="after")
+    def _check_webhook(self) -> "Settings":
+        if self.bot_mode != "webhook":
+            return self
+        if not self.webhook_url:
+            raise ValueError("WEBHOOK_URL is required when BOT_MODE=webhook")
+        secret = self.webhook_secret.get_secret_value() if self.webhook_secret else ""
+        # Telegram's own constraint on secret_token.
+        if not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", secret):
+            raise ValueError("WEBHOOK_SECRET must be 1-256 characters among A-Z, a-z, 0-9, _ and -")
+        return self
 
 
 @lru_cache
@@ -1,12 +1,30 @@
 """Database setup and helpers."""
 
-from .models import DailyHydration, HydrationEvent, User
+from .models import (
+    AppState,
+    DailyHydration,
+    EventType,
+    HydrationEvent,
+    HydrationRollup,
+    OutboxMessage,
+    OutboxPriority,
+    ReminderSchedule,
+    User,
+    UserDayState,
+)
 from .session import get_engine, init_db, session_scope
 
 __all__ = [
+    "AppState",
     "DailyHydration",
+    "EventType",
     "HydrationEvent",
+    "HydrationRollup",
+    "OutboxMessage",
+    "OutboxPriority",
+    "ReminderSchedule",
     "User",
+    "UserDayState",
     "get_engine",
     "init_db",
     "session_scope",
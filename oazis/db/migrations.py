@@ -0,0 +1,260 @@
+"""Data migrations run by init_db on existing databases."""
+
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from loguru import logger
+from sqlalchemy import bindparam, delete, func, inspect, text, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, insert, select
+
+from .models import DailyHydration, EventType, HydrationEvent, HydrationRollup, User
+
+LEGACY_EVENTS_TABLE = "hydrationevent_legacy"
+_LEGACY_EVENT_TYPES = {
+    "glass_logged": EventType.GLASS_LOGGED,
+    "reminders_paused": EventType.REMINDERS_PAUSED,
+    "reminders_resumed": EventType.REMINDERS_RESUMED,
+    "goal_notified": EventType.GOAL_NOTIFIED,
+    "reminder_sent": EventType.REMINDER_SENT,
+}
+
+
+def set_aside_legacy_events(engine: Engine) -> None:
+    """Rename a string-encoded hydrationevent table so the compact one can be created.
+
+    Must run before `create_all`. Rows are moved later by `migrate_legacy_events`.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(HydrationEvent.__tablename__) or inspector.has_table(LEGACY_EVENTS_TABLE):
+        return
+    columns = {column["name"] for column in inspector.get_columns(HydrationEvent.__tablename__)}
+    if "event_type" not in columns:
+        return
+
+    with engine.begin() as connection:
+        connection.execute(text(f"ALTER TABLE {HydrationEvent.__tablename__} RENAME TO {LEGACY_EVENTS_TABLE}"))
+    logger.info("event=legacy_events_set_aside table={table}", table=LEGACY_EVENTS_TABLE)
+
+
+# Indexes removed from the models; dropped from databases created before.
+RETIRED_INDEXES = ("ix_hydrationevent_user_kind_ts",)
+
+
+def drop_retired_indexes(engine: Engine) -> None:
+    with engine.begin() as connection:
+        for name in RETIRED_INDEXES:
+            connection.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+
+
+def add_missing_columns(engine: Engine) -> None:
+    """Add nullable columns introduced after a table was created; `create_all` only creates tables."""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                logger.info("event=column_added table={table} column={column}", table=table.name, column=column.name)
+
+
+def merge_duplicate_daily_rows(engine: Engine) -> int:
+    """Merge DailyHydration rows sharing a (user_id, date); returns the number of rows removed.
+
+    Releases without the unique index could log the same day twice under
+    concurrent taps. Glasses are summed into the oldest row so the unique index
+    can then be created. Must run before `_ensure_indexes`.
+    """
+    table = DailyHydration.__table__
+    inspector = inspect(engine)
+    if not inspector.has_table(table.name):
+        return 0
+    if "ux_dailyhydration_user_date" in {index["name"] for index in inspector.get_indexes(table.name)}:
+        return 0
+
+    with engine.begin() as connection:
+        duplicates = connection.execute(
+            select(
+                table.c.user_id,
+                table.c.date,
+                func.min(table.c.id).label("keep_id"),
+                func.sum(table.c.consumed_ml).label("consumed_ml"),
+                func.max(table.c.updated_at).label("updated_at"),
+            )
+            .group_by(table.c.user_id, table.c.date)
+            .having(func.count() > 1)
+        ).all()
+        removed = 0
+        for row in duplicates:
+            connection.execute(
+                update(table)
+                .where(table.c.id == row.keep_id)
+                .values(consumed_ml=row.consumed_ml, updated_at=row.updated_at)
+            )
+            removed += connection.execute(
+                delete(table).where(
+                    table.c.user_id == row.user_id, table.c.date == row.date, table.c.id != row.keep_id
+                )
+            ).rowcount
+    if removed:
+        logger.info("event=daily_duplicates_merged days={days} rows_removed={rows}", days=len(duplicates), rows=removed)
+    return removed
+
+
+# Events recording something the user did, as opposed to messages the bot sent.
+_USER_ACTIONS = (EventType.GLASS_LOGGED, EventType.REMINDERS_PAUSED, EventType.REMINDERS_RESUMED)
+
+
+def seed_last_active(engine: Engine, *, only_unstamped: bool = True) -> int:
+    """Derive `User.last_active_at` from past glasses and actions where it was never stamped.
+
+    Without it, activity tiers would fall back to the signup date and treat every
+    user from before the column existed as idle. With `only_unstamped=False`, every
+    user whose history is more recent than their stamp is moved forward too.
+    Returns the number of users seeded.
+    """
+    users = User.__table__
+    unstamped = select(users.c.telegram_id)
+    if only_unstamped:
+        unstamped = unstamped.where(users.c.last_active_at.is_(None))
+    days = DailyHydration.__table__
+    events = HydrationEvent.__table__
+    with engine.begin() as connection:
+        latest: dict[int, int] = {}
+        for user_id, updated_at in connection.execute(
+            select(days.c.user_id, func.max(days.c.updated_at)).where(days.c.user_id.in_(unstamped)).group_by(days.c.user_id)
+        ):
+            latest[user_id] = int(updated_at.replace(tzinfo=timezone.utc).timestamp())
+        for user_id, ts in connection.execute(
+            select(events.c.user_id, func.max(events.c.ts))
+            .where(events.c.user_id.in_(unstamped), events.c.kind.in_(_USER_ACTIONS))
+            .group_by(events.c.user_id)
+        ):
+            latest[user_id] = max(ts, latest.get(user_id, 0))
+        seeded = 0
+        if latest:
+            last_active_at = bindparam("b_last_active_at")
+            seeded = connection.execute(
+                update(users)
+                .where(
+                    users.c.telegram_id == bindparam("b_user_id"),
+                    users.c.last_active_at.is_(None) | (users.c.last_active_at < last_active_at),
+                )
+                .values(last_active_at=last_active_at),
+                [{"b_user_id": user_id, "b_last_active_at": ts} for user_id, ts in latest.items()],
+            ).rowcount
+    if seeded:
+        logger.info("event=last_active_seeded users={users}", users=seeded)
+    return seeded
+
+
+def has_legacy_events(engine: Engine) -> bool:
+    return inspect(engine).has_table(LEGACY_EVENTS_TABLE)
+
+
+def migrate_legacy_events(
+    engine: Engine,
+    *,
+    batch_size: int = 2000,
+    pause_seconds: float = 0.05,
+    stop: threading.Event | None = None,
+) -> int:
+    """Move legacy events into the compact table in short batches, then drop the legacy table.
+
+    Each batch is copied and deleted in its own transaction, so the migration holds the
+    write lock only briefly, can be interrupted with `stop` and resumes where it left off.
+    Once done, `last_active_at` is seeded again from the moved events. Returns the number
+    of rows moved by this call.
+    """
+    moved = 0
+    while not (stop and stop.is_set()):
+        with engine.begin() as connection:
+            rows = connection.execute(
+                text(
+                    f"SELECT id, user_id, timestamp, event_type, notes FROM {LEGACY_EVENTS_TABLE} "
+                    "ORDER BY id LIMIT :limit"
+                ),
+                {"limit": batch_size},
+            ).all()
+            if not rows:
+                connection.execute(text(f"DROP TABLE {LEGACY_EVENTS_TABLE}"))
+            else:
+                connection.execute(insert(HydrationEvent), [_encode_legacy_event(row) for row in rows])
+                connection.execute(
+                    text(f"DELETE FROM {LEGACY_EVENTS_TABLE} WHERE id <= :last_id"),
+                    {"last_id": rows[-1].id},
+                )
+        if not rows:
+            logger.info("event=legacy_events_migrated rows={rows}", rows=moved)
+            # init_db seeded activity before these events were readable.
+            seed_last_active(engine, only_unstamped=False)
+            return moved
+        moved += len(rows)
+        logger.debug("event=legacy_events_batch moved={moved}", moved=moved)
+        # Leave the write lock to the bot between batches.
+        if stop is None:
+            time.sleep(pause_seconds)
+        elif stop.wait(pause_seconds):
+            break
+    return moved
+
+
+def _encode_legacy_event(row) -> dict:
+    kind = _LEGACY_EVENT_TYPES.get(row.event_type, EventType.UNKNOWN)
+    volume_ml = None
+    if kind == EventType.GLASS_LOGGED and row.notes:
+        try:
+            volume_ml = int(row.notes.removesuffix("ml"))
+        except ValueError:
+            volume_ml = None
+    timestamp = row.timestamp if isinstance(row.timestamp, datetime) else datetime.fromisoformat(row.timestamp)
+    return {
+        "user_id": row.user_id,
+        "ts": int(timestamp.replace(tzinfo=timezone.utc).timestamp()),
+        "kind": kind,
+        "volume_ml": volume_ml,
+    }
+
+
+def backfill_hydration_rollups(engine: Engine, batch_size: int = 5000) -> None:
+    """Build weekly and monthly rollups from DailyHydration when none exist yet."""
+    with Session(engine) as session:
+        if session.exec(select(HydrationRollup.user_id).limit(1)).first() is not None:
+            return
+        if session.exec(select(DailyHydration.id).limit(1)).first() is None:
+            return
+
+        totals: dict[tuple[int, str, object], list[int]] = defaultdict(lambda: [0, 0, 0])
+        stmt = select(
+            DailyHydration.user_id,
+            DailyHydration.date,
+            DailyHydration.consumed_ml,
+            DailyHydration.goal_ml,
+        ).execution_options(yield_per=batch_size)
+        for user_id, day, consumed_ml, goal_ml in session.exec(stmt):
+            for period, period_start in HydrationRollup.periods_for(day):
+                bucket = totals[(user_id, period, period_start)]
+                bucket[0] += consumed_ml
+                bucket[1] += int(consumed_ml > 0)
+                bucket[2] += int(consumed_ml >= goal_ml)
+
+        rows = [
+            {
+                "user_id": user_id,
+                "period": period,
+                "period_start": period_start,
+                "total_ml": total_ml,
+                "days_logged": days_logged,
+                "goal_hits": goal_hits,
+            }
+            for (user_id, period, period_start), (total_ml, days_logged, goal_hits) in totals.items()
+        ]
+        for offset in range(0, len(rows), batch_size):
+            session.exec(insert(HydrationRollup), params=rows[offset : offset + batch_size])
+        session.commit()
+        logger.info("event=rollups_backfilled rows={rows}", rows=len(rows))
@@ -1,11 +1,19 @@
 """Persistence models for hydration tracking."""
 
-from datetime import date, datetime
+import time
+from datetime import date, datetime, timedelta, timezone
+from enum import IntEnum
 from typing import List, Optional
 
+from sqlalchemy import Index, SmallInteger
 from sqlmodel import Field, Relationship, SQLModel
 
 
+def utc_now() -> datetime:
+    """Current time as a timezone-aware UTC datetime (stored naive, in UTC, by SQLite)."""
+    return datetime.now(timezone.utc)
+
+
 class User(SQLModel, table=True):
     """Telegram user registered in the bot."""
 
@@ -17,32 +25,153 @@ class User(SQLModel, table=True):
     reminder_start_hour: Optional[int] = Field(default=None)
     reminder_end_hour: Optional[int] = Field(default=None)
     reminder_interval_minutes: Optional[int] = Field(default=None)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    blocked_at: Optional[int] = Field(
+        default=None,
+        description="Unix epoch seconds (UTC) when Telegram reported the chat unreachable; None while active",
+    )
+    last_active_at: Optional[int] = Field(
+        default=None, description="Unix epoch seconds (UTC) of the last update received from the user, to the hour"
+    )
 
     hydration_days: List["DailyHydration"] = Relationship(back_populates="user")
     events: List["HydrationEvent"] = Relationship(back_populates="user")
+    day_states: List["UserDayState"] = Relationship(back_populates="user")
 
 
 class DailyHydration(SQLModel, table=True):
     """Aggregated hydration metrics for a user and a given date."""
 
+    __table_args__ = (Index("ux_dailyhydration_user_date", "user_id", "date", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.telegram_id")
     date: date
     goal_ml: int
     consumed_ml: int = Field(default=0)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=utc_now)
 
     user: User = Relationship(back_populates="hydration_days")
 
 
+class HydrationRollup(SQLModel, table=True):
+    """Weekly (ISO, Monday-based) and monthly totals kept in step with DailyHydration."""
+
+    user_id: int = Field(foreign_key="user.telegram_id", primary_key=True)
+    period: str = Field(primary_key=True, description="'week' or 'month'")
+    period_start: date = Field(primary_key=True)
+    total_ml: int = Field(default=0)
+    days_logged: int = Field(default=0, description="Days with at least one glass logged")
+    goal_hits: int = Field(default=0)
+
+    @staticmethod
+    def periods_for(day: date) -> list[tuple[str, date]]:
+        """Return the (period, period_start) keys of every rollup containing `day`."""
+        return [("week", day - timedelta(days=day.weekday())), ("month", day.replace(day=1))]
+
+
+class UserDayState(SQLModel, table=True):
+    """Reminder flags for a user and a given date, read with a single primary-key lookup."""
+
+    user_id: int = Field(foreign_key="user.telegram_id", primary_key=True)
+    day: date = Field(primary_key=True)
+    reminders_paused: bool = Field(default=False)
+    goal_notified: bool = Field(default=False)
+    updated_at: datetime = Field(default_factory=utc_now)
+
+    user: User = Relationship(back_populates="day_states")
+
+
+class EventType(IntEnum):
+    """Compact codes stored in HydrationEvent.kind."""
+
+    UNKNOWN = 0
+    GLASS_LOGGED = 1
+    REMINDERS_PAUSED = 2
+    REMINDERS_RESUMED = 3
+    GOAL_NOTIFIED = 4
+    REMINDER_SENT = 5
+
+
+def epoch_now() -> int:
+    """Current time as integer Unix epoch seconds (UTC)."""
+    return int(time.time())
+
+
 class HydrationEvent(SQLModel, table=True):
-    """Timeline of hydration-related events."""
+    """Timeline of hydration-related events, encoded as small integers for compact rows.
+
+    An append-only audit log: no hot query reads it, so it carries no secondary index.
+    """
 
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.telegram_id")
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-    event_type: str = Field(description="e.g. reminder_sent, glass_logged")
-    notes: Optional[str] = Field(default=None, description="Optional metadata or payload")
+    ts: int = Field(default_factory=epoch_now, description="Unix epoch seconds (UTC)")
+    kind: int = Field(sa_type=SmallInteger, description="EventType value")
+    volume_ml: Optional[int] = Field(default=None, description="Glass volume for GLASS_LOGGED events")
 
     user: User = Relationship(back_populates="events")
+
+
+class ReminderSchedule(SQLModel, table=True):
+    """Reminder schedule of a user, restored at startup without re-reading every user."""
+
+    user_id: int = Field(foreign_key="user.telegram_id", primary_key=True)
+    start_hour: int
+    end_hour: int
+    interval_minutes: int
+    timezone: str
+    offset_minutes: int = Field(default=0, description="Stable spread offset applied to the grid")
+    suspended_until: Optional[int] = Field(
+        default=None, description="Unix epoch seconds until which reminders are skipped (paused, goal reached)"
+    )
+    tier: Optional[str] = Field(default=None, description="Sparse activity tier of the schedule; None when active")
+    updated_at: int = Field(default_factory=epoch_now, description="Unix epoch seconds (UTC)")
+
+
+class AppState(SQLModel, table=True):
+    """Small key/value store for process-wide state kept across restarts."""
+
+    key: str = Field(primary_key=True)
+    value: str
+    updated_at: int = Field(default_factory=epoch_now, description="Unix epoch seconds (UTC)")
+
+
+class OutboxPriority(IntEnum):
+    """Drain order of OutboxMessage rows: lower values are sent first."""
+
+    INTERACTIVE = 0
+    CELEBRATION = 1
+    REMINDER = 2
+
+
+class OutboxMessage(SQLModel, table=True):
+    """Outgoing message persisted until Telegram accepted it, drained by priority then age."""
+
+    __table_args__ = (Index("ix_outboxmessage_pending", "sent_at", "priority", "id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    chat_id: int
+    priority: int = Field(sa_type=SmallInteger, description="OutboxPriority value")
+    text: str
+    reply_markup: Optional[str] = Field(default=None, description="Inline keyboard serialized as JSON")
+    dedupe_key: Optional[str] = Field(
+        default=None, unique=True, description="At most one message per key, e.g. one reminder per user and slot"
+    )
+    created_at: int = Field(default_factory=epoch_now, description="Unix epoch seconds (UTC)")
+    available_at: int = Field(
+        default_factory=epoch_now, description="Unix epoch seconds before which the message is not claimed"
+    )
+    expires_at: Optional[int] = Field(default=None, description="Unix epoch seconds after which it is dropped unsent")
+    attempts: int = Field(default=0)
+    sent_at: Optional[int] = Field(default=None, description="Unix epoch seconds; kept for a while to dedupe late repeats")
+
+    @staticmethod
+    def reminder_key(chat_id: int, slot: int) -> str:
+        """Dedupe key of the reminder of `chat_id` for the slot starting at epoch second `slot`."""
+        return f"reminder:{chat_id}:{slot}"
+
+    @staticmethod
+    def goal_key(chat_id: int, day: date) -> str:
+        """Dedupe key of the goal celebration of `chat_id` on `day`, whoever sends it."""
+        return f"goal:{chat_id}:{day.isoformat()}"
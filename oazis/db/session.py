@@ -1,26 +1,140 @@
 """Engine and session helpers."""
 
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Any, Iterator
 
-from sqlalchemy.engine import Engine
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlmodel import Session, SQLModel, create_engine
 
+from oazis.config import Settings
 
-def get_engine(database_url: str, echo: bool = False) -> Engine:
-    """Return a SQLAlchemy engine configured for SQLite or other backends."""
-    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
-    return create_engine(database_url, echo=echo, connect_args=connect_args)
+from .migrations import (
+    add_missing_columns,
+    backfill_hydration_rollups,
+    drop_retired_indexes,
+    merge_duplicate_daily_rows,
+    seed_last_active,
+    set_aside_legacy_events,
+)
+
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def get_engine(database_url: str, echo: bool = False, settings: Settings | None = None) -> Engine:
+    """Return a SQLAlchemy engine configured for SQLite or other backends.
+
+    When `settings` is given and tuning is enabled, SQLite connections get the
+    production PRAGMA profile and a connection pool sized for the worker threads.
+    """
+    if not database_url.startswith("sqlite"):
+        return create_engine(database_url, echo=echo)
+
+    connect_args = {"check_same_thread": False}
+    if _is_sqlite_memory(database_url):
+        # Every new connection would otherwise open a distinct empty database.
+        return create_engine(database_url, echo=echo, connect_args=connect_args, poolclass=StaticPool)
+
+    if settings is None or not settings.sqlite_tuning:
+        return create_engine(database_url, echo=echo, connect_args=connect_args)
+
+    engine = create_engine(
+        database_url,
+        echo=echo,
+        connect_args={**connect_args, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+        poolclass=QueuePool,
+        pool_size=settings.sqlite_pool_size,
+        max_overflow=settings.sqlite_pool_size,
+    )
+    _install_sqlite_pragmas(engine, settings)
+    return engine
+
+
+def get_async_engine(database_url: str, echo: bool = False, settings: Settings | None = None) -> AsyncEngine:
+    """Return an AsyncEngine for the same database, using aiosqlite for SQLite URLs.
+
+    Raises ImportError when the async driver is not installed.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.get_driver_name() in {"", "pysqlite"}:
+        url = url.set(drivername="sqlite+aiosqlite")
+
+    if url.get_backend_name() != "sqlite" or _is_sqlite_memory(database_url):
+        return create_async_engine(url, echo=echo)
+
+    engine = create_async_engine(url, echo=echo, pool_size=settings.sqlite_pool_size if settings else 5)
+    if settings is not None and settings.sqlite_tuning:
+        _install_sqlite_pragmas(engine.sync_engine, settings)
+    return engine
+
+
+def _install_sqlite_pragmas(engine: Engine, settings: Settings) -> None:
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def sqlite_pragmas(settings: Settings) -> dict[str, str | int]:
+    """Return the PRAGMA profile applied to each SQLite connection."""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "mmap_size": settings.sqlite_mmap_size,
+        # Negative values are interpreted by SQLite as KiB instead of pages.
+        "cache_size": -settings.sqlite_cache_size_kib,
+        "temp_store": "MEMORY",
+    }
+
+
+def _is_sqlite_memory(database_url: str) -> bool:
+    return database_url in {"sqlite://", "sqlite:///:memory:"} or "mode=memory" in database_url
 
 
 def init_db(engine: Engine) -> None:
-    """Create database tables if they do not exist."""
+    """Create database tables and indexes if they do not exist, then backfill derived data."""
+    set_aside_legacy_events(engine)
     SQLModel.metadata.create_all(engine)
+    add_missing_columns(engine)
+    merge_duplicate_daily_rows(engine)
+    _ensure_indexes(engine)
+    drop_retired_indexes(engine)
+    backfill_hydration_rollups(engine)
+    seed_last_active(engine)
+
+
+def _ensure_indexes(engine: Engine) -> None:
+    """Create indexes added to models after their table was first created."""
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
+def dialect_insert(session: Session, model: Any):
+    """Return an INSERT construct supporting ON CONFLICT for the session's dialect."""
+    dialect = session.get_bind().dialect.name
+    try:
+        return _UPSERT_INSERTS[dialect](model)
+    except KeyError as exc:
+        raise RuntimeError(f"Upserts are not supported on dialect {dialect!r}") from exc
 
 
 @contextmanager
 def session_scope(engine: Engine) -> Iterator[Session]:
     """Provide a transactional scope around a series of operations."""
-    with Session(engine) as session:
+    with Session(engine, expire_on_commit=False) as session:
         yield session
-
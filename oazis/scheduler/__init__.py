@@ -1,5 +1,22 @@
 """APScheduler setup for periodic reminders."""
 
-from .scheduler import ReminderScheduler, compute_next_aligned_run, create_scheduler
+from .metrics import Histogram, ReminderMetrics
+from .profiles import ActivityTier, ProfileSchedule, ReminderProfile
+from .scheduler import ReminderScheduler, create_scheduler
+from .triggers import ReminderWindowTrigger, compute_next_aligned_run, spread_offset_minutes
+from .wheel import ReminderDispatcher, TimingWheel
 
-__all__ = ["create_scheduler", "ReminderScheduler", "compute_next_aligned_run"]
+__all__ = [
+    "create_scheduler",
+    "ActivityTier",
+    "Histogram",
+    "ProfileSchedule",
+    "ReminderDispatcher",
+    "ReminderMetrics",
+    "ReminderProfile",
+    "ReminderScheduler",
+    "ReminderWindowTrigger",
+    "TimingWheel",
+    "compute_next_aligned_run",
+    "spread_offset_minutes",
+]
@@ -1,7 +1,12 @@
 """Scheduler job implementations."""
 
+import asyncio
 import random
-from datetime import datetime
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from enum import StrEnum
+from typing import Awaitable, Callable, Iterable
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot
@@ -9,62 +14,199 @@ from loguru import logger
 
 from oazis.bot.formatting import format_interval, format_progress, format_volume_ml
 from oazis.bot.keyboards import reminder_actions_keyboard
+from oazis.bot.sender import is_chat_unreachable
 from oazis.config import Settings
+from oazis.db import OutboxMessage, OutboxPriority
+from oazis.services import ReminderContext, UserSnapshot
 from oazis.services.hydration import HydrationService
 
 
-async def send_hydration_reminder_for_user(bot: Bot, service: HydrationService, settings: Settings, user_id: int) -> None:
+class ReminderAction(StrEnum):
+    SKIP = "skip"
+    REMIND = "remind"
+    CELEBRATE = "celebrate"
+
+
+class ReminderOutcome(StrEnum):
+    SENT = "sent"
+    GOAL = "goal"
+    SKIPPED_WINDOW = "skipped_window"
+    SKIPPED_PAUSED = "skipped_paused"
+    SKIPPED_GOAL = "skipped_goal"
+    BLOCKED = "blocked"
+    ERROR = "error"
+
+
+@dataclass(frozen=True, slots=True)
+class ReminderDecision:
+    """Outcome of the in-memory reminder rules for one user at one slot."""
+
+    action: ReminderAction
+    user_id: int
+    reason: str = ""
+    outcome: ReminderOutcome = ReminderOutcome.SENT
+    done_for_today: bool = False
+    start_hour: int = 0
+    end_hour: int = 0
+    interval_minutes: int = 0
+    local_hour: int = 0
+    local_date: date | None = None
+    target_ml: int = 0
+    consumed_ml: int = 0
+
+
+async def send_hydration_reminder_for_user(
+    bot: Bot,
+    service: HydrationService,
+    settings: Settings,
+    user_id: int,
+    *,
+    on_done_for_today: Callable[..., Awaitable[None]] | None = None,
+) -> None:
     """Send a hydration reminder for a single user (scheduled individually)."""
-    user = await service.ensure_user(user_id)
-    timezone = user.timezone or settings.timezone
-    now = datetime.now(ZoneInfo(timezone))
+    await send_hydration_reminders_for_slot(bot, service, settings, [user_id], on_done_for_today=on_done_for_today)
 
-    start_hour = user.reminder_start_hour or settings.hydration_start_hour
-    end_hour = user.reminder_end_hour or settings.hydration_end_hour
-    interval_minutes = user.reminder_interval_minutes or settings.reminder_interval_minutes
-    paused = await service.is_reminders_paused_today(user.telegram_id)
 
-    logger.info(
-        "event=reminder_tick user_id={user_id} now={now} start_hour={start} end_hour={end} interval_min={interval}",
-        user_id=user.telegram_id,
-        now=now.isoformat(),
-        start=start_hour,
-        end=end_hour,
-        interval=interval_minutes,
-    )
+async def send_hydration_reminders_for_slot(
+    bot: Bot,
+    service: HydrationService,
+    settings: Settings,
+    user_ids: Iterable[int],
+    *,
+    now: datetime | None = None,
+    concurrency: int | None = None,
+    on_done_for_today: Callable[..., Awaitable[None]] | None = None,
+) -> Counter[str]:
+    """Send the reminders of every user due at the same slot.
 
-    if paused:
-        logger.debug("Skip user {user_id}: reminders paused today", user_id=user.telegram_id)
-        return
+    Users outside their window are dropped on cached snapshots first; the remaining
+    reminder contexts are loaded with set-based queries, decided in memory, and the
+    messages are sent concurrently. `now` is the slot time (default: the current
+    time). Users with nothing left to receive today (paused, goal reached) are
+    passed to `on_done_for_today` so their schedule can skip to tomorrow.
+    With ``Settings.outbox_enabled``, messages are queued in the outbox in one
+    write instead, and counted as sent once queued.
+    Returns the number of users per `ReminderOutcome`.
+    """
+    users = await service.get_users_many(user_ids)
+    in_window = [user_id for user_id, user in users.items() if _outside_window_reason(user, settings, now) is None]
+    contexts = await service.get_reminder_context_many(in_window) if in_window else {}
 
-    if not _is_valid_window(start_hour, end_hour):
-        logger.debug(
-            "Skip user {user_id}: invalid window {start}-{end}",
-            user_id=user.telegram_id,
-            start=start_hour,
-            end=end_hour,
-        )
-        return
+    outcomes: Counter[str] = Counter()
+    all_decisions: list[ReminderDecision] = []
+    decisions: list[ReminderDecision] = []
+    for user_id, user in users.items():
+        context = contexts.get(user_id)
+        if context is None:
+            reason = _outside_window_reason(user, settings, now) or "unknown"
+            decision = ReminderDecision(ReminderAction.SKIP, user_id, reason, ReminderOutcome.SKIPPED_WINDOW)
+        else:
+            decision = decide_reminder(context, settings, now)
+        all_decisions.append(decision)
+        if decision.action is ReminderAction.SKIP:
+            outcomes[decision.outcome] += 1
+            logger.debug("Skip user {user_id}: {reason}", user_id=user_id, reason=decision.reason)
+        else:
+            decisions.append(decision)
 
-    if interval_minutes <= 0:
-        logger.debug("Skip user {user_id}: invalid interval {interval}", user_id=user.telegram_id, interval=interval_minutes)
-        return
+    if settings.outbox_enabled:
+        await _enqueue(service, settings, decisions, now)
+        outcomes.update(decision.outcome for decision in decisions)
+    else:
+        await _deliver_all(bot, service, decisions, outcomes, concurrency or settings.reminder_send_concurrency)
+    if on_done_for_today is not None:
+        done = [decision.user_id for decision in all_decisions if decision.done_for_today]
+        if done:
+            await on_done_for_today(*done)
+    if len(users) > 1:
+        logger.info("event=reminder_slot users={users} {outcomes}", users=len(users), outcomes=dict(outcomes))
+    return outcomes
+
+
+async def _deliver_all(
+    bot: Bot,
+    service: HydrationService,
+    decisions: list[ReminderDecision],
+    outcomes: Counter[str],
+    concurrency: int,
+) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def deliver(decision: ReminderDecision) -> None:
+        async with semaphore:
+            try:
+                await _deliver(bot, service, decision)
+            except Exception as exc:  # noqa: BLE001 - one user must not stop the slot
+                if is_chat_unreachable(exc):
+                    outcomes[ReminderOutcome.BLOCKED] += 1
+                    logger.info("event=reminder_chat_unreachable user_id={user_id}", user_id=decision.user_id)
+                    return
+                outcomes[ReminderOutcome.ERROR] += 1
+                logger.error("Reminder job failed for {user_id}: {error}", user_id=decision.user_id, error=exc)
+            else:
+                outcomes[decision.outcome] += 1
+
+    await asyncio.gather(*(deliver(decision) for decision in decisions))
+
+
+async def _enqueue(
+    service: HydrationService, settings: Settings, decisions: list[ReminderDecision], now: datetime | None
+) -> None:
+    """Queue the slot's messages in the outbox, one per user and slot."""
+    slot = int((now or datetime.now(timezone.utc)).timestamp()) // 60 * 60
+    markup = reminder_actions_keyboard().model_dump_json(exclude_none=True)
+    messages = []
+    celebrated = []
+    for decision in decisions:
+        if decision.action is ReminderAction.CELEBRATE:
+            celebrated.append(decision.user_id)
+            messages.append(
+                {
+                    "chat_id": decision.user_id,
+                    "priority": OutboxPriority.CELEBRATION,
+                    "text": _goal_reached_text(decision.consumed_ml, decision.target_ml),
+                    "reply_markup": markup,
+                    "dedupe_key": OutboxMessage.goal_key(decision.user_id, decision.local_date),
+                }
+            )
+        else:
+            messages.append(
+                {
+                    "chat_id": decision.user_id,
+                    "priority": OutboxPriority.REMINDER,
+                    "text": _reminder_text(decision),
+                    "reply_markup": markup,
+                    "dedupe_key": OutboxMessage.reminder_key(decision.user_id, slot),
+                    "expires_at": slot + settings.outbox_reminder_ttl_seconds,
+                }
+            )
+    queued = await service.enqueue_messages(messages)
+    await asyncio.gather(*(service.record_goal_notified(user_id) for user_id in celebrated))
+    if queued < len(messages):
+        logger.info("event=outbox_deduped count={count}", count=len(messages) - queued)
 
-    minutes_now = now.hour * 60 + now.minute
-    minutes_start = start_hour * 60
-
-    if not (minutes_start <= minutes_now < end_hour * 60):
-        logger.debug(
-            "Skip user {user_id}: outside reminder window now={now_hour}:{now_minute:02d} window={start}-{end}",
-            user_id=user.telegram_id,
-            now_hour=now.hour,
-            now_minute=now.minute,
-            start=start_hour,
-            end=end_hour,
+
+def decide_reminder(context: ReminderContext, settings: Settings, now: datetime | None = None) -> ReminderDecision:
+    """Apply the reminder rules to a loaded context without any I/O."""
+    user = context.user
+    start_hour = user.reminder_start_hour or settings.hydration_start_hour
+    end_hour = user.reminder_end_hour or settings.hydration_end_hour
+    interval_minutes = user.reminder_interval_minutes or settings.reminder_interval_minutes
+    local_now = _local_now(user, settings, now)
+
+    reason = _outside_window_reason(user, settings, local_now)
+    if reason is not None:
+        return ReminderDecision(ReminderAction.SKIP, user.telegram_id, reason, ReminderOutcome.SKIPPED_WINDOW)
+    if context.reminders_paused:
+        return ReminderDecision(
+            ReminderAction.SKIP,
+            user.telegram_id,
+            "reminders paused today",
+            ReminderOutcome.SKIPPED_PAUSED,
+            done_for_today=True,
         )
-        return
 
-    entry = await service.get_today_entry(user.telegram_id)
+    entry = context.today_entry
     target_glasses = user.daily_target_glasses or settings.default_daily_glasses
     target_ml = user.daily_target_ml or target_glasses * settings.glass_volume_ml
     if entry:
@@ -72,38 +214,83 @@ async def send_hydration_reminder_for_user(bot: Bot, service: HydrationService,
     consumed = entry.consumed_ml if entry else 0
 
     if consumed >= target_ml:
-        already_notified = await service.has_goal_been_notified(user.telegram_id)
-        if not already_notified:
-            await _send_goal_reached(bot, user.telegram_id, consumed, target_ml)
-            await service.record_goal_notified(user.telegram_id)
+        if context.goal_notified:
+            return ReminderDecision(
+                ReminderAction.SKIP,
+                user.telegram_id,
+                "goal already reached",
+                ReminderOutcome.SKIPPED_GOAL,
+                done_for_today=True,
+            )
+        action = ReminderAction.CELEBRATE
+    else:
+        action = ReminderAction.REMIND
+
+    return ReminderDecision(
+        action,
+        user.telegram_id,
+        outcome=ReminderOutcome.GOAL if action is ReminderAction.CELEBRATE else ReminderOutcome.SENT,
+        done_for_today=action is ReminderAction.CELEBRATE,
+        start_hour=start_hour,
+        end_hour=end_hour,
+        interval_minutes=interval_minutes,
+        local_hour=local_now.hour,
+        local_date=local_now.date(),
+        target_ml=target_ml,
+        consumed_ml=consumed,
+    )
+
+
+def _outside_window_reason(user: UserSnapshot, settings: Settings, now: datetime | None = None) -> str | None:
+    start_hour = user.reminder_start_hour or settings.hydration_start_hour
+    end_hour = user.reminder_end_hour or settings.hydration_end_hour
+    interval_minutes = user.reminder_interval_minutes or settings.reminder_interval_minutes
+    if not _is_valid_window(start_hour, end_hour):
+        return f"invalid window {start_hour}-{end_hour}"
+    if interval_minutes <= 0:
+        return f"invalid interval {interval_minutes}"
+
+    now = _local_now(user, settings, now)
+    if not (start_hour * 60 <= now.hour * 60 + now.minute < end_hour * 60):
+        return f"outside reminder window now={now.hour}:{now.minute:02d} window={start_hour}-{end_hour}"
+    return None
+
+
+def _local_now(user: UserSnapshot, settings: Settings, now: datetime | None) -> datetime:
+    tz = ZoneInfo(user.timezone or settings.timezone)
+    return now.astimezone(tz) if now else datetime.now(tz)
+
+
+async def _deliver(bot: Bot, service: HydrationService, decision: ReminderDecision) -> None:
+    if decision.action is ReminderAction.CELEBRATE:
+        await _send_goal_reached(bot, decision.user_id, decision.consumed_ml, decision.target_ml)
+        await service.record_goal_notified(decision.user_id)
         return
 
-    tip = _time_of_day_tip(now.hour)
-    friendly_interval = format_interval(interval_minutes)
+    await bot.send_message(decision.user_id, _reminder_text(decision), reply_markup=reminder_actions_keyboard())
+    logger.info(
+        "event=reminder_sent user_id={user_id} target_ml={target_ml} consumed_ml={consumed_ml} start_hour={start} end_hour={end} interval_min={interval}",
+        user_id=decision.user_id,
+        target_ml=decision.target_ml,
+        consumed_ml=decision.consumed_ml,
+        start=decision.start_hour,
+        end=decision.end_hour,
+        interval=decision.interval_minutes,
+    )
 
-    try:
-        await bot.send_message(
-            user.telegram_id,
-            "💧 <b>Rappel hydratation</b>\n"
-            f"{_reminder_intro(start_hour, end_hour, friendly_interval)}\n"
-            f"• Astuce : <i>{tip}</i>\n"
-            f"{_reminder_humor()}\n"
-            f"Objectif du jour : <b>{format_volume_ml(target_ml)}</b>\n"
-            "👉 Appuie ci-dessous si tu viens de boire.\n"
-            "Besoin de couper les rappels du jour ? Va dans ⚙️ Réglages.",
-            reply_markup=reminder_actions_keyboard(),
-        )
-        logger.info(
-            "event=reminder_sent user_id={user_id} target_ml={target_ml} consumed_ml={consumed_ml} start_hour={start} end_hour={end} interval_min={interval}",
-            user_id=user.telegram_id,
-            target_ml=target_ml,
-            consumed_ml=consumed,
-            start=start_hour,
-            end=end_hour,
-            interval=interval_minutes,
-        )
-    except Exception as exc:  # noqa: BLE001 - log and continue
-        logger.error("Failed to send reminder to {user_id}: {error}", user_id=user.telegram_id, error=exc)
+
+def _reminder_text(decision: ReminderDecision) -> str:
+    tip = _time_of_day_tip(decision.local_hour)
+    friendly_interval = format_interval(decision.interval_minutes)
+    return (
+        "💧 <b>Rappel hydratation</b>\n"
+        f"{_reminder_intro(decision.start_hour, decision.end_hour, friendly_interval)}\n"
+        f"• Astuce : <i>{tip}</i>\n"
+        f"{_reminder_humor()}\n"
+        f"Objectif du jour : <b>{format_volume_ml(decision.target_ml)}</b>\n"
+        "👉 Appuie ci-dessous si tu viens de boire.\n"
+        "Besoin de couper les rappels du jour ? Va dans ⚙️ Réglages."
+    )
 
 
 def _is_valid_window(start: int, end: int) -> bool:
@@ -122,20 +309,22 @@ def _time_of_day_tip(hour: int) -> str:
 
 async def _send_goal_reached(bot: Bot, user_id: int, consumed_ml: int, target_ml: int) -> None:
     """Send a one-time celebratory message when the daily goal is hit."""
-    progress = format_progress(consumed_ml, target_ml)
-    text = (
-        "🎉 <b>Objectif atteint</b> !\n"
-        f"Total du jour : <b>{progress}</b>.\n"
-        "Les rappels sont coupés pour aujourd'hui.\n"
-        "Tu peux toujours enregistrer un verre supplémentaire si besoin 👇"
-    )
     logger.info(
         "event=goal_notified_reminder user_id={user_id} consumed_ml={consumed_ml} goal_ml={goal_ml}",
         user_id=user_id,
         consumed_ml=consumed_ml,
         goal_ml=target_ml,
     )
-    await bot.send_message(user_id, text, reply_markup=reminder_actions_keyboard())
+    await bot.send_message(user_id, _goal_reached_text(consumed_ml, target_ml), reply_markup=reminder_actions_keyboard())
+
+
+def _goal_reached_text(consumed_ml: int, target_ml: int) -> str:
+    return (
+        "🎉 <b>Objectif atteint</b> !\n"
+        f"Total du jour : <b>{format_progress(consumed_ml, target_ml)}</b>.\n"
+        "Les rappels sont coupés pour aujourd'hui.\n"
+        "Tu peux toujours enregistrer un verre supplémentaire si besoin 👇"
+    )
 
 
 def _reminder_intro(start_hour: int, end_hour: int, interval_text: str) -> str:
@@ -0,0 +1,101 @@
+"""In-process metrics for reminder fires: lag, run duration and outcomes."""
+
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from typing import Any, Iterable, Mapping
+
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, JobEvent
+from apscheduler.schedulers.base import BaseScheduler
+
+LAG_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Fixed-bucket histogram; each bucket counts observations up to its upper bound."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: Iterable[float]) -> None:
+        self.bounds = tuple(sorted(bounds))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Return the upper bound of the bucket holding the q-th observation (0 if empty)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 3),
+        }
+
+
+class ReminderMetrics:
+    """Counters and histograms describing how reminder fires behave.
+
+    One fire is one slot run (a group in jobs mode, a due minute in wheel mode):
+    its lag is the actual start minus the scheduled time, its duration covers
+    loading, deciding and sending. Outcomes are counted per user.
+    """
+
+    def __init__(self) -> None:
+        self.lag_seconds = Histogram(LAG_BUCKETS)
+        self.duration_seconds = Histogram(DURATION_BUCKETS)
+        self.outcomes: Counter[str] = Counter()
+        self.fires = 0
+        self.misfires = 0
+        self.overlaps = 0
+
+    def attach(self, scheduler: BaseScheduler) -> None:
+        """Count the fires APScheduler drops: too late (misfire) or still running (overlap)."""
+        scheduler.add_listener(self._on_job_event, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+
+    def record_fire(
+        self, scheduled: datetime, started: datetime, duration: float, outcomes: Mapping[str, int]
+    ) -> None:
+        self.fires += 1
+        self.lag_seconds.observe(max(0.0, (started - scheduled).total_seconds()))
+        self.duration_seconds.observe(duration)
+        self.outcomes.update(outcomes)
+
+    def record_misfire(self, count: int = 1) -> None:
+        self.misfires += count
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "fires": self.fires,
+            "misfires": self.misfires,
+            "overlaps": self.overlaps,
+            "lag_s": self.lag_seconds.snapshot(),
+            "duration_s": self.duration_seconds.snapshot(),
+            "outcomes": dict(self.outcomes),
+        }
+
+    def _on_job_event(self, event: JobEvent) -> None:
+        if event.code == EVENT_JOB_MISSED:
+            self.misfires += 1
+        else:
+            self.overlaps += 1
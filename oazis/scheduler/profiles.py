@@ -0,0 +1,126 @@
+"""Reminder profiles and the schedules shared by users with the same profile."""
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from enum import StrEnum
+from zoneinfo import ZoneInfo
+
+from .jobs import _is_valid_window
+from .triggers import ReminderWindowTrigger, compute_next_aligned_run
+
+
+class ActivityTier(StrEnum):
+    """How recently a user interacted; sparse tiers get fewer reminders."""
+
+    ACTIVE = "active"
+    DORMANT = "dormant"
+    INACTIVE = "inactive"
+
+
+@dataclass(frozen=True, slots=True)
+class ReminderProfile:
+    """Effective reminder settings of a user; users with equal settings share one instance.
+
+    Sparse tiers fire on `every_days` days only, those whose ordinal modulo
+    `every_days` is `day_phase`.
+    """
+
+    start_hour: int
+    end_hour: int
+    interval_minutes: int
+    timezone: str
+    tier: ActivityTier = ActivityTier.ACTIVE
+    every_days: int = 1
+    day_phase: int = 0
+
+    @property
+    def is_valid(self) -> bool:
+        return self.interval_minutes > 0 and _is_valid_window(self.start_hour, self.end_hour)
+
+    def next_run(self, now: datetime | None = None, offset_minutes: int = 0) -> datetime:
+        return compute_next_aligned_run(
+            self.start_hour,
+            self.end_hour,
+            self.interval_minutes,
+            self.timezone,
+            now=now,
+            offset_minutes=offset_minutes,
+            every_days=self.every_days,
+            day_phase=self.day_phase,
+        )
+
+    def trigger(self, offset_minutes: int = 0) -> ReminderWindowTrigger:
+        return ReminderWindowTrigger(
+            self.start_hour,
+            self.end_hour,
+            self.interval_minutes,
+            self.timezone,
+            offset_minutes,
+            self.every_days,
+            self.day_phase,
+        )
+
+
+ScheduleKey = tuple[ReminderProfile, int]
+
+
+class ProfileSchedule:
+    """Users sharing a profile and spread offset, fired together from one schedule.
+
+    The fire times of a local day are computed once and reused for every lookup
+    of that day.
+    """
+
+    __slots__ = ("profile", "offset_minutes", "members", "_tables")
+
+    def __init__(self, profile: ReminderProfile, offset_minutes: int = 0) -> None:
+        self.profile = profile
+        self.offset_minutes = offset_minutes
+        self.members: set[int] = set()
+        self._tables: dict[date, list[datetime]] = {}
+
+    @property
+    def key(self) -> ScheduleKey:
+        return self.profile, self.offset_minutes
+
+    def fire_table(self, day: date) -> list[datetime]:
+        """Return the slots of `day` on the profile's wall clock, oldest first."""
+        table = self._tables.get(day)
+        if table is None:
+            table = self._tables[day] = self._build_table(day)
+            # Lookups only ever need today and tomorrow.
+            for stale in [known for known in self._tables if known < day - timedelta(days=1)]:
+                del self._tables[stale]
+        return table
+
+    def next_fire(self, after: datetime) -> datetime:
+        """Return the first slot at or after `after`."""
+        local = after.astimezone(ZoneInfo(self.profile.timezone))
+        for day in (local.date(), local.date() + timedelta(days=1)):
+            table = self.fire_table(day)
+            index = bisect_left(table, local)
+            if index < len(table):
+                return table[index]
+        return self.profile.next_run(local, self.offset_minutes)
+
+    def previous_fire(self, at: datetime) -> datetime | None:
+        """Return the last slot at or before `at` (today or yesterday), if any."""
+        local = at.astimezone(ZoneInfo(self.profile.timezone))
+        for day in (local.date(), local.date() - timedelta(days=1)):
+            table = self.fire_table(day)
+            index = bisect_right(table, local)
+            if index:
+                return table[index - 1]
+        return None
+
+    def _build_table(self, day: date) -> list[datetime]:
+        tzinfo = ZoneInfo(self.profile.timezone)
+        cursor = datetime.combine(day, time(0), tzinfo=tzinfo)
+        table: list[datetime] = []
+        while True:
+            slot = self.profile.next_run(cursor, self.offset_minutes)
+            if slot.date() != day:
+                return table
+            table.append(slot)
+            cursor = slot + timedelta(minutes=1)
@@ -1,115 +1,556 @@
-"""Scheduler factory and per-user job registration."""
+"""Scheduler factory and reminder schedule registration."""
 
-from datetime import datetime, time, timedelta
-from math import ceil
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Awaitable, Callable
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
 from loguru import logger
 
 from oazis.config import Settings
+from oazis.db.models import epoch_now
+from oazis.services import UserSnapshot
 from oazis.services.hydration import HydrationService
 
-from .jobs import send_hydration_reminder_for_user, _is_valid_window
+from .jobs import send_hydration_reminders_for_slot
+from .metrics import ReminderMetrics
+from .profiles import ActivityTier, ProfileSchedule, ReminderProfile, ScheduleKey
+from .triggers import spread_offset_minutes
+from .wheel import ReminderDispatcher, minute_to_datetime
 
 
 def create_scheduler(settings: Settings) -> AsyncIOScheduler:
-    """Create an AsyncIOScheduler configured with the app timezone."""
-    return AsyncIOScheduler(timezone=settings.timezone)
+    """Create an AsyncIOScheduler configured with the app timezone and overload policies.
 
+    After an outage, coalescing turns the missed fires of a job into one run, the
+    misfire grace drops runs that would start too late, and max instances keeps
+    a slow run from being overlapped by the next fire.
+    """
+    return AsyncIOScheduler(
+        timezone=settings.timezone,
+        job_defaults={
+            "coalesce": settings.scheduler_coalesce,
+            "misfire_grace_time": settings.scheduler_misfire_grace_seconds,
+            "max_instances": settings.scheduler_max_instances,
+        },
+    )
 
-def compute_next_aligned_run(
-    start_hour: int,
-    end_hour: int,
-    interval_minutes: int,
-    timezone: str,
-    *,
-    now: datetime | None = None,
-) -> datetime:
-    """Return the next datetime aligned on the interval grid inside the window."""
-    current = (now or datetime.now(ZoneInfo(timezone))).replace(second=0, microsecond=0)
-    today = current.date()
-    tzinfo = ZoneInfo(timezone)
 
-    start_today = datetime.combine(today, time(hour=start_hour, minute=0, tzinfo=tzinfo))
-    end_today = datetime.combine(today, time(hour=end_hour, minute=0, tzinfo=tzinfo))
+class ReminderScheduler:
+    """Manage reminder schedules aligned on each user's interval grid.
 
-    if current < start_today:
-        return start_today
+    Users are grouped by reminder profile and spread offset. Each group has a
+    single schedule, so adding a user is a set insertion and a fire is one group
+    lookup followed by a bulk fan-out. Two dispatch modes are available
+    (``Settings.reminder_dispatcher``):
 
-    if start_today <= current < end_today:
-        minutes_since_start = (current - start_today).total_seconds() // 60
-        steps = ceil(minutes_since_start / interval_minutes)
-        candidate = start_today + timedelta(minutes=steps * interval_minutes)
-        if candidate < end_today:
-            return candidate
+    - ``jobs``: one APScheduler job per group, firing only inside the window.
+    - ``wheel``: a single minute tick pops due groups from a timing wheel.
 
-    tomorrow = today + timedelta(days=1)
-    return datetime.combine(tomorrow, time(hour=start_hour, minute=0, tzinfo=tzinfo))
+    With ``Settings.reminder_spread_fraction`` above zero, each user's grid is
+    delayed by a stable offset so users sharing a profile do not all fire at once.
 
+    With ``Settings.reminder_dormant_after_days`` set, users who have not
+    interacted for a while move to sparse tiers: one reminder a day (dormant),
+    then one every ``reminder_inactive_every_days`` days (inactive). Tiers are
+    re-evaluated nightly for the users whose idle time crossed a threshold
+    since the previous pass, and a user is back on their own grid as soon as they
+    interact again.
 
-class ReminderScheduler:
-    """Manage per-user reminder jobs with aligned schedules."""
+    Every fire is recorded in ``metrics`` (lag, duration, per-user outcomes).
+    """
+
+    METRICS_JOB_ID = "reminder_metrics_log"
+    # Settings every persisted schedule is derived from, stored under SETTINGS_STATE_KEY.
+    SCHEDULE_SETTINGS = (
+        "timezone",
+        "hydration_start_hour",
+        "hydration_end_hour",
+        "reminder_interval_minutes",
+        "reminder_spread_fraction",
+        "reminder_dormant_after_days",
+        "reminder_inactive_after_days",
+        "reminder_inactive_every_days",
+    )
+    SETTINGS_STATE_KEY = "reminder_schedule_settings"
+    RETIER_JOB_ID = "reminder_retier"
+    RETIER_STATE_KEY = "reminder_retier_last_run"
 
     def __init__(self, scheduler: AsyncIOScheduler, bot: Bot, service: HydrationService, settings: Settings) -> None:
         self.scheduler = scheduler
         self.bot = bot
         self.service = service
         self.settings = settings
+        self._interned: dict[ReminderProfile, ReminderProfile] = {}
+        self._groups: dict[ScheduleKey, ProfileSchedule] = {}
+        self._membership: dict[int, ProfileSchedule] = {}
+        self._suspended_until: dict[int, datetime] = {}
+        self.reschedules = 0
+        self.reschedules_skipped = 0
+        self.suspensions = 0
+        self.deactivations = 0
+        self.metrics = ReminderMetrics()
+        self.metrics.attach(scheduler)
+        if settings.scheduler_metrics_log_minutes:
+            scheduler.add_job(
+                self.log_metrics,
+                trigger="interval",
+                minutes=settings.scheduler_metrics_log_minutes,
+                id=self.METRICS_JOB_ID,
+                replace_existing=True,
+            )
+        if settings.reminder_dormant_after_days:
+            scheduler.add_job(
+                self.retier,
+                trigger="cron",
+                hour=3,
+                id=self.RETIER_JOB_ID,
+                replace_existing=True,
+            )
+        self.dispatcher: ReminderDispatcher | None = None
+        if settings.reminder_dispatcher == "wheel":
+            self.dispatcher = ReminderDispatcher(scheduler, self._handle_due)
+            self.dispatcher.start()
 
     async def schedule_for_user(self, user_id: int) -> None:
-        """Create or replace a reminder job for a single user."""
-        user = await self.service.ensure_user(user_id)
-        start_hour = user.reminder_start_hour or self.settings.hydration_start_hour
-        end_hour = user.reminder_end_hour or self.settings.hydration_end_hour
-        interval_minutes = user.reminder_interval_minutes or self.settings.reminder_interval_minutes
-        timezone = user.timezone or self.settings.timezone
-
-        if interval_minutes <= 0 or not _is_valid_window(start_hour, end_hour):
+        """Attach a user to the schedule of their reminder profile.
+
+        The (profile, offset) key doubles as the schedule fingerprint: when it is
+        unchanged since the last call, nothing is done.
+        """
+        schedule = self._assign(await self.service.ensure_user(user_id))
+        if schedule is not None:
+            await self.service.save_reminder_schedules([schedule])
+
+    def _assign(self, user: UserSnapshot, *, bulk: bool = False) -> dict[str, Any] | None:
+        """Attach a user to the group of their profile; return the row to persist if it changed."""
+        user_id = user.telegram_id
+        profile = self._intern(
+            self._tiered(
+                ReminderProfile(
+                    start_hour=user.reminder_start_hour or self.settings.hydration_start_hour,
+                    end_hour=user.reminder_end_hour or self.settings.hydration_end_hour,
+                    interval_minutes=user.reminder_interval_minutes or self.settings.reminder_interval_minutes,
+                    timezone=user.timezone or self.settings.timezone,
+                ),
+                user_id,
+                self._tier(user),
+            )
+        )
+
+        if not profile.is_valid:
             logger.warning(
                 "Skip scheduling for user {user_id}: invalid config start={start} end={end} interval_min={interval}",
                 user_id=user_id,
-                start=start_hour,
-                end=end_hour,
-                interval=interval_minutes,
+                start=profile.start_hour,
+                end=profile.end_hour,
+                interval=profile.interval_minutes,
             )
-            return
+            return None
+
+        key = (profile, self._offset(user_id, profile))
+        current = self._membership.get(user_id)
+        if current is not None and current.key == key:
+            self.reschedules_skipped += 1
+            return None
+
+        if current is not None:
+            self._detach(user_id, current)
+        group = self._attach(user_id, key)
+        self.reschedules += 1
+        if not bulk:
+            logger.info(
+                "Scheduled reminders for user {user_id}: every {interval} minutes between {start}:00 and {end}:00 (tz={tz}) – next at {next}",
+                user_id=user_id,
+                interval=profile.interval_minutes,
+                start=profile.start_hour,
+                end=profile.end_hour,
+                tz=profile.timezone,
+                next=group.next_fire(datetime.now(ZoneInfo(profile.timezone))).isoformat(),
+            )
+        return {
+            "user_id": user_id,
+            "start_hour": profile.start_hour,
+            "end_hour": profile.end_hour,
+            "interval_minutes": profile.interval_minutes,
+            "timezone": profile.timezone,
+            "offset_minutes": key[1],
+            "suspended_until": _epoch(self._suspended_until.get(user_id)),
+            "tier": None if profile.tier is ActivityTier.ACTIVE else profile.tier.value,
+        }
+
+    def _tier(self, user: UserSnapshot) -> ActivityTier:
+        """Classify a user by days since their last interaction (or signup)."""
+        if not self.settings.reminder_dormant_after_days:
+            return ActivityTier.ACTIVE
+        if user.last_active_at is not None:
+            last_active = user.last_active_at
+        else:
+            last_active = int(user.created_at.replace(tzinfo=timezone.utc).timestamp())
+        idle_days = (time.time() - last_active) / 86400
+        if idle_days >= self.settings.reminder_inactive_after_days:
+            return ActivityTier.INACTIVE
+        if idle_days >= self.settings.reminder_dormant_after_days:
+            return ActivityTier.DORMANT
+        return ActivityTier.ACTIVE
+
+    def _tiered(self, profile: ReminderProfile, user_id: int, tier: ActivityTier) -> ReminderProfile:
+        """Return the sparse variant of `profile` for `tier`: a single slot at the window start.
+
+        Inactive users are spread over the `every_days` days by id, so the weekly
+        reminders do not all land on the same day.
+        """
+        if tier is ActivityTier.ACTIVE:
+            return profile
+        every_days = 1 if tier is ActivityTier.DORMANT else self.settings.reminder_inactive_every_days
+        return ReminderProfile(
+            profile.start_hour,
+            profile.end_hour,
+            (profile.end_hour - profile.start_hour) * 60,
+            profile.timezone,
+            tier,
+            every_days,
+            user_id % every_days,
+        )
+
+    async def restore(self, page_size: int = 5000) -> int:
+        """Rebuild the schedules persisted by a previous run; returns the number of users.
+
+        Reads the schedule table page by page and attaches users to their groups
+        without touching the user rows, so startup cost does not depend on user
+        preferences being re-read.
+        """
+        now = datetime.now(timezone.utc)
+        restored = 0
+        after = 0
+        while rows := await self.service.list_reminder_schedules(after, page_size):
+            for row in rows:
+                profile = ReminderProfile(row.start_hour, row.end_hour, row.interval_minutes, row.timezone)
+                # With tiering turned off, sparse schedules from an earlier run are dropped.
+                if row.tier is not None and self.settings.reminder_dormant_after_days:
+                    profile = self._tiered(profile, row.user_id, ActivityTier(row.tier))
+                profile = self._intern(profile)
+                if not profile.is_valid:
+                    continue
+                self._attach(row.user_id, (profile, row.offset_minutes))
+                if row.suspended_until and row.suspended_until > now.timestamp():
+                    self._suspended_until[row.user_id] = datetime.fromtimestamp(row.suspended_until, timezone.utc)
+                restored += 1
+            after = rows[-1].user_id
+        logger.info("event=reminder_schedules_restored users={users} groups={groups}", users=restored, groups=len(self._groups))
+        return restored
+
+    async def reconcile(self, page_size: int = 500) -> int:
+        """Bring persisted schedules in line with the current settings, after `restore`.
+
+        When the settings schedules are derived from changed since they were
+        written, every user is rescheduled; otherwise only users without a
+        schedule are. The fingerprint is saved once the pass has completed, so an
+        interrupted reschedule runs again on the next start. Returns the number of
+        users processed.
+        """
+        fingerprint = self.settings_fingerprint()
+        if await self.service.get_app_state(self.SETTINGS_STATE_KEY) == fingerprint:
+            return await self.schedule_unscheduled_users(page_size)
+        logger.info("event=reminder_settings_changed settings={settings}", settings=fingerprint)
+        done = await self.schedule_for_all_users(page_size)
+        await self.service.set_app_state(self.SETTINGS_STATE_KEY, fingerprint)
+        return done
+
+    def settings_fingerprint(self) -> str:
+        return json.dumps({name: getattr(self.settings, name) for name in self.SCHEDULE_SETTINGS}, sort_keys=True)
+
+    async def schedule_unscheduled_users(self, page_size: int = 500) -> int:
+        """Schedule users that have no persisted schedule yet, one page at a time.
+
+        Meant to run in the background once polling has started; returns the number
+        of users scheduled.
+        """
+        return await self._schedule_pages(self.service.list_unscheduled_users, page_size, "reminder_backfill")
+
+    async def retier(self, page_size: int = 500) -> int:
+        """Move users whose idle time crossed a tier threshold since the last pass.
+
+        Only users whose last interaction aged past the dormant or inactive
+        threshold between the previous pass and now are loaded and reassigned,
+        instead of every user as in a full reschedule. The first pass, with
+        nothing recorded yet, covers every user.
+        Returns the number of users processed.
+        """
+        now = epoch_now()
+        last_run = await self.service.get_app_state(self.RETIER_STATE_KEY)
+        if last_run is None:
+            done = await self.schedule_for_all_users(page_size)
+        else:
+            windows = [
+                (int(last_run) - days * 86400, now - days * 86400)
+                for days in (self.settings.reminder_dormant_after_days, self.settings.reminder_inactive_after_days)
+            ]
+            done = await self._schedule_pages(
+                partial(self.service.list_users_idle_between, windows), page_size, "reminder_retier"
+            )
+        await self.service.set_app_state(self.RETIER_STATE_KEY, str(now))
+        return done
+
+    async def schedule_for_all_users(self, page_size: int = 500) -> int:
+        """Create or replace the reminder schedule of every known user.
 
-        next_run = compute_next_aligned_run(start_hour, end_hour, interval_minutes, timezone)
-        job_id = self._job_id(user_id)
-
-        self.scheduler.add_job(
-            send_hydration_reminder_for_user,
-            trigger=IntervalTrigger(
-                minutes=interval_minutes,
-                start_date=next_run,
-                timezone=ZoneInfo(timezone),
-            ),
-            args=[self.bot, self.service, self.settings, user_id],
-            id=job_id,
-            replace_existing=True,
+        Only needed for full reschedules (config changes, migrations). Users are
+        streamed in keyset pages; each page is assigned in memory and persisted with
+        one bulk upsert, with at most `Settings.reminder_reschedule_concurrency`
+        page writes in flight. Cancelling the call stops it between pages after the
+        in-flight writes have finished; users already done keep their new schedule.
+        """
+        return await self._schedule_pages(self.service.list_users_page, page_size, "reminder_reschedule")
+
+    async def _schedule_pages(
+        self,
+        fetch_page: Callable[[int, int], Awaitable[list[UserSnapshot]]],
+        page_size: int,
+        event: str,
+    ) -> int:
+        writes = asyncio.Semaphore(self.settings.reminder_reschedule_concurrency)
+        pending: set[asyncio.Task] = set()
+        started = time.perf_counter()
+        done = 0
+        after = 0
+
+        def release(task: asyncio.Task) -> None:
+            pending.discard(task)
+            writes.release()
+
+        try:
+            while users := await fetch_page(after, page_size):
+                schedules = [schedule for user in users if (schedule := self._assign(user, bulk=True)) is not None]
+                await writes.acquire()
+                task = asyncio.create_task(self.service.save_reminder_schedules(schedules))
+                pending.add(task)
+                task.add_done_callback(release)
+                done += len(users)
+                after = users[-1].telegram_id
+                logger.info(
+                    "event={event}_progress users={users} last_user_id={after} elapsed_s={elapsed:.1f}",
+                    event=event,
+                    users=done,
+                    after=after,
+                    elapsed=time.perf_counter() - started,
+                )
+        except asyncio.CancelledError:
+            logger.warning("event={event}_cancelled users={users} last_user_id={after}", event=event, users=done, after=after)
+            raise
+        finally:
+            # Never leave a half-written page behind, even when cancelled.
+            await asyncio.shield(asyncio.gather(*pending))
+
+        logger.info(
+            "event={event}_done users={users} elapsed_s={elapsed:.1f}",
+            event=event,
+            users=done,
+            elapsed=time.perf_counter() - started,
         )
+        return done
+
+    async def suspend_for_today(self, *user_ids: int) -> None:
+        """Skip each user's remaining reminders until their local midnight.
+
+        Used once a user has paused reminders or reached the goal, so the rest of
+        the day costs them nothing but a dict lookup per group fire.
+        """
+        persisted: dict[int, int | None] = {}
+        for user_id in user_ids:
+            group = self._membership.get(user_id)
+            if group is None:
+                continue
+            local_now = datetime.now(ZoneInfo(group.profile.timezone))
+            midnight = (local_now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            self._suspended_until[user_id] = midnight
+            persisted[user_id] = _epoch(midnight)
+            self.suspensions += 1
+        await self.service.set_reminders_suspended_until(persisted)
+
+    async def resume_today(self, user_id: int) -> None:
+        """Let a suspended user receive the next aligned slot of today."""
+        if user_id not in self._membership:
+            await self.schedule_for_user(user_id)
+            return
+        if self._suspended_until.pop(user_id, None) is not None:
+            await self.service.set_reminders_suspended_until({user_id: None})
+
+    async def deactivate_user(self, user_id: int) -> None:
+        """Stop every reminder of a user whose chat is gone (bot blocked, account deleted)."""
+        await self.service.set_user_blocked(user_id, True)
+        group = self._membership.get(user_id)
+        if group is not None:
+            self._detach(user_id, group)
+        self._suspended_until.pop(user_id, None)
+        await self.service.delete_reminder_schedule(user_id)
+        self.deactivations += 1
+        logger.info("event=user_deactivated user_id={user_id}", user_id=user_id)
+
+    async def reactivate_user(self, user_id: int) -> None:
+        """Bring back a deactivated user who talked to the bot again."""
+        await self.service.set_user_blocked(user_id, False)
+        await self.schedule_for_user(user_id)
+        logger.info("event=user_reactivated user_id={user_id}", user_id=user_id)
+
+    def tier_of(self, user_id: int) -> ActivityTier | None:
+        """Return the activity tier a user is currently scheduled in, if scheduled."""
+        group = self._membership.get(user_id)
+        return None if group is None else group.profile.tier
+
+    def next_run(self, user_id: int, now: datetime | None = None) -> datetime | None:
+        """Return the next time a reminder will be considered for the user."""
+        group = self._membership.get(user_id)
+        if group is None:
+            return None
+        after = now or datetime.now(ZoneInfo(group.profile.timezone))
+        suspended_until = self._suspended_until.get(user_id)
+        if suspended_until is not None and suspended_until > after:
+            after = suspended_until
+        return group.next_fire(after)
+
+    def stats(self) -> dict[str, int]:
+        tiers = dict.fromkeys(ActivityTier, 0)
+        for group in self._groups.values():
+            tiers[group.profile.tier] += len(group.members)
+        return {
+            "scheduled": len(self._membership),
+            "profiles": len(self._interned),
+            "groups": len(self._groups),
+            "reschedules": self.reschedules,
+            "skipped": self.reschedules_skipped,
+            "suspended": self.suspensions,
+            "deactivated": self.deactivations,
+            **{f"tier_{tier}": count for tier, count in tiers.items()},
+        }
+
+    def _attach(self, user_id: int, key: ScheduleKey) -> ProfileSchedule:
+        group = self._groups.get(key) or self._add_group(*key)
+        group.members.add(user_id)
+        self._membership[user_id] = group
+        return group
+
+    def _add_group(self, profile: ReminderProfile, offset_minutes: int) -> ProfileSchedule:
+        group = self._groups[(profile, offset_minutes)] = ProfileSchedule(profile, offset_minutes)
+        if self.dispatcher is not None:
+            self.dispatcher.schedule(group.key, group.next_fire(datetime.now(ZoneInfo(profile.timezone))))
+        else:
+            self.scheduler.add_job(
+                self._fire_group,
+                trigger=profile.trigger(offset_minutes),
+                args=[group.key],
+                id=self._job_id(group.key),
+                replace_existing=True,
+            )
+        return group
+
+    def _detach(self, user_id: int, group: ProfileSchedule) -> None:
+        group.members.discard(user_id)
+        del self._membership[user_id]
+        if group.members:
+            return
+        del self._groups[group.key]
+        if self.dispatcher is not None:
+            self.dispatcher.cancel(group.key)
+        else:
+            self.scheduler.remove_job(self._job_id(group.key))
+
+    def log_metrics(self) -> None:
+        stats = self.stats()
         logger.info(
-            "Scheduled reminders for user {user_id}: every {interval} minutes between {start}:00 and {end}:00 (tz={tz}) – next at {next}",
-            user_id=user_id,
-            interval=interval_minutes,
-            start=start_hour,
-            end=end_hour,
-            tz=timezone,
-            next=next_run.isoformat(),
+            "event=reminder_metrics {metrics} tiers={tiers}",
+            metrics=self.metrics.snapshot(),
+            tiers={tier.value: stats[f"tier_{tier}"] for tier in ActivityTier},
         )
 
-    async def schedule_for_all_users(self) -> None:
-        """Create or replace reminder jobs for every known user."""
-        users = await self.service.list_users()
-        if not users:
-            logger.info("No users to schedule reminders for.")
+    async def _fire_group(self, key: ScheduleKey) -> None:
+        """Job callback (jobs mode): fan one group's slot out to its members."""
+        group = self._groups.get(key)
+        if group is not None:
+            started = datetime.now(ZoneInfo(group.profile.timezone))
+            await self._send_slot([group], started, group.previous_fire(started) or started)
+
+    async def _handle_due(self, minute: int, keys: set[ScheduleKey], now: datetime | None = None) -> None:
+        """Wheel callback: re-arm each due group, then run their members as one slot.
+
+        A bucket popped later than the misfire grace (the bot was down or the loop
+        stalled) is dropped and its groups re-armed from now, so an outage does not
+        end with a burst replaying every missed slot.
+        """
+        fired_at = minute_to_datetime(minute)
+        now = now or datetime.now(timezone.utc)
+        groups = [self._groups[key] for key in keys if key in self._groups]
+        misfired = (now - fired_at).total_seconds() > self.settings.scheduler_misfire_grace_seconds
+        rearm_after = now if misfired else fired_at + timedelta(minutes=1)
+        for group in groups:
+            self.dispatcher.schedule(group.key, group.next_fire(rearm_after))
+        if misfired:
+            self.metrics.record_misfire(len(groups))
+            logger.warning(
+                "event=reminder_misfire scheduled={scheduled} lag_s={lag:.0f} groups={groups}",
+                scheduled=fired_at.isoformat(),
+                lag=(now - fired_at).total_seconds(),
+                groups=len(groups),
+            )
             return
+        await self._send_slot(groups, fired_at, fired_at)
+
+    async def _send_slot(self, groups: list[ProfileSchedule], fired_at: datetime, scheduled: datetime) -> None:
+        started = datetime.now(timezone.utc)
+        clock = time.perf_counter()
+        user_ids = [
+            user_id
+            for group in groups
+            for user_id in group.members
+            if not self._is_suspended(user_id, fired_at)
+        ]
+        outcomes: dict[str, int] = {}
+        try:
+            if user_ids:
+                outcomes = await send_hydration_reminders_for_slot(
+                    self.bot,
+                    self.service,
+                    self.settings,
+                    user_ids,
+                    now=fired_at,
+                    on_done_for_today=self.suspend_for_today,
+                )
+        except Exception:
+            outcomes = {"error": len(user_ids)}
+            raise
+        finally:
+            self.metrics.record_fire(scheduled, started, time.perf_counter() - clock, outcomes)
+
+    def _is_suspended(self, user_id: int, at: datetime) -> bool:
+        until = self._suspended_until.get(user_id)
+        if until is None:
+            return False
+        if until <= at:
+            del self._suspended_until[user_id]
+            return False
+        return True
+
+    def _offset(self, user_id: int, profile: ReminderProfile) -> int:
+        return spread_offset_minutes(user_id, profile.interval_minutes, self.settings.reminder_spread_fraction)
+
+    def _intern(self, profile: ReminderProfile) -> ReminderProfile:
+        return self._interned.setdefault(profile, profile)
+
+    def _job_id(self, key: ScheduleKey) -> str:
+        profile, offset = key
+        job_id = (
+            f"hydration_reminder_{profile.start_hour}-{profile.end_hour}"
+            f"_{profile.interval_minutes}min_{profile.timezone}_+{offset}"
+        )
+        if profile.tier is not ActivityTier.ACTIVE:
+            job_id += f"_{profile.tier}_{profile.day_phase}/{profile.every_days}d"
+        return job_id
 
-        for user in users:
-            await self.schedule_for_user(user.telegram_id)
 
-    def _job_id(self, user_id: int) -> str:
-        return f"hydration_reminder_user_{user_id}"
+def _epoch(moment: datetime | None) -> int | None:
+    return None if moment is None else int(moment.timestamp())
@@ -0,0 +1,158 @@
+"""APScheduler triggers for reminder schedules."""
+
+from datetime import datetime, time, timedelta
+from math import ceil
+from zoneinfo import ZoneInfo
+
+from apscheduler.triggers.base import BaseTrigger
+
+
+def compute_next_aligned_run(
+    start_hour: int,
+    end_hour: int,
+    interval_minutes: int,
+    timezone: str,
+    *,
+    now: datetime | None = None,
+    offset_minutes: int = 0,
+    every_days: int = 1,
+    day_phase: int = 0,
+) -> datetime:
+    """Return the next datetime aligned on the interval grid inside the window.
+
+    `now` may be in any timezone; the window is evaluated on the user's wall clock.
+    `offset_minutes` shifts the whole grid later (see `spread_offset_minutes`).
+    With `every_days` above 1, only days whose ordinal modulo `every_days` equals
+    `day_phase` have slots (sparse schedules of dormant users).
+    """
+    candidate = _next_daily_run(start_hour, end_hour, interval_minutes, timezone, now, offset_minutes)
+    skip = (day_phase - candidate.date().toordinal()) % every_days
+    if skip:
+        midnight = datetime.combine(candidate.date() + timedelta(days=skip), time(0), tzinfo=candidate.tzinfo)
+        candidate = _next_daily_run(start_hour, end_hour, interval_minutes, timezone, midnight, offset_minutes)
+    return candidate
+
+
+def _next_daily_run(
+    start_hour: int,
+    end_hour: int,
+    interval_minutes: int,
+    timezone: str,
+    now: datetime | None,
+    offset_minutes: int,
+) -> datetime:
+    tzinfo = ZoneInfo(timezone)
+    current = (now or datetime.now(tzinfo)).astimezone(tzinfo).replace(second=0, microsecond=0)
+    today = current.date()
+    # The first slot must stay inside the window, however short it is.
+    offset = timedelta(minutes=min(offset_minutes, (end_hour - start_hour) * 60 - 1))
+
+    start_today = datetime.combine(today, time(hour=start_hour, minute=0, tzinfo=tzinfo)) + offset
+    # end_hour may be 24 (window open until midnight).
+    end_today = datetime.combine(today, time(0, tzinfo=tzinfo)) + timedelta(hours=end_hour)
+
+    if current < start_today:
+        return start_today
+
+    if start_today <= current < end_today:
+        minutes_since_start = (current - start_today).total_seconds() // 60
+        steps = ceil(minutes_since_start / interval_minutes)
+        candidate = start_today + timedelta(minutes=steps * interval_minutes)
+        if candidate < end_today:
+            return candidate
+
+    tomorrow = today + timedelta(days=1)
+    return datetime.combine(tomorrow, time(hour=start_hour, minute=0, tzinfo=tzinfo)) + offset
+
+
+def spread_offset_minutes(user_id: int, interval_minutes: int, fraction: float) -> int:
+    """Stable per-user delay within the first `fraction` of the interval.
+
+    Users sharing a grid are spread over several minutes instead of all firing in
+    the same one, and each user keeps the same offset across restarts.
+    """
+    span = int(interval_minutes * fraction)
+    if span <= 0:
+        return 0
+    # Knuth's multiplicative hash: consecutive ids land far apart.
+    return (user_id * 2654435761) % 2**32 * (span + 1) >> 32
+
+
+class ReminderWindowTrigger(BaseTrigger):
+    """Fire on the interval grid inside the daily window only.
+
+    After the last slot of the day the next fire time is tomorrow's window start,
+    so nights cost no wakeups. Slots are computed on the user's wall clock and
+    therefore follow DST changes.
+    """
+
+    def __init__(
+        self,
+        start_hour: int,
+        end_hour: int,
+        interval_minutes: int,
+        timezone: str,
+        offset_minutes: int = 0,
+        every_days: int = 1,
+        day_phase: int = 0,
+    ) -> None:
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.interval_minutes = interval_minutes
+        self.timezone = ZoneInfo(timezone)
+        self.offset_minutes = offset_minutes
+        self.every_days = every_days
+        self.day_phase = day_phase
+        self.jitter = None
+
+    def get_next_fire_time(self, previous_fire_time: datetime | None, now: datetime) -> datetime:
+        # A slot that just fired must not be returned again, nor one already in the past.
+        after = now if previous_fire_time is None else max(now, previous_fire_time + timedelta(minutes=1))
+        if after.second or after.microsecond:
+            after = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        return compute_next_aligned_run(
+            self.start_hour,
+            self.end_hour,
+            self.interval_minutes,
+            self.timezone.key,
+            now=after,
+            offset_minutes=self.offset_minutes,
+            every_days=self.every_days,
+            day_phase=self.day_phase,
+        )
+
+    def __getstate__(self) -> dict:
+        return {
+            "version": 2,
+            "start_hour": self.start_hour,
+            "end_hour": self.end_hour,
+            "interval_minutes": self.interval_minutes,
+            "timezone": self.timezone.key,
+            "offset_minutes": self.offset_minutes,
+            "every_days": self.every_days,
+            "day_phase": self.day_phase,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(
+            state["start_hour"],
+            state["end_hour"],
+            state["interval_minutes"],
+            state["timezone"],
+            state.get("offset_minutes", 0),
+            state.get("every_days", 1),
+            state.get("day_phase", 0),
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"reminder_window[{self.start_hour}h-{self.end_hour}h every {self.interval_minutes}min"
+            f" +{self.offset_minutes}min every {self.every_days}d]"
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} (start_hour={self.start_hour}, end_hour={self.end_hour}, "
+            f"interval_minutes={self.interval_minutes}, timezone='{self.timezone.key}', "
+            f"offset_minutes={self.offset_minutes}, every_days={self.every_days}, day_phase={self.day_phase})>"
+        )
@@ -0,0 +1,138 @@
+"""Minute-granularity timing wheel driving reminders from a single tick job."""
+
+import heapq
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Hashable
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from loguru import logger
+
+DueHandler = Callable[[int, set[Hashable]], Awaitable[None]]
+
+
+def epoch_minute(moment: datetime) -> int:
+    """Whole minutes since the Unix epoch for an aware datetime."""
+    return int(moment.timestamp()) // 60
+
+
+def minute_to_datetime(minute: int) -> datetime:
+    return datetime.fromtimestamp(minute * 60, tz=timezone.utc)
+
+
+class TimingWheel:
+    """Buckets of members (user ids, schedule keys) keyed by the epoch minute they are due.
+
+    Scheduling, cancelling and popping are O(1) per member plus O(log B) per
+    bucket, where B is the number of distinct pending minutes.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: dict[int, set[Hashable]] = {}
+        self._minutes: list[int] = []
+        self._due_minute: dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._due_minute)
+
+    def __contains__(self, member: Hashable) -> bool:
+        return member in self._due_minute
+
+    @property
+    def bucket_count(self) -> int:
+        return len(self._buckets)
+
+    def due_minute(self, member: Hashable) -> int | None:
+        return self._due_minute.get(member)
+
+    def schedule(self, member: Hashable, minute: int) -> None:
+        """Place `member` in the bucket for `minute`, moving it if already scheduled."""
+        current = self._due_minute.get(member)
+        if current == minute:
+            return
+        if current is not None:
+            self._discard(member, current)
+
+        bucket = self._buckets.get(minute)
+        if bucket is None:
+            bucket = self._buckets[minute] = set()
+            heapq.heappush(self._minutes, minute)
+        bucket.add(member)
+        self._due_minute[member] = minute
+
+    def cancel(self, member: Hashable) -> bool:
+        minute = self._due_minute.pop(member, None)
+        if minute is None:
+            return False
+        self._remove_from_bucket(member, minute)
+        return True
+
+    def pop_due(self, now_minute: int) -> list[tuple[int, set[Hashable]]]:
+        """Remove and return every bucket due at or before `now_minute`, oldest first."""
+        due: list[tuple[int, set[Hashable]]] = []
+        while self._minutes and self._minutes[0] <= now_minute:
+            minute = heapq.heappop(self._minutes)
+            members = self._buckets.pop(minute, None)
+            if not members:
+                continue
+            for member in members:
+                del self._due_minute[member]
+            due.append((minute, members))
+        return due
+
+    def _discard(self, member: Hashable, minute: int) -> None:
+        del self._due_minute[member]
+        self._remove_from_bucket(member, minute)
+
+    def _remove_from_bucket(self, member: Hashable, minute: int) -> None:
+        bucket = self._buckets.get(minute)
+        if bucket is None:
+            return
+        bucket.discard(member)
+        if not bucket:
+            # The heap entry is skipped lazily by pop_due.
+            del self._buckets[minute]
+
+
+class ReminderDispatcher:
+    """Fire due members in bulk from one APScheduler job ticking every minute."""
+
+    JOB_ID = "reminder_wheel_tick"
+
+    def __init__(self, scheduler: AsyncIOScheduler, handle_due: DueHandler) -> None:
+        self.scheduler = scheduler
+        self.handle_due = handle_due
+        self.wheel = TimingWheel()
+
+    def start(self) -> None:
+        """Register the minute tick on the scheduler."""
+        self.scheduler.add_job(
+            self.tick,
+            trigger=CronTrigger(second=0),
+            id=self.JOB_ID,
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+
+    def schedule(self, member: Hashable, when: datetime) -> None:
+        self.wheel.schedule(member, epoch_minute(when))
+
+    def cancel(self, member: Hashable) -> bool:
+        return self.wheel.cancel(member)
+
+    def next_run(self, member: Hashable) -> datetime | None:
+        minute = self.wheel.due_minute(member)
+        return None if minute is None else minute_to_datetime(minute)
+
+    async def tick(self, now: datetime | None = None) -> None:
+        """Pop every bucket that is due and hand each one to the reminder job."""
+        now_minute = epoch_minute(now or datetime.now(timezone.utc))
+        for minute, members in self.wheel.pop_due(now_minute):
+            logger.debug(
+                "event=reminder_wheel_due minute={minute} members={count} lag_min={lag}",
+                minute=minute_to_datetime(minute).isoformat(),
+                count=len(members),
+                lag=now_minute - minute,
+            )
+            await self.handle_due(minute, members)
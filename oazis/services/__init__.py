@@ -1,6 +1,7 @@
 """Business services."""
 
-from .hydration import HydrationService
+from .hydration import HydrationService, HydrationStats, ReminderContext
+from .user_cache import UserCache, UserSnapshot
 
-__all__ = ["HydrationService"]
+__all__ = ["HydrationService", "HydrationStats", "ReminderContext", "UserCache", "UserSnapshot"]
 
@@ -1,17 +1,42 @@
 """Domain services for hydration tracking."""
 
 import asyncio
-from dataclasses import dataclass
-from datetime import date, datetime, time, timedelta
-from typing import List
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Iterator, List, TypeVar
+from zoneinfo import ZoneInfo
 
+from sqlalchemy import and_, bindparam, delete, or_, tuple_, update
 from sqlalchemy.engine import Engine
-from sqlmodel import Session, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from loguru import logger
 from oazis.config import Settings
-from oazis.db import DailyHydration, HydrationEvent, User
-from oazis.db.session import session_scope
+from oazis.db import (
+    AppState,
+    DailyHydration,
+    EventType,
+    HydrationEvent,
+    HydrationRollup,
+    OutboxMessage,
+    ReminderSchedule,
+    User,
+    UserDayState,
+)
+from oazis.db.models import epoch_now, utc_now
+from oazis.db.session import dialect_insert, session_scope
+
+from .user_cache import UserCache, UserSnapshot
+from .write_queue import WriteQueue
+
+T = TypeVar("T")
+
+# Keeps IN (...) lists well under SQLite's bound-parameter limit.
+BULK_CHUNK_SIZE = 500
+# Activity is only needed to the day for tiering: one write per user per hour at most.
+ACTIVITY_RESOLUTION_SECONDS = 3600
 
 
 @dataclass
@@ -24,197 +49,660 @@ class HydrationStats:
     today_goal_ml: int
 
 
+@dataclass(frozen=True, slots=True)
+class ReminderContext:
+    """Everything a reminder decision needs for one user today."""
+
+    user: UserSnapshot
+    today_entry: DailyHydration | None
+    reminders_paused: bool
+    goal_notified: bool
+
+
 class HydrationService:
-    """Simple service layer orchestrating hydration persistence and rules."""
+    """Simple service layer orchestrating hydration persistence and rules.
+
+    Each operation is written once against a synchronous `Session`. It runs on the
+    default thread pool, or natively on the event loop through `AsyncSession.run_sync`
+    when an `AsyncEngine` is provided. Glass logs and daily flags can additionally be
+    group-committed through a `WriteQueue`. User preferences are served from a
+    read-through `UserCache` of immutable snapshots.
+    """
 
-    def __init__(self, engine: Engine, settings: Settings) -> None:
+    def __init__(self, engine: Engine, settings: Settings, async_engine: AsyncEngine | None = None) -> None:
         self.engine = engine
         self.settings = settings
+        self.async_engine = async_engine
+        self.user_cache = UserCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+        self.write_queue: WriteQueue | None = None
+        if settings.write_queue_enabled:
+            self.write_queue = WriteQueue(
+                self._write,
+                max_batch=settings.write_queue_max_batch,
+                flush_interval=settings.write_queue_flush_ms / 1000,
+            )
+
+    async def close(self) -> None:
+        """Flush queued writes. Call before disposing the engines on shutdown."""
+        if self.write_queue is not None:
+            await self.write_queue.close()
 
-    async def ensure_user(self, telegram_id: int) -> User:
+    async def ensure_user(self, telegram_id: int) -> UserSnapshot:
         """Return an existing user or create one with default settings."""
-        return await asyncio.to_thread(self._ensure_user_sync, telegram_id)
+        cached = self.user_cache.get(telegram_id)
+        if cached is not None:
+            return cached
 
-    def _ensure_user_sync(self, telegram_id: int) -> User:
-        with session_scope(self.engine) as session:
-            return self._get_or_create_user(session, telegram_id)
+        snapshot = UserSnapshot.from_user(await self._write(self._get_or_create_user, telegram_id))
+        self.user_cache.put(snapshot, replace=False)
+        return snapshot
 
     async def record_glass(self, telegram_id: int, volume_ml: int = 250) -> DailyHydration:
         """Increment today's hydration entry for a user."""
-        return await asyncio.to_thread(self._record_glass_sync, telegram_id, volume_ml)
-
-    def _record_glass_sync(self, telegram_id: int, volume_ml: int) -> DailyHydration:
-        today = date.today()
-        with session_scope(self.engine) as session:
-            user = self._get_or_create_user(session, telegram_id)
-            target_glasses = user.daily_target_glasses or self.settings.default_daily_glasses
-            target = user.daily_target_ml or target_glasses * self.settings.glass_volume_ml
-
-            stmt = select(DailyHydration).where(
-                DailyHydration.user_id == telegram_id, DailyHydration.date == today
+        user_known = telegram_id in self.user_cache
+        today = await self.local_today(telegram_id)
+        return await self._queued_write(self._record_glass, telegram_id, volume_ml, user_known, today)
+
+    def _record_glass(
+        self, session: Session, telegram_id: int, volume_ml: int, user_known: bool, today: date
+    ) -> DailyHydration:
+        """Log a glass with a single upsert so concurrent taps never lose an increment."""
+        now = utc_now()
+        if not user_known:
+            self._insert_user_if_missing(session, telegram_id)
+
+        insert = dialect_insert(session, DailyHydration)
+        stmt = (
+            insert.values(
+                user_id=telegram_id,
+                date=today,
+                goal_ml=self._user_goal_subquery(telegram_id),
+                consumed_ml=volume_ml,
+                updated_at=now,
             )
-            entry = session.exec(stmt).first()
-            if not entry:
-                entry = DailyHydration(user_id=telegram_id, date=today, goal_ml=target)
-                session.add(entry)
-
-            entry.consumed_ml += volume_ml
-            entry.updated_at = datetime.utcnow()
-
-            session.add(
-                HydrationEvent(
-                    user_id=telegram_id,
-                    event_type="glass_logged",
-                    notes=f"{volume_ml}ml",
-                )
+            .on_conflict_do_update(
+                index_elements=["user_id", "date"],
+                set_={
+                    "consumed_ml": DailyHydration.consumed_ml + insert.excluded.consumed_ml,
+                    "updated_at": insert.excluded.updated_at,
+                },
             )
-            session.commit()
-            session.refresh(entry)
-            return entry
+            .returning(DailyHydration.id, DailyHydration.goal_ml, DailyHydration.consumed_ml)
+        )
+        row = session.exec(stmt).one()
+        previous_ml = row.consumed_ml - volume_ml
+        self._apply_rollup_delta(
+            session,
+            telegram_id,
+            today,
+            total_ml=volume_ml,
+            days_logged=int(row.consumed_ml > 0) - int(previous_ml > 0),
+            goal_hits=int(row.consumed_ml >= row.goal_ml) - int(previous_ml >= row.goal_ml),
+        )
 
-    async def list_users(self) -> List[User]:
-        """Return every registered user. Used by scheduler for reminders."""
-        return await asyncio.to_thread(self._list_users_sync)
+        session.add(HydrationEvent(user_id=telegram_id, kind=EventType.GLASS_LOGGED, volume_ml=volume_ml))
+        return DailyHydration(
+            id=row.id,
+            user_id=telegram_id,
+            date=today,
+            goal_ml=row.goal_ml,
+            consumed_ml=row.consumed_ml,
+            updated_at=now,
+        )
 
-    def _list_users_sync(self) -> List[User]:
-        with session_scope(self.engine) as session:
-            users = session.exec(select(User)).all()
-            return list(users)
+    async def local_today(self, telegram_id: int) -> date:
+        """Return the current date in the user's timezone.
+
+        Daily entries and reminder flags are keyed on this date, the same one the
+        scheduler suspends reminders until the end of.
+        """
+        user = (await self.get_users_many([telegram_id])).get(telegram_id)
+        return self._user_today(user)
+
+    def _user_today(self, user: User | UserSnapshot | None) -> date:
+        timezone = user.timezone if user is not None and user.timezone else self.settings.timezone
+        return datetime.now(ZoneInfo(timezone)).date()
+
+    async def list_users(self) -> List[UserSnapshot]:
+        """Return every active user (not blocked). Used by scheduler for reminders."""
+        return list(self._cache_users(await self._read(self._list_users)).values())
+
+    def _list_users(self, session: Session) -> List[User]:
+        users = session.exec(select(User).where(User.blocked_at.is_(None))).all()
+        return list(users)
+
+    async def list_users_page(self, after_user_id: int = 0, limit: int = 500) -> List[UserSnapshot]:
+        """Return active users ordered by id after `after_user_id`, for keyset pagination."""
+        return list(self._cache_users(await self._read(self._list_users_page, after_user_id, limit)).values())
+
+    def _list_users_page(self, session: Session, after_user_id: int, limit: int) -> List[User]:
+        stmt = (
+            select(User)
+            .where(User.telegram_id > after_user_id, User.blocked_at.is_(None))
+            .order_by(User.telegram_id)
+            .limit(limit)
+        )
+        return list(session.exec(stmt).all())
+
+    async def list_users_idle_between(
+        self, windows: list[tuple[int, int]], after_user_id: int = 0, limit: int = 500
+    ) -> List[UserSnapshot]:
+        """Return active users whose last interaction falls in one of the `(start, end]` epoch windows.
+
+        Users never stamped are matched on their signup date instead, as for activity
+        tiers. Ordered by id after `after_user_id`, for keyset pagination.
+        """
+        users = await self._read(self._list_users_idle_between, windows, after_user_id, limit)
+        return list(self._cache_users(users).values())
+
+    def _list_users_idle_between(
+        self, session: Session, windows: list[tuple[int, int]], after_user_id: int, limit: int
+    ) -> List[User]:
+        conditions = []
+        for start, end in windows:
+            conditions.append(and_(User.last_active_at > start, User.last_active_at <= end))
+            conditions.append(
+                and_(
+                    User.last_active_at.is_(None),
+                    # created_at is stored as naive UTC.
+                    User.created_at > datetime.fromtimestamp(start, timezone.utc).replace(tzinfo=None),
+                    User.created_at <= datetime.fromtimestamp(end, timezone.utc).replace(tzinfo=None),
+                )
+            )
+        stmt = (
+            select(User)
+            .where(User.telegram_id > after_user_id, User.blocked_at.is_(None), or_(*conditions))
+            .order_by(User.telegram_id)
+            .limit(limit)
+        )
+        return list(session.exec(stmt).all())
+
+    async def record_activity(self, user: UserSnapshot) -> bool:
+        """Stamp `last_active_at`, at most once per `ACTIVITY_RESOLUTION_SECONDS`; return True if stamped."""
+        now = epoch_now()
+        if user.last_active_at is not None and now - user.last_active_at < ACTIVITY_RESOLUTION_SECONDS:
+            return False
+        await self._queued_write(self._record_activity, user.telegram_id, now)
+        # Patch only our own snapshot: a preference update may have cached a fresher one meanwhile.
+        if self.user_cache.get(user.telegram_id) is user:
+            self.user_cache.put(replace(user, last_active_at=now))
+        else:
+            self.user_cache.invalidate(user.telegram_id)
+        return True
+
+    def _record_activity(self, session: Session, telegram_id: int, now: int) -> None:
+        session.execute(update(User).where(User.telegram_id == telegram_id).values(last_active_at=now))
+
+    async def set_user_blocked(self, telegram_id: int, blocked: bool) -> None:
+        """Mark a user unreachable (bot blocked, account deleted) or active again.
+
+        Blocking also drops the messages still queued for the user.
+        """
+        await self._write(self._set_user_blocked, telegram_id, blocked)
+        self.user_cache.invalidate(telegram_id)
+
+    def _set_user_blocked(self, session: Session, telegram_id: int, blocked: bool) -> None:
+        session.execute(
+            update(User).where(User.telegram_id == telegram_id).values(blocked_at=epoch_now() if blocked else None)
+        )
+        if blocked:
+            session.execute(
+                delete(OutboxMessage).where(OutboxMessage.chat_id == telegram_id, OutboxMessage.sent_at.is_(None))
+            )
 
-    async def get_stats(self, telegram_id: int, days: int = 7) -> HydrationStats:
-        """Return basic hydration stats over the last `days` (inclusive of today)."""
-        return await asyncio.to_thread(self._get_stats_sync, telegram_id, days)
+    async def get_stats(self, telegram_id: int, days: int | None = 7) -> HydrationStats:
+        """Return hydration stats over the last `days` (inclusive of today), or all time if None."""
+        return await self._write(self._get_stats, telegram_id, days)
 
     async def get_today_entry(self, telegram_id: int) -> DailyHydration | None:
         """Return today's hydration entry for a user, if any."""
-        return await asyncio.to_thread(self._get_today_entry_sync, telegram_id)
+        return await self._read(self._get_today_entry, telegram_id, await self.local_today(telegram_id))
 
-    def _get_today_entry_sync(self, telegram_id: int) -> DailyHydration | None:
-        with session_scope(self.engine) as session:
-            stmt = select(DailyHydration).where(
-                DailyHydration.user_id == telegram_id,
-                DailyHydration.date == date.today(),
-            )
-            return session.exec(stmt).first()
+    def _get_today_entry(self, session: Session, telegram_id: int, today: date) -> DailyHydration | None:
+        stmt = select(DailyHydration).where(
+            DailyHydration.user_id == telegram_id,
+            DailyHydration.date == today,
+        )
+        return session.exec(stmt).first()
 
     async def pause_reminders_today(self, telegram_id: int) -> None:
         """Pause reminders for the rest of the day."""
-        await asyncio.to_thread(self._pause_reminders_today_sync, telegram_id)
-
-    def _pause_reminders_today_sync(self, telegram_id: int) -> None:
-        with session_scope(self.engine) as session:
-            session.add(
-                HydrationEvent(
-                    user_id=telegram_id,
-                    event_type="reminders_paused",
-                    notes="paused_until_end_of_day",
-                )
-            )
-            session.commit()
+        await self._queued_write(
+            self._set_day_flags,
+            telegram_id,
+            await self.local_today(telegram_id),
+            {"reminders_paused": True},
+            EventType.REMINDERS_PAUSED,
+        )
 
     async def is_reminders_paused_today(self, telegram_id: int) -> bool:
         """Return True if user paused reminders for today."""
-        return await asyncio.to_thread(self._is_reminders_paused_today_sync, telegram_id)
-
-    def _is_reminders_paused_today_sync(self, telegram_id: int) -> bool:
-        """Check the latest pause/resume event today to decide."""
-        today = date.today()
-        day_start = datetime.combine(today, time.min)
-        day_end = datetime.combine(today, time.max)
-        with session_scope(self.engine) as session:
-            stmt = (
-                select(HydrationEvent)
-                .where(
-                    HydrationEvent.user_id == telegram_id,
-                    HydrationEvent.event_type.in_(["reminders_paused", "reminders_resumed"]),
-                    HydrationEvent.timestamp >= day_start,
-                    HydrationEvent.timestamp <= day_end,
-                )
-                .order_by(HydrationEvent.timestamp.desc())
-            )
-            event = session.exec(stmt).first()
-            if not event:
-                return False
-            return event.event_type == "reminders_paused"
+        state = await self.get_day_state(telegram_id)
+        return state.reminders_paused
 
     async def resume_reminders_today(self, telegram_id: int) -> None:
         """Resume reminders for the rest of the day."""
-        await asyncio.to_thread(self._resume_reminders_today_sync, telegram_id)
+        await self._queued_write(
+            self._set_day_flags,
+            telegram_id,
+            await self.local_today(telegram_id),
+            {"reminders_paused": False},
+            EventType.REMINDERS_RESUMED,
+        )
 
-    def _resume_reminders_today_sync(self, telegram_id: int) -> None:
-        with session_scope(self.engine) as session:
-            session.add(
-                HydrationEvent(
-                    user_id=telegram_id,
-                    event_type="reminders_resumed",
-                    notes="resumed_until_end_of_day",
+    async def get_day_state(self, telegram_id: int) -> UserDayState:
+        """Return today's reminder flags for a user (defaults if nothing was recorded)."""
+        return await self._read(self._get_day_state, telegram_id, await self.local_today(telegram_id))
+
+    def _get_day_state(self, session: Session, telegram_id: int, today: date) -> UserDayState:
+        state = session.get(UserDayState, (telegram_id, today))
+        return state or UserDayState(user_id=telegram_id, day=today)
+
+    def _set_day_flags(
+        self, session: Session, telegram_id: int, today: date, flags: dict[str, bool], kind: EventType
+    ) -> None:
+        """Upsert today's flags and keep the matching event for audit."""
+        now = utc_now()
+        insert = dialect_insert(session, UserDayState)
+        stmt = insert.values(user_id=telegram_id, day=today, updated_at=now, **flags).on_conflict_do_update(
+            index_elements=["user_id", "day"],
+            set_={**flags, "updated_at": now},
+        )
+        session.exec(stmt)
+        session.add(HydrationEvent(user_id=telegram_id, kind=kind))
+
+    def _get_stats(self, session: Session, telegram_id: int, days: int | None) -> HydrationStats:
+        """Combine whole weeks/months from rollups with the few raw days at the window edges."""
+        user = self._get_or_create_user(session, telegram_id)
+        today = self._user_today(user)
+        today_entry = self._get_today_entry(session, telegram_id, today)
+
+        if days is None:
+            first_day = session.exec(
+                select(func.min(DailyHydration.date)).where(DailyHydration.user_id == telegram_id)
+            ).one()
+            start_date = min(first_day or today, today)
+            days = (today - start_date).days + 1
+        else:
+            start_date = today - timedelta(days=days - 1)
+
+        periods, raw_days = _split_window(start_date, today)
+        total_ml = goal_hits = 0
+        if periods:
+            rollups = session.exec(
+                select(HydrationRollup).where(
+                    HydrationRollup.user_id == telegram_id,
+                    tuple_(HydrationRollup.period, HydrationRollup.period_start).in_(periods),
                 )
-            )
-            session.commit()
-
-    def _get_stats_sync(self, telegram_id: int, days: int) -> HydrationStats:
-        today = date.today()
-        start_date = today - timedelta(days=days - 1)
+            ).all()
+            total_ml += sum(r.total_ml for r in rollups)
+            goal_hits += sum(r.goal_hits for r in rollups)
+        if raw_days:
+            entries = session.exec(
+                select(DailyHydration).where(
+                    DailyHydration.user_id == telegram_id,
+                    DailyHydration.date.in_(raw_days),
+                )
+            ).all()
+            total_ml += sum(e.consumed_ml for e in entries)
+            goal_hits += sum(1 for e in entries if e.consumed_ml >= e.goal_ml)
+
+        target_glasses = user.daily_target_glasses or self.settings.default_daily_glasses
+        default_goal_ml = user.daily_target_ml or target_glasses * self.settings.glass_volume_ml
+        today_goal_ml = today_entry.goal_ml if today_entry else default_goal_ml
+        today_consumed_ml = today_entry.consumed_ml if today_entry else 0
+
+        days_considered = max(days, 1)
+        average_ml = total_ml // days_considered
+
+        return HydrationStats(
+            days_considered=days_considered,
+            total_ml=total_ml,
+            average_ml=average_ml,
+            goal_hits=goal_hits,
+            today_consumed_ml=today_consumed_ml,
+            today_goal_ml=today_goal_ml,
+        )
 
-        with session_scope(self.engine) as session:
-            user = self._get_or_create_user(session, telegram_id)
-            stmt = select(DailyHydration).where(
-                DailyHydration.user_id == telegram_id,
-                DailyHydration.date >= start_date,
-            )
-            entries = session.exec(stmt).all()
-
-            today_entry = next((e for e in entries if e.date == today), None)
-            target_glasses = user.daily_target_glasses or self.settings.default_daily_glasses
-            default_goal_ml = user.daily_target_ml or target_glasses * self.settings.glass_volume_ml
-            today_goal_ml = today_entry.goal_ml if today_entry else default_goal_ml
-            today_consumed_ml = today_entry.consumed_ml if today_entry else 0
-
-            total_ml = sum(e.consumed_ml for e in entries)
-            goal_hits = sum(1 for e in entries if e.consumed_ml >= e.goal_ml)
-            days_considered = max(days, 1)
-            average_ml = total_ml // days_considered
-
-            return HydrationStats(
-                days_considered=days_considered,
-                total_ml=total_ml,
-                average_ml=average_ml,
-                goal_hits=goal_hits,
-                today_consumed_ml=today_consumed_ml,
-                today_goal_ml=today_goal_ml,
+    def _apply_rollup_delta(
+        self,
+        session: Session,
+        telegram_id: int,
+        day: date,
+        *,
+        total_ml: int = 0,
+        days_logged: int = 0,
+        goal_hits: int = 0,
+    ) -> None:
+        """Add a day's change to its weekly and monthly rollups in one upsert."""
+        if not (total_ml or days_logged or goal_hits):
+            return
+
+        insert = dialect_insert(session, HydrationRollup)
+        stmt = insert.values(
+            [
+                {
+                    "user_id": telegram_id,
+                    "period": period,
+                    "period_start": period_start,
+                    "total_ml": total_ml,
+                    "days_logged": days_logged,
+                    "goal_hits": goal_hits,
+                }
+                for period, period_start in HydrationRollup.periods_for(day)
+            ]
+        ).on_conflict_do_update(
+            index_elements=["user_id", "period", "period_start"],
+            set_={
+                "total_ml": HydrationRollup.total_ml + insert.excluded.total_ml,
+                "days_logged": HydrationRollup.days_logged + insert.excluded.days_logged,
+                "goal_hits": HydrationRollup.goal_hits + insert.excluded.goal_hits,
+            },
+        )
+        session.exec(stmt)
+
+    async def get_users_many(self, user_ids: Iterable[int]) -> dict[int, UserSnapshot]:
+        """Return snapshots of the existing users among `user_ids`, reading through the cache."""
+        ids = list(dict.fromkeys(user_ids))
+        users = self._cached_users(ids)
+        missing = [user_id for user_id in ids if user_id not in users]
+        if missing:
+            users.update(self._cache_users(await self._read(self._get_users_many, missing)))
+        return users
+
+    async def get_today_entries_many(self, user_ids: Iterable[int]) -> dict[int, DailyHydration]:
+        """Return today's hydration entries keyed by user, for users that have one."""
+        ids = list(dict.fromkeys(user_ids))
+        days = self._local_days(ids, await self.get_users_many(ids))
+        return await self._read(self._get_today_entries_many, days)
+
+    async def get_day_states_many(self, user_ids: Iterable[int]) -> dict[int, UserDayState]:
+        """Return today's reminder flags for every requested user (defaults when unset)."""
+        ids = list(dict.fromkeys(user_ids))
+        days = self._local_days(ids, await self.get_users_many(ids))
+        states = await self._read(self._get_day_states_many, days)
+        return {user_id: states.get(user_id) or UserDayState(user_id=user_id, day=days[user_id]) for user_id in ids}
+
+    async def get_reminder_context_many(self, user_ids: Iterable[int]) -> dict[int, ReminderContext]:
+        """Load users, today's entries and day flags for a set of users.
+
+        Costs at most three queries per `BULK_CHUNK_SIZE` users whatever the set size,
+        fewer when user snapshots are cached. Unknown users are left out.
+        """
+        ids = list(dict.fromkeys(user_ids))
+        users = self._cached_users(ids)
+        missing = [user_id for user_id in ids if user_id not in users]
+        loaded, entries, states = await self._read(self._load_reminder_context, missing, self._local_days(ids, users))
+        users.update(self._cache_users(loaded))
+
+        contexts: dict[int, ReminderContext] = {}
+        for user_id in ids:
+            user = users.get(user_id)
+            if user is None:
+                continue
+            state = states.get(user_id)
+            contexts[user_id] = ReminderContext(
+                user=user,
+                today_entry=entries.get(user_id),
+                reminders_paused=bool(state and state.reminders_paused),
+                goal_notified=bool(state and state.goal_notified),
             )
+        return contexts
+
+    def _load_reminder_context(
+        self, session: Session, users_to_load: list[int], days: dict[int, date]
+    ) -> tuple[list[User], dict[int, DailyHydration], dict[int, UserDayState]]:
+        loaded = self._get_users_many(session, users_to_load)
+        days.update((user.telegram_id, self._user_today(user)) for user in loaded)
+        return (
+            loaded,
+            self._get_today_entries_many(session, days),
+            self._get_day_states_many(session, days),
+        )
+
+    def _local_days(self, user_ids: list[int], users: dict[int, User | UserSnapshot]) -> dict[int, date]:
+        """Map each user to their local today; unknown users fall back to the default timezone."""
+        return {user_id: self._user_today(users.get(user_id)) for user_id in user_ids}
+
+    def _get_users_many(self, session: Session, user_ids: list[int]) -> list[User]:
+        users: list[User] = []
+        for chunk in _chunks(user_ids):
+            users.extend(session.exec(select(User).where(User.telegram_id.in_(chunk))).all())
+        return users
+
+    def _get_today_entries_many(self, session: Session, days: dict[int, date]) -> dict[int, DailyHydration]:
+        entries: dict[int, DailyHydration] = {}
+        for today, user_ids in _group_by_day(days).items():
+            for chunk in _chunks(user_ids):
+                stmt = select(DailyHydration).where(DailyHydration.user_id.in_(chunk), DailyHydration.date == today)
+                entries.update((entry.user_id, entry) for entry in session.exec(stmt))
+        return entries
+
+    def _get_day_states_many(self, session: Session, days: dict[int, date]) -> dict[int, UserDayState]:
+        states: dict[int, UserDayState] = {}
+        for today, user_ids in _group_by_day(days).items():
+            for chunk in _chunks(user_ids):
+                stmt = select(UserDayState).where(UserDayState.user_id.in_(chunk), UserDayState.day == today)
+                states.update((state.user_id, state) for state in session.exec(stmt))
+        return states
+
+    def _cached_users(self, user_ids: list[int]) -> dict[int, UserSnapshot]:
+        users: dict[int, UserSnapshot] = {}
+        for user_id in user_ids:
+            snapshot = self.user_cache.get(user_id)
+            if snapshot is not None:
+                users[user_id] = snapshot
+        return users
+
+    def _cache_users(self, users: Iterable[User]) -> dict[int, UserSnapshot]:
+        snapshots: dict[int, UserSnapshot] = {}
+        for user in users:
+            snapshot = UserSnapshot.from_user(user)
+            self.user_cache.put(snapshot, replace=False)
+            snapshots[snapshot.telegram_id] = snapshot
+        return snapshots
 
     async def has_goal_been_notified(self, telegram_id: int) -> bool:
         """Check whether a goal_reached notification was already sent today."""
-        return await asyncio.to_thread(self._has_goal_been_notified_sync, telegram_id)
+        state = await self.get_day_state(telegram_id)
+        return state.goal_notified
 
-    def _has_goal_been_notified_sync(self, telegram_id: int) -> bool:
-        today = date.today()
-        day_start = datetime.combine(today, time.min)
-        day_end = datetime.combine(today, time.max)
-        with session_scope(self.engine) as session:
-            stmt = select(HydrationEvent).where(
-                HydrationEvent.user_id == telegram_id,
-                HydrationEvent.event_type == "goal_notified",
-                HydrationEvent.timestamp >= day_start,
-                HydrationEvent.timestamp <= day_end,
+    async def record_goal_notified(self, telegram_id: int) -> None:
+        """Persist the flag that avoids re-sending goal reached notifications."""
+        await self._queued_write(
+            self._set_day_flags,
+            telegram_id,
+            await self.local_today(telegram_id),
+            {"goal_notified": True},
+            EventType.GOAL_NOTIFIED,
+        )
+
+    async def save_reminder_schedules(self, schedules: list[dict[str, Any]]) -> None:
+        """Insert or replace persisted reminder schedules in one transaction.
+
+        Each item holds `ReminderSchedule` column values; plain dicts keep bulk
+        reschedules clear of model construction costs.
+        """
+        if schedules:
+            await self._queued_write(self._save_reminder_schedules, schedules)
+
+    def _save_reminder_schedules(self, session: Session, schedules: list[dict[str, Any]]) -> None:
+        insert = dialect_insert(session, ReminderSchedule)
+        columns = [column.name for column in ReminderSchedule.__table__.columns if column.name != "user_id"]
+        # executemany over one compiled statement; multi-row VALUES would be recompiled per page.
+        stmt = insert.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={name: insert.excluded[name] for name in columns},
+        )
+        now = epoch_now()
+        defaults = {"offset_minutes": 0, "suspended_until": None, "tier": None, "updated_at": now}
+        session.execute(stmt, [{**defaults, **row} for row in schedules])
+
+    async def get_app_state(self, key: str) -> str | None:
+        return await self._read(self._get_app_state, key)
+
+    def _get_app_state(self, session: Session, key: str) -> str | None:
+        state = session.get(AppState, key)
+        return None if state is None else state.value
+
+    async def set_app_state(self, key: str, value: str) -> None:
+        await self._write(self._set_app_state, key, value)
+
+    def _set_app_state(self, session: Session, key: str, value: str) -> None:
+        insert = dialect_insert(session, AppState)
+        session.execute(
+            insert.values(key=key, value=value, updated_at=epoch_now()).on_conflict_do_update(
+                index_elements=["key"], set_={"value": insert.excluded.value, "updated_at": insert.excluded.updated_at}
             )
-            return session.exec(stmt).first() is not None
+        )
 
-    async def record_goal_notified(self, telegram_id: int) -> None:
-        """Persist an event to avoid re-sending goal reached notifications."""
-        await asyncio.to_thread(self._record_goal_notified_sync, telegram_id)
+    async def set_reminders_suspended_until(self, suspended_until: dict[int, int | None]) -> None:
+        """Persist, per user, the epoch second until which reminders are skipped."""
+        if suspended_until:
+            await self._queued_write(self._set_reminders_suspended_until, suspended_until)
+
+    def _set_reminders_suspended_until(self, session: Session, suspended_until: dict[int, int | None]) -> None:
+        # Core executemany: users whose schedule row is not written yet (backfill in
+        # flight) are skipped instead of failing the whole batch.
+        table = ReminderSchedule.__table__
+        stmt = (
+            update(table)
+            .where(table.c.user_id == bindparam("b_user_id"))
+            .values(suspended_until=bindparam("b_until"), updated_at=epoch_now())
+        )
+        session.connection().execute(
+            stmt, [{"b_user_id": user_id, "b_until": until} for user_id, until in suspended_until.items()]
+        )
 
-    def _record_goal_notified_sync(self, telegram_id: int) -> None:
-        with session_scope(self.engine) as session:
-            session.add(
-                HydrationEvent(
-                    user_id=telegram_id,
-                    event_type="goal_notified",
-                    notes="daily goal reached",
-                )
+    async def delete_reminder_schedule(self, telegram_id: int) -> None:
+        await self._write(self._delete_reminder_schedule, telegram_id)
+
+    def _delete_reminder_schedule(self, session: Session, telegram_id: int) -> None:
+        session.exec(delete(ReminderSchedule).where(ReminderSchedule.user_id == telegram_id))
+
+    async def list_reminder_schedules(self, after_user_id: int = 0, limit: int = 5000) -> list[ReminderSchedule]:
+        """Return persisted schedules ordered by user id, one keyset page at a time."""
+        return await self._read(self._list_reminder_schedules, after_user_id, limit)
+
+    def _list_reminder_schedules(self, session: Session, after_user_id: int, limit: int) -> list[ReminderSchedule]:
+        stmt = (
+            select(ReminderSchedule)
+            .where(ReminderSchedule.user_id > after_user_id)
+            .order_by(ReminderSchedule.user_id)
+            .limit(limit)
+        )
+        return list(session.exec(stmt).all())
+
+    async def list_unscheduled_users(self, after_user_id: int = 0, limit: int = 500) -> list[UserSnapshot]:
+        """Return active users without a persisted schedule, ordered by id, one keyset page at a time."""
+        return list(self._cache_users(await self._read(self._list_unscheduled_users, after_user_id, limit)).values())
+
+    def _list_unscheduled_users(self, session: Session, after_user_id: int, limit: int) -> list[User]:
+        stmt = (
+            select(User)
+            .outerjoin(ReminderSchedule, ReminderSchedule.user_id == User.telegram_id)
+            .where(User.telegram_id > after_user_id, ReminderSchedule.user_id.is_(None), User.blocked_at.is_(None))
+            .order_by(User.telegram_id)
+            .limit(limit)
+        )
+        return list(session.exec(stmt).all())
+
+    async def enqueue_messages(self, messages: list[dict[str, Any]]) -> int:
+        """Persist outgoing messages for the outbox worker; return how many were queued.
+
+        Each item holds `OutboxMessage` column values. Items whose `dedupe_key` is
+        already queued, or was sent recently, are ignored.
+        """
+        if not messages:
+            return 0
+        return await self._queued_write(self._enqueue_messages, messages)
+
+    def _enqueue_messages(self, session: Session, messages: list[dict[str, Any]]) -> int:
+        stmt = dialect_insert(session, OutboxMessage).on_conflict_do_nothing(index_elements=["dedupe_key"])
+        now = epoch_now()
+        defaults = {"reply_markup": None, "dedupe_key": None, "expires_at": None, "attempts": 0, "sent_at": None}
+        rows = [{**defaults, "created_at": now, "available_at": now, **message} for message in messages]
+        # Core executemany on the connection: the ORM bulk path reports no rowcount.
+        return session.connection().execute(stmt, rows).rowcount
+
+    async def claim_messages(self, limit: int, lease_seconds: int) -> list[OutboxMessage]:
+        """Lease the next unexpired pending messages, highest priority then oldest first.
+
+        A claimed message becomes claimable again once the lease is over unless it
+        was marked sent or dropped, so sends lost in a crash are retried.
+        Returned rows carry the attempt count from before this claim.
+        """
+        return await self._write(self._claim_messages, limit, lease_seconds)
+
+    def _claim_messages(self, session: Session, limit: int, lease_seconds: int) -> list[OutboxMessage]:
+        now = epoch_now()
+        stmt = (
+            select(OutboxMessage)
+            .where(
+                OutboxMessage.sent_at.is_(None),
+                OutboxMessage.available_at <= now,
+                (OutboxMessage.expires_at.is_(None)) | (OutboxMessage.expires_at > now),
             )
-            session.commit()
+            .order_by(OutboxMessage.priority, OutboxMessage.id)
+            .limit(limit)
+        )
+        messages = list(session.exec(stmt).all())
+        if messages:
+            session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_([message.id for message in messages]))
+                .values(available_at=now + lease_seconds, attempts=OutboxMessage.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+        return messages
+
+    async def mark_messages_sent(self, message_ids: list[int]) -> None:
+        if message_ids:
+            await self._queued_write(self._mark_messages_sent, message_ids)
+
+    def _mark_messages_sent(self, session: Session, message_ids: list[int]) -> None:
+        now = epoch_now()
+        for chunk in _chunks(message_ids):
+            session.execute(update(OutboxMessage).where(OutboxMessage.id.in_(chunk)).values(sent_at=now))
+
+    async def retry_message_later(self, message_id: int, delay_seconds: int) -> None:
+        await self._write(self._retry_message_later, message_id, delay_seconds)
+
+    def _retry_message_later(self, session: Session, message_id: int, delay_seconds: int) -> None:
+        session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == message_id)
+            .values(available_at=epoch_now() + delay_seconds)
+        )
+
+    async def drop_messages(self, message_ids: list[int]) -> None:
+        """Delete messages that will never be sent (rejected by Telegram, out of attempts)."""
+        if message_ids:
+            await self._write(self._drop_messages, message_ids)
+
+    def _drop_messages(self, session: Session, message_ids: list[int]) -> None:
+        for chunk in _chunks(message_ids):
+            session.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(chunk)))
+
+    async def purge_outbox(self, sent_before: int) -> tuple[int, int]:
+        """Delete expired unsent messages and messages sent before `sent_before`.
+
+        Returns the (expired, sent) counts.
+        """
+        return await self._write(self._purge_outbox, sent_before)
+
+    def _purge_outbox(self, session: Session, sent_before: int) -> tuple[int, int]:
+        expired = session.execute(
+            delete(OutboxMessage).where(OutboxMessage.sent_at.is_(None), OutboxMessage.expires_at <= epoch_now())
+        ).rowcount
+        sent = session.execute(delete(OutboxMessage).where(OutboxMessage.sent_at < sent_before)).rowcount
+        return expired, sent
+
+    async def count_pending_messages(self) -> int:
+        return await self._read(self._count_pending_messages)
+
+    def _count_pending_messages(self, session: Session) -> int:
+        return session.exec(select(func.count(OutboxMessage.id)).where(OutboxMessage.sent_at.is_(None))).one()
 
     async def update_user_preferences(
         self,
@@ -224,61 +712,119 @@ class HydrationService:
         reminder_start_hour: int | None = None,
         reminder_end_hour: int | None = None,
         reminder_interval_minutes: int | None = None,
-    ) -> User:
-        """Persist updated user preferences."""
-        return await asyncio.to_thread(
-            self._update_user_preferences_sync,
+    ) -> UserSnapshot:
+        """Persist updated user preferences and refresh the cached snapshot."""
+        user = await self._write(
+            self._update_user_preferences,
             telegram_id,
             daily_target_glasses,
             reminder_start_hour,
             reminder_end_hour,
             reminder_interval_minutes,
         )
+        snapshot = UserSnapshot.from_user(user)
+        self.user_cache.put(snapshot)
+        return snapshot
 
-    def _update_user_preferences_sync(
+    def _update_user_preferences(
         self,
+        session: Session,
         telegram_id: int,
         daily_target_glasses: int | None,
         reminder_start_hour: int | None,
         reminder_end_hour: int | None,
         reminder_interval_minutes: int | None,
     ) -> User:
-        with session_scope(self.engine) as session:
-            user = self._get_or_create_user(session, telegram_id)
-            if daily_target_glasses is not None:
-                user.daily_target_glasses = daily_target_glasses
-                user.daily_target_ml = daily_target_glasses * self.settings.glass_volume_ml
-            if reminder_start_hour is not None:
-                user.reminder_start_hour = reminder_start_hour
-            if reminder_end_hour is not None:
-                user.reminder_end_hour = reminder_end_hour
-            if reminder_interval_minutes is not None:
-                user.reminder_interval_minutes = reminder_interval_minutes
-
-            # Align today's goal if an entry already exists
-            target_glasses = user.daily_target_glasses or self.settings.default_daily_glasses
-            new_goal_ml = user.daily_target_ml or target_glasses * self.settings.glass_volume_ml
-            stmt = select(DailyHydration).where(
-                DailyHydration.user_id == telegram_id,
-                DailyHydration.date == date.today(),
+        user = self._get_or_create_user(session, telegram_id)
+        if daily_target_glasses is not None:
+            user.daily_target_glasses = daily_target_glasses
+            user.daily_target_ml = daily_target_glasses * self.settings.glass_volume_ml
+        if reminder_start_hour is not None:
+            user.reminder_start_hour = reminder_start_hour
+        if reminder_end_hour is not None:
+            user.reminder_end_hour = reminder_end_hour
+        if reminder_interval_minutes is not None:
+            user.reminder_interval_minutes = reminder_interval_minutes
+
+        # Align today's goal if an entry already exists
+        target_glasses = user.daily_target_glasses or self.settings.default_daily_glasses
+        new_goal_ml = user.daily_target_ml or target_glasses * self.settings.glass_volume_ml
+        entry = self._get_today_entry(session, telegram_id, self._user_today(user))
+        if entry and entry.goal_ml != new_goal_ml:
+            self._apply_rollup_delta(
+                session,
+                telegram_id,
+                entry.date,
+                goal_hits=int(entry.consumed_ml >= new_goal_ml) - int(entry.consumed_ml >= entry.goal_ml),
             )
-            entry = session.exec(stmt).first()
-            if entry:
-                entry.goal_ml = new_goal_ml
-                entry.updated_at = datetime.utcnow()
-                session.add(entry)
-
-            session.add(user)
-            session.commit()
-            session.refresh(user)
-            return user
+            entry.goal_ml = new_goal_ml
+            entry.updated_at = utc_now()
+            session.add(entry)
+
+        session.add(user)
+        session.flush()
+        return user
+
+    async def _read(self, operation: Callable[..., T], *args: Any) -> T:
+        """Run a read-only operation in its own session."""
+        return await self._run(operation, args, commit=False)
+
+    async def _write(self, operation: Callable[..., T], *args: Any) -> T:
+        """Run an operation in its own session and commit it."""
+        return await self._run(operation, args, commit=True)
+
+    async def _queued_write(self, operation: Callable[..., T], *args: Any) -> T:
+        """Run a hot-path write through the group-commit queue when it is enabled."""
+        if self.write_queue is not None:
+            return await self.write_queue.submit(operation, *args)
+        return await self._write(operation, *args)
+
+    async def _run(self, operation: Callable[..., T], args: tuple[Any, ...], *, commit: bool) -> T:
+        if self.async_engine is not None:
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                result = await session.run_sync(operation, *args)
+                if commit:
+                    await session.commit()
+                return result
+        return await asyncio.to_thread(self._run_sync, operation, args, commit)
+
+    def _run_sync(self, operation: Callable[..., T], args: tuple[Any, ...], commit: bool) -> T:
+        with session_scope(self.engine) as session:
+            result = operation(session, *args)
+            if commit:
+                session.commit()
+            return result
 
     def _get_or_create_user(self, session: Session, telegram_id: int) -> User:
         user = session.get(User, telegram_id)
         if user:
             return user
 
-        user = User(
+        user = self._default_user(telegram_id)
+        session.add(user)
+        session.flush()
+        self._log_user_created(user)
+        return user
+
+    def _insert_user_if_missing(self, session: Session, telegram_id: int) -> None:
+        """Create the user row with defaults without reading it first."""
+        user = self._default_user(telegram_id)
+        insert = dialect_insert(session, User)
+        stmt = insert.values(**user.model_dump()).on_conflict_do_nothing(index_elements=["telegram_id"])
+        if session.exec(stmt).rowcount:
+            self._log_user_created(user)
+
+    def _user_goal_subquery(self, telegram_id: int):
+        """SQL expression resolving a user's daily goal, mirroring the Python defaults."""
+        target_glasses = func.coalesce(User.daily_target_glasses, self.settings.default_daily_glasses)
+        return (
+            select(func.coalesce(User.daily_target_ml, target_glasses * self.settings.glass_volume_ml))
+            .where(User.telegram_id == telegram_id)
+            .scalar_subquery()
+        )
+
+    def _default_user(self, telegram_id: int) -> User:
+        return User(
             telegram_id=telegram_id,
             timezone=self.settings.timezone,
             daily_target_glasses=self.settings.default_daily_glasses,
@@ -287,9 +833,8 @@ class HydrationService:
             reminder_end_hour=self.settings.hydration_end_hour,
             reminder_interval_minutes=self.settings.reminder_interval_minutes,
         )
-        session.add(user)
-        session.commit()
-        session.refresh(user)
+
+    def _log_user_created(self, user: User) -> None:
         logger.info(
             "event=user_created user_id={user_id} timezone={timezone} target_glasses={glasses} target_ml={target_ml} start_hour={start} end_hour={end} interval_min={interval}",
             user_id=user.telegram_id,
@@ -300,4 +845,40 @@ class HydrationService:
             end=user.reminder_end_hour,
             interval=user.reminder_interval_minutes,
         )
-        return user
+
+
+def _chunks(values: list[int], size: int = BULK_CHUNK_SIZE) -> Iterator[list[int]]:
+    for offset in range(0, len(values), size):
+        yield values[offset : offset + size]
+
+
+def _group_by_day(days: dict[int, date]) -> dict[date, list[int]]:
+    """Invert a user -> local date map; a slot's users rarely span more than two dates."""
+    grouped: dict[date, list[int]] = {}
+    for user_id, day in days.items():
+        grouped.setdefault(day, []).append(user_id)
+    return grouped
+
+
+def _split_window(start: date, end: date) -> tuple[list[tuple[str, date]], list[date]]:
+    """Split [start, end] into rollup periods fully inside it and the remaining raw days.
+
+    Whole months are preferred, then ISO weeks that do not straddle a month boundary,
+    so at most a few weeks and days at each edge are read from DailyHydration.
+    """
+    periods: list[tuple[str, date]] = []
+    raw_days: list[date] = []
+    cursor = start
+    while cursor <= end:
+        next_month = (cursor.replace(day=28) + timedelta(days=4)).replace(day=1)
+        week_last = cursor + timedelta(days=6)
+        if cursor.day == 1 and next_month - timedelta(days=1) <= end:
+            periods.append(("month", cursor))
+            cursor = next_month
+        elif cursor.weekday() == 0 and week_last <= end and week_last.month == cursor.month:
+            periods.append(("week", cursor))
+            cursor = week_last + timedelta(days=1)
+        else:
+            raw_days.append(cursor)
+            cursor += timedelta(days=1)
+    return periods, raw_days
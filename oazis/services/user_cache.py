@@ -0,0 +1,103 @@
+"""In-process cache of user preferences."""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from oazis.db import User
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Immutable copy of a `User` row, safe to share between handlers and jobs."""
+
+    telegram_id: int
+    role: str
+    timezone: str | None
+    daily_target_ml: int | None
+    daily_target_glasses: int | None
+    reminder_start_hour: int | None
+    reminder_end_hour: int | None
+    reminder_interval_minutes: int | None
+    created_at: datetime
+    blocked_at: int | None = None
+    last_active_at: int | None = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            telegram_id=user.telegram_id,
+            role=user.role,
+            timezone=user.timezone,
+            daily_target_ml=user.daily_target_ml,
+            daily_target_glasses=user.daily_target_glasses,
+            reminder_start_hour=user.reminder_start_hour,
+            reminder_end_hour=user.reminder_end_hour,
+            reminder_interval_minutes=user.reminder_interval_minutes,
+            created_at=user.created_at,
+            blocked_at=user.blocked_at,
+            last_active_at=user.last_active_at,
+        )
+
+
+class UserCache:
+    """Bounded LRU cache of user snapshots with a time-to-live.
+
+    The TTL bounds staleness when rows are changed outside this process.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[int, tuple[float, UserSnapshot]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, telegram_id: int) -> bool:
+        """Return True if a fresh entry exists, without touching counters or recency."""
+        entry = self._entries.get(telegram_id)
+        return entry is not None and entry[0] > self._clock()
+
+    def get(self, telegram_id: int) -> UserSnapshot | None:
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, snapshot = entry
+        if expires_at <= self._clock():
+            del self._entries[telegram_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(telegram_id)
+        self.hits += 1
+        return snapshot
+
+    def put(self, snapshot: UserSnapshot, *, replace: bool = True) -> None:
+        """Store a snapshot.
+
+        Loaders pass `replace=False` so a slow read cannot overwrite the fresher
+        snapshot stored by a concurrent preference update.
+        """
+        if not replace and snapshot.telegram_id in self:
+            return
+        self._entries[snapshot.telegram_id] = (self._clock() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(snapshot.telegram_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._entries.pop(telegram_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,124 @@
+"""Group-commit queue coalescing hydration writes into shared transactions."""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+from sqlmodel import Session
+
+Operation = Callable[..., Any]
+Runner = Callable[..., Awaitable[Any]]
+
+
+@dataclass
+class PendingWrite:
+    operation: Operation
+    args: tuple[Any, ...]
+    future: asyncio.Future = field(repr=False)
+
+
+class WriteQueue:
+    """Collect write operations from many callers and commit them together.
+
+    `run(operation, *args)` must execute `operation(session, *args)` in a fresh
+    transaction and commit it (see `HydrationService._write`). Operations in a
+    batch share one session and run in submission order, so values returned via
+    RETURNING reflect every earlier write of the batch. If the shared commit fails,
+    each operation is retried alone so one bad write cannot fail its neighbours.
+    """
+
+    def __init__(self, run: Runner, *, max_batch: int, flush_interval: float) -> None:
+        self._run = run
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._pending: list[PendingWrite] = []
+        self._wakeup = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+        self._closing = False
+        self.batches_flushed = 0
+        self.writes_flushed = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, operation: Operation, *args: Any) -> Any:
+        """Queue an operation and wait until its batch is committed."""
+        if self._closing:
+            return await self._run(operation, *args)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(PendingWrite(operation, args, future))
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            self._batch_full.set()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain(), name="oazis-write-queue")
+        return await future
+
+    async def close(self) -> None:
+        """Flush every queued write and stop the background worker."""
+        self._closing = True
+        self._wakeup.set()
+        self._batch_full.set()
+        if self._worker is not None:
+            await self._worker
+        while self._pending:
+            await self._flush_next()
+
+    async def _drain(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            if not self._closing and len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                except TimeoutError:
+                    pass
+            await self._flush_next()
+            if not self._pending:
+                self._wakeup.clear()
+                if self._closing:
+                    return
+            if len(self._pending) < self.max_batch:
+                self._batch_full.clear()
+
+    async def _flush_next(self) -> None:
+        batch = self._pending[: self.max_batch]
+        del self._pending[: self.max_batch]
+        if not batch:
+            return
+
+        try:
+            results = await self._run(_apply_batch, batch)
+        except Exception as exc:  # noqa: BLE001 - isolate the failing write below
+            logger.warning(
+                "event=write_batch_failed size={size} error={error}; retrying writes one by one",
+                size=len(batch),
+                error=exc,
+            )
+            await self._flush_individually(batch)
+        else:
+            for item, result in zip(batch, results):
+                if not item.future.done():
+                    item.future.set_result(result)
+
+        self.batches_flushed += 1
+        self.writes_flushed += len(batch)
+        logger.debug("event=write_batch_flushed size={size} queued={queued}", size=len(batch), queued=self.depth)
+
+    async def _flush_individually(self, batch: list[PendingWrite]) -> None:
+        for item in batch:
+            try:
+                result = await self._run(item.operation, *item.args)
+            except Exception as exc:  # noqa: BLE001 - surface to the caller
+                if not item.future.done():
+                    item.future.set_exception(exc)
+            else:
+                if not item.future.done():
+                    item.future.set_result(result)
+
+
+def _apply_batch(session: Session, batch: list[PendingWrite]) -> list[Any]:
+    return [item.operation(session, *item.args) for item in batch]
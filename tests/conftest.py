@@ -0,0 +1,37 @@
+"""Shared fixtures for the Oazis test suite."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from oazis.config import Settings
+from oazis.db.session import get_async_engine, get_engine, init_db
+
+
+@pytest.fixture
+def settings() -> Settings:
+    """Settings isolated from the developer's .env file."""
+    return Settings(TELEGRAM_BOT_TOKEN="123456:TEST", _env_file=None)
+
+
+@pytest.fixture
+def engine(tmp_path: Path) -> Engine:
+    """Fresh file-backed SQLite database with the full schema."""
+    engine = get_engine(f"sqlite:///{tmp_path / 'oazis.db'}")
+    init_db(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(params=["threads", "aiosqlite"])
+def async_engine(request, engine: Engine, settings: Settings) -> AsyncEngine | None:
+    """Run a service test both on worker threads (None) and natively on the event loop."""
+    if request.param == "threads":
+        yield None
+        return
+    async_engine = get_async_engine(engine.url.render_as_string(), settings=settings)
+    yield async_engine
+    asyncio.run(async_engine.dispose())
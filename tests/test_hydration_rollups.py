@@ -0,0 +1,71 @@
+import asyncio
+import random
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlmodel import Session, select
+
+from oazis.db import DailyHydration, HydrationRollup, User
+from oazis.db.migrations import backfill_hydration_rollups
+from oazis.services.hydration import HydrationService, _split_window
+
+
+def _days(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+
+def _period_days(period: str, start: date) -> list[date]:
+    if period == "week":
+        return _days(start, start + timedelta(days=6))
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return _days(start, next_month - timedelta(days=1))
+
+
+def test_split_window_covers_every_day_exactly_once() -> None:
+    rng = random.Random(8)
+    for _ in range(500):
+        start = date(2024, 1, 1) + timedelta(days=rng.randrange(800))
+        end = start + timedelta(days=rng.randrange(400))
+        periods, raw_days = _split_window(start, end)
+
+        covered = [day for period in periods for day in _period_days(*period)] + raw_days
+        assert sorted(covered) == _days(start, end)
+        # Rollups are only used where they save reads: never more than a month and a week of raw days per edge.
+        assert len(raw_days) <= 2 * (31 + 7)
+
+
+def test_stats_from_rollups_match_a_brute_force_sum(engine, settings) -> None:
+    rng = random.Random(42)
+    today = datetime.now(ZoneInfo(settings.timezone)).date()
+    history = {
+        today - timedelta(days=offset): (rng.choice([0, 250, 500, 1750, 2000, 2500]), rng.choice([1500, 2000]))
+        for offset in range(1, 400)
+        if rng.random() < 0.8
+    }
+    with Session(engine) as session:
+        session.add(User(telegram_id=1))
+        session.add_all(
+            DailyHydration(user_id=1, date=day, consumed_ml=consumed, goal_ml=goal, updated_at=datetime(2025, 1, 1))
+            for day, (consumed, goal) in history.items()
+        )
+        session.commit()
+    backfill_hydration_rollups(engine, batch_size=7)
+
+    service = HydrationService(engine, settings)
+    # Today goes through the incremental path.
+    today_entry = asyncio.run(service.record_glass(1, volume_ml=2500))
+    history[today] = (today_entry.consumed_ml, today_entry.goal_ml)
+
+    for days in (1, 7, 30, 31, 90, 365, None):
+        window = history if days is None else {d: v for d, v in history.items() if d > today - timedelta(days=days)}
+        stats = asyncio.run(service.get_stats(1, days))
+        assert stats.total_ml == sum(consumed for consumed, _ in window.values()), days
+        assert stats.goal_hits == sum(consumed >= goal for consumed, goal in window.values()), days
+
+    with Session(engine) as session:
+        rollups = session.exec(select(HydrationRollup)).all()
+    for rollup in rollups:
+        days_in = [day for day in _period_days(rollup.period, rollup.period_start) if day in history]
+        assert rollup.total_ml == sum(history[day][0] for day in days_in)
+        assert rollup.days_logged == sum(history[day][0] > 0 for day in days_in)
+        assert rollup.goal_hits == sum(history[day][0] >= history[day][1] for day in days_in)
@@ -0,0 +1,138 @@
+"""Data migrations applied by init_db to databases created by older releases."""
+
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+from sqlmodel import Session, select
+
+from oazis.db import DailyHydration, EventType, HydrationEvent, HydrationRollup, User
+from oazis.db.migrations import LEGACY_EVENTS_TABLE, has_legacy_events, migrate_legacy_events, seed_last_active
+from oazis.db.session import get_engine, init_db
+
+LEGACY_SCHEMA = (
+    "CREATE TABLE user (telegram_id INTEGER NOT NULL PRIMARY KEY, role VARCHAR NOT NULL, timezone VARCHAR, "
+    "daily_target_ml INTEGER, daily_target_glasses INTEGER, reminder_start_hour INTEGER, reminder_end_hour INTEGER, "
+    "reminder_interval_minutes INTEGER, created_at DATETIME NOT NULL)",
+    "CREATE TABLE hydrationevent (id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER NOT NULL, "
+    "timestamp DATETIME NOT NULL, event_type VARCHAR NOT NULL, notes VARCHAR)",
+    "CREATE INDEX ix_hydrationevent_user_type_ts ON hydrationevent (user_id, event_type, timestamp)",
+)
+
+
+def test_legacy_events_are_re_encoded_in_batches(tmp_path: Path) -> None:
+    engine = get_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(
+            text("INSERT INTO user (telegram_id, role, created_at) VALUES (:u, 'user', '2024-06-01 00:00:00.000000')"),
+            [{"u": 1}, {"u": 2}],
+        )
+        connection.execute(
+            text("INSERT INTO hydrationevent (user_id, timestamp, event_type, notes) VALUES (:u, :t, :e, :n)"),
+            [
+                {"u": 1, "t": "2025-01-02 08:00:00.000000", "e": "glass_logged", "n": "250ml"},
+                {"u": 1, "t": "2025-01-02 09:00:00.000000", "e": "reminders_paused", "n": "paused_until_end_of_day"},
+                {"u": 2, "t": "2025-01-02 10:00:00.000000", "e": "goal_notified", "n": "daily goal reached"},
+                {"u": 2, "t": "2025-01-02 11:00:00.000000", "e": "something_else", "n": None},
+            ],
+        )
+
+    init_db(engine)
+    assert has_legacy_events(engine)
+    assert {c["name"] for c in inspect(engine).get_columns("hydrationevent")} >= {"ts", "kind", "volume_ml"}
+    assert "blocked_at" in {c["name"] for c in inspect(engine).get_columns("user")}
+
+    assert migrate_legacy_events(engine, batch_size=3, pause_seconds=0) == 4
+    assert not inspect(engine).has_table(LEGACY_EVENTS_TABLE)
+
+    with Session(engine) as session:
+        events = session.exec(select(HydrationEvent).order_by(HydrationEvent.ts)).all()
+    assert [(e.user_id, e.kind, e.volume_ml) for e in events] == [
+        (1, EventType.GLASS_LOGGED, 250),
+        (1, EventType.REMINDERS_PAUSED, None),
+        (2, EventType.GOAL_NOTIFIED, None),
+        (2, EventType.UNKNOWN, None),
+    ]
+    assert events[0].ts == 1735804800
+    # Activity is seeded again once the legacy events are readable.
+    with Session(engine) as session:
+        seeded = {user.telegram_id: user.last_active_at for user in session.exec(select(User)).all()}
+    assert seeded == {1: 1735808400, 2: None}
+
+
+def test_duplicate_days_are_merged_before_the_unique_index(tmp_path: Path) -> None:
+    engine = get_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(LEGACY_SCHEMA[0]))
+        connection.execute(
+            text(
+                "CREATE TABLE dailyhydration (id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER NOT NULL, "
+                "date DATE NOT NULL, goal_ml INTEGER NOT NULL, consumed_ml INTEGER NOT NULL, updated_at DATETIME NOT NULL)"
+            )
+        )
+        connection.execute(
+            text("INSERT INTO dailyhydration (user_id, date, goal_ml, consumed_ml, updated_at) VALUES (:u, :d, 2000, :c, :t)"),
+            [
+                {"u": 1, "d": "2025-01-02", "c": 250, "t": "2025-01-02 08:00:00.000000"},
+                {"u": 1, "d": "2025-01-02", "c": 500, "t": "2025-01-02 09:00:00.000000"},
+                {"u": 1, "d": "2025-01-03", "c": 250, "t": "2025-01-03 08:00:00.000000"},
+                {"u": 2, "d": "2025-01-02", "c": 750, "t": "2025-01-02 10:00:00.000000"},
+            ],
+        )
+
+    init_db(engine)
+    # A restart finds the index in place and has nothing left to merge.
+    init_db(engine)
+
+    with Session(engine) as session:
+        days = session.exec(select(DailyHydration).order_by(DailyHydration.id)).all()
+        rollups = session.exec(select(HydrationRollup).where(HydrationRollup.period == "month")).all()
+    assert [(day.id, day.user_id, day.date.isoformat(), day.consumed_ml) for day in days] == [
+        (1, 1, "2025-01-02", 750),
+        (3, 1, "2025-01-03", 250),
+        (4, 2, "2025-01-02", 750),
+    ]
+    assert days[0].updated_at.hour == 9
+    assert {rollup.user_id: rollup.total_ml for rollup in rollups} == {1: 1000, 2: 750}
+    assert "ux_dailyhydration_user_date" in {index["name"] for index in inspect(engine).get_indexes("dailyhydration")}
+
+
+def test_last_active_is_seeded_from_past_glasses_and_actions(engine) -> None:
+    with Session(engine) as session:
+        session.add_all(User(telegram_id=user_id) for user_id in (1, 2, 3, 4))
+        session.add(User(telegram_id=5, last_active_at=42))
+        session.add(DailyHydration(user_id=1, date=date(2025, 1, 2), goal_ml=2000, consumed_ml=250, updated_at=datetime(2025, 1, 2, 8)))
+        session.add(DailyHydration(user_id=2, date=date(2025, 1, 2), goal_ml=2000, consumed_ml=250, updated_at=datetime(2025, 1, 2, 8)))
+        session.add_all(
+            [
+                HydrationEvent(user_id=2, ts=1735900000, kind=EventType.REMINDERS_PAUSED),
+                # Messages sent by the bot are not activity.
+                HydrationEvent(user_id=3, ts=1735900000, kind=EventType.REMINDER_SENT),
+                HydrationEvent(user_id=5, ts=1735900000, kind=EventType.GLASS_LOGGED),
+            ]
+        )
+        session.commit()
+
+    assert seed_last_active(engine) == 2
+    assert seed_last_active(engine) == 0
+
+    with Session(engine) as session:
+        seeded = {user.telegram_id: user.last_active_at for user in session.exec(select(User)).all()}
+    assert seeded == {1: 1735804800, 2: 1735900000, 3: None, 4: None, 5: 42}
+
+    # A full pass only ever moves stamps forward.
+    assert seed_last_active(engine, only_unstamped=False) == 1
+    with Session(engine) as session:
+        assert session.get(User, 5).last_active_at == 1735900000
+        assert session.get(User, 2).last_active_at == 1735900000
+
+
+def test_retired_event_index_is_dropped(engine) -> None:
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX ix_hydrationevent_user_kind_ts ON hydrationevent (user_id, kind, ts)"))
+
+    init_db(engine)
+
+    assert inspect(engine).get_indexes("hydrationevent") == []
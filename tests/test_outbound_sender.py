@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import defaultdict
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter
+from aiogram.types import Chat, Message
+
+from oazis.bot.sender import OutboundSender
+
+GLOBAL_RATE, GLOBAL_BURST = 40.0, 5
+CHAT_RATE, CHAT_BURST = 20.0, 2
+
+
+class LimitedSession(BaseSession):
+    """Fake Telegram API answering sendMessage and rejecting sends over the limits."""
+
+    def __init__(self, failures: list[Exception] | None = None) -> None:
+        super().__init__()
+        self.failures = failures or []
+        self.sent: list[tuple[float, int]] = []
+        self.flood_errors = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        if self.failures:
+            raise self.failures.pop(0)
+        now = time.monotonic()
+        window = 0.25
+        # A token bucket never lets more than burst + rate * window through in any window.
+        recent = [chat_id for at, chat_id in self.sent if at > now - window]
+        per_chat = defaultdict(int)
+        for chat_id in recent:
+            per_chat[chat_id] += 1
+        if (
+            len(recent) + 1 > GLOBAL_BURST + GLOBAL_RATE * window + 1
+            or per_chat[method.chat_id] + 1 > CHAT_BURST + CHAT_RATE * window + 1
+        ):
+            self.flood_errors += 1
+            raise TelegramRetryAfter(method, "Too Many Requests", retry_after=1)
+        self.sent.append((now, method.chat_id))
+        return Message(message_id=len(self.sent), date=0, chat=Chat(id=method.chat_id, type="private"), text=method.text)
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+
+def _bot(session: LimitedSession, sender: OutboundSender) -> Bot:
+    bot = Bot("42:TEST", session=session)
+    bot.session.middleware(sender)
+    return bot
+
+
+def test_sender_keeps_a_burst_under_the_global_and_chat_limits() -> None:
+    session = LimitedSession()
+    sender = OutboundSender(global_rate=GLOBAL_RATE, global_burst=GLOBAL_BURST, chat_rate=CHAT_RATE, chat_burst=CHAT_BURST)
+    bot = _bot(session, sender)
+
+    async def scenario() -> float:
+        started = time.monotonic()
+        await asyncio.gather(*(bot.send_message(chat_id % 3 + 1, "💧") for chat_id in range(30)))
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(scenario())
+
+    assert session.flood_errors == 0
+    assert len(session.sent) == 30
+    # 25 tokens beyond the burst at 40/s.
+    assert elapsed >= (30 - GLOBAL_BURST) / GLOBAL_RATE * 0.9
+    stats = sender.stats()
+    assert (stats["sent"], stats["queued"], stats["retries"]) == (30, 0, 0)
+    assert stats["latency_s"]["count"] == 30
+
+
+def test_sender_retries_flood_waits_and_transient_errors_only() -> None:
+    failures = [
+        TelegramRetryAfter(None, "Too Many Requests", retry_after=0),
+        TelegramNetworkError(None, "connection reset"),
+    ]
+    session = LimitedSession(failures)
+    sender = OutboundSender(backoff_seconds=0.01)
+    bot = _bot(session, sender)
+
+    async def scenario() -> None:
+        message = await bot.send_message(7, "💧")
+        assert message.chat.id == 7
+        session.failures.append(TelegramForbiddenError(None, "bot was blocked by the user"))
+        try:
+            await bot.send_message(7, "💧")
+        except TelegramForbiddenError:
+            pass
+        else:
+            raise AssertionError("forbidden error was retried")
+
+    asyncio.run(scenario())
+
+    stats = sender.stats()
+    assert (stats["sent"], stats["retries"], stats["flood_waits"], stats["failed"]) == (1, 2, 1, 1)
@@ -0,0 +1,148 @@
+import asyncio
+from datetime import date, datetime, time
+from zoneinfo import ZoneInfo
+
+from aiogram.exceptions import TelegramForbiddenError
+from sqlalchemy.exc import OperationalError
+
+import oazis.bot  # noqa: F401 - oazis.scheduler must be imported through oazis.bot
+from oazis.bot.outbox import OutboxWorker
+from oazis.db import OutboxPriority
+from oazis.db.models import epoch_now
+from oazis.scheduler.jobs import send_hydration_reminders_for_slot
+from oazis.services.hydration import HydrationService
+
+
+class SlowBot:
+    def __init__(self, blocked: set[int] = frozenset()) -> None:
+        self.blocked = blocked
+        self.sent: list[int] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            if chat_id in self.blocked:
+                raise TelegramForbiddenError(None, "bot was blocked by the user")
+            self.sent.append(chat_id)
+        finally:
+            self.in_flight -= 1
+
+
+def test_slot_queues_one_message_per_user_and_slot(engine, settings) -> None:
+    settings = settings.model_copy(update={"outbox_enabled": True})
+    service = HydrationService(engine, settings)
+    bot = SlowBot()
+    noon = datetime.combine(date.today(), time(12), tzinfo=ZoneInfo(settings.timezone))
+
+    async def scenario() -> list:
+        for user_id in (1, 2):
+            await service.ensure_user(user_id)
+        await service.record_glass(2, volume_ml=5000)
+        first = await send_hydration_reminders_for_slot(bot, service, settings, [1, 2], now=noon)
+        # The same slot fired again (restart, overlapping run): nothing new is queued.
+        await send_hydration_reminders_for_slot(bot, service, settings, [1], now=noon)
+        await service.enqueue_messages(
+            [
+                {"chat_id": 3, "priority": OutboxPriority.INTERACTIVE, "text": "Réponse"},
+                {"chat_id": 4, "priority": OutboxPriority.REMINDER, "text": "Trop tard", "expires_at": epoch_now() - 1},
+            ]
+        )
+        assert first == {"sent": 1, "goal": 1}
+        return await service.claim_messages(10, lease_seconds=60)
+
+    claimed = asyncio.run(scenario())
+
+    assert bot.sent == []
+    assert [(message.chat_id, message.priority) for message in claimed] == [
+        (3, OutboxPriority.INTERACTIVE),
+        (2, OutboxPriority.CELEBRATION),
+        (1, OutboxPriority.REMINDER),
+    ]
+    assert asyncio.run(service.claim_messages(10, lease_seconds=60)) == []
+
+
+def test_worker_drains_with_bounded_sends_and_drops_rejected_chats(engine, settings) -> None:
+    settings = settings.model_copy(update={"outbox_enabled": True, "outbox_max_in_flight": 4})
+    service = HydrationService(engine, settings)
+    bot = SlowBot(blocked={13})
+    worker = OutboxWorker(bot, service, settings)
+
+    async def scenario() -> None:
+        await service.enqueue_messages(
+            [{"chat_id": chat_id, "priority": OutboxPriority.REMINDER, "text": "💧"} for chat_id in range(1, 31)]
+        )
+        while await worker.drain_once():
+            pass
+        await worker.stop()
+
+    asyncio.run(scenario())
+
+    assert sorted(bot.sent) == [chat_id for chat_id in range(1, 31) if chat_id != 13]
+    assert bot.max_in_flight <= 4
+    assert worker.stats()["sent"] == 29 and worker.stats()["dropped"] == 1
+    assert asyncio.run(service.count_pending_messages()) == 0
+
+
+def test_worker_survives_database_errors_and_stops_cleanly(engine, settings) -> None:
+    settings = settings.model_copy(update={"outbox_enabled": True, "outbox_poll_seconds": 0.01})
+    service = HydrationService(engine, settings)
+    bot = SlowBot()
+    worker = OutboxWorker(bot, service, settings)
+    claim = service.claim_messages
+    calls = 0
+
+    async def flaky_claim(limit: int, lease_seconds: int):
+        nonlocal calls
+        calls += 1
+        if calls in (2, 3):
+            raise OperationalError("UPDATE outboxmessage", {}, Exception("database is locked"))
+        return await claim(limit, lease_seconds)
+
+    service.claim_messages = flaky_claim
+
+    async def scenario() -> None:
+        await service.enqueue_messages([{"chat_id": 1, "priority": OutboxPriority.REMINDER, "text": "💧"}])
+        worker.start()
+        await asyncio.sleep(0.05)
+        await service.enqueue_messages([{"chat_id": 2, "priority": OutboxPriority.REMINDER, "text": "💧"}])
+        for _ in range(100):
+            if len(bot.sent) == 2:
+                break
+            await asyncio.sleep(0.02)
+        await worker.stop()
+
+    asyncio.run(scenario())
+
+    assert sorted(bot.sent) == [1, 2]
+    assert worker.stats()["errors"] == 2
+    assert asyncio.run(service.count_pending_messages()) == 0
+
+
+def test_failed_retry_bookkeeping_is_logged_not_lost(engine, settings) -> None:
+    settings = settings.model_copy(update={"outbox_enabled": True})
+    service = HydrationService(engine, settings)
+
+    class UnreachableBot:
+        async def send_message(self, chat_id: int, text: str, **kwargs) -> None:
+            raise ConnectionError("network down")
+
+    async def locked_retry(message_id: int, delay_seconds: int) -> None:
+        raise OperationalError("UPDATE outboxmessage", {}, Exception("database is locked"))
+
+    service.retry_message_later = locked_retry
+    worker = OutboxWorker(UnreachableBot(), service, settings)
+
+    async def scenario() -> None:
+        await service.enqueue_messages([{"chat_id": 1, "priority": OutboxPriority.REMINDER, "text": "💧"}])
+        assert await worker.drain_once() == 1
+        await worker.stop()
+
+    asyncio.run(scenario())
+
+    assert worker.stats()["retried"] == 1 and worker.stats()["errors"] == 1
+    # Still pending: it is claimed again once its lease runs out.
+    assert asyncio.run(service.count_pending_messages()) == 1
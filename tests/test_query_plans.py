@@ -0,0 +1,83 @@
+"""Guard the hot reminder queries against regressing to full table scans."""
+
+import asyncio
+
+from sqlalchemy import event, text
+
+from oazis.services.hydration import HydrationService
+
+
+def _capture_selects(engine, action) -> list[tuple[str, tuple]]:
+    """Run `action` and return every SELECT it sent to the database."""
+    statements: list[tuple[str, tuple]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        action()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def _query_plan(engine, statement: str, parameters: tuple) -> str:
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def _assert_index_used(engine, action, table: str, index: str) -> None:
+    selects = [s for s in _capture_selects(engine, action) if f"FROM {table}" in s[0]]
+    assert selects, f"no SELECT on {table} captured"
+    for statement, parameters in selects:
+        plan = _query_plan(engine, statement, parameters)
+        assert index in plan, plan
+        assert f"SCAN {table}" not in plan, plan
+
+
+def test_indexes_exist(engine) -> None:
+    with engine.connect() as connection:
+        names = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert "ux_dailyhydration_user_date" in names
+    # The event log is write-only; an index there would only slow inserts down.
+    assert "ix_hydrationevent_user_kind_ts" not in names
+
+
+def test_day_state_lookup_uses_primary_key(engine, settings) -> None:
+    service = HydrationService(engine, settings)
+    asyncio.run(service.pause_reminders_today(42))
+    asyncio.run(service.record_goal_notified(42))
+    _assert_index_used(
+        engine,
+        lambda: asyncio.run(service.get_day_state(42)),
+        "userdaystate",
+        "sqlite_autoindex_userdaystate_1",
+    )
+
+
+def test_day_flags_round_trip(engine, async_engine, settings) -> None:
+    service = HydrationService(engine, settings, async_engine=async_engine)
+
+    async def scenario() -> list[bool]:
+        await service.pause_reminders_today(42)
+        paused = await service.is_reminders_paused_today(42)
+        await service.resume_reminders_today(42)
+        resumed = await service.is_reminders_paused_today(42)
+        await service.record_goal_notified(42)
+        return [paused, resumed, await service.has_goal_been_notified(42)]
+
+    assert asyncio.run(scenario()) == [True, False, True]
+
+
+def test_today_entry_lookup_uses_daily_index(engine, settings) -> None:
+    service = HydrationService(engine, settings)
+    asyncio.run(service.record_glass(42))
+    _assert_index_used(
+        engine,
+        lambda: asyncio.run(service.get_today_entry(42)),
+        "dailyhydration",
+        "ux_dailyhydration_user_date",
+    )
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlmodel import Session, func, select
+
+from oazis.db import DailyHydration, EventType, HydrationEvent, HydrationRollup, User
+from oazis.services.hydration import HydrationService
+
+
+def test_first_glass_creates_the_user_and_resolves_the_goal_in_sql(engine, async_engine, settings) -> None:
+    service = HydrationService(engine, settings, async_engine=async_engine)
+
+    async def scenario() -> tuple[DailyHydration, DailyHydration]:
+        first = await service.record_glass(1, volume_ml=300)
+        second = await service.record_glass(1, volume_ml=200)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert (first.consumed_ml, second.consumed_ml) == (300, 500)
+    assert first.id == second.id and first.date == datetime.now(ZoneInfo(settings.timezone)).date()
+    assert first.goal_ml == settings.default_daily_glasses * settings.glass_volume_ml
+    with Session(engine) as session:
+        assert session.get(User, 1) is not None
+        assert session.exec(select(func.count(HydrationEvent.id)).where(HydrationEvent.kind == EventType.GLASS_LOGGED)).one() == 2
+
+
+def test_goal_follows_user_preferences(engine, async_engine, settings) -> None:
+    service = HydrationService(engine, settings, async_engine=async_engine)
+
+    async def scenario() -> DailyHydration:
+        await service.ensure_user(1)
+        await service.update_user_preferences(1, daily_target_glasses=6)
+        return await service.record_glass(1)
+
+    assert asyncio.run(scenario()).goal_ml == 6 * settings.glass_volume_ml
+
+
+def test_concurrent_taps_never_lose_an_increment(engine, async_engine, settings) -> None:
+    service = HydrationService(engine, settings, async_engine=async_engine)
+    taps = 40
+
+    async def scenario() -> list[DailyHydration]:
+        return await asyncio.gather(*(service.record_glass(7, volume_ml=100) for _ in range(taps)))
+
+    entries = asyncio.run(scenario())
+
+    # Every tap sees its own running total, and the last one sees them all.
+    assert sorted(entry.consumed_ml for entry in entries) == [100 * n for n in range(1, taps + 1)]
+    with Session(engine) as session:
+        (day,) = session.exec(select(DailyHydration).where(DailyHydration.user_id == 7)).all()
+        rollups = session.exec(select(HydrationRollup).where(HydrationRollup.user_id == 7)).all()
+    assert day.consumed_ml == 100 * taps
+    assert {(rollup.period, rollup.total_ml, rollup.days_logged, rollup.goal_hits) for rollup in rollups} == {
+        ("week", 100 * taps, 1, 1),
+        ("month", 100 * taps, 1, 1),
+    }
+
+
+def test_day_rows_follow_the_user_local_date(engine, settings) -> None:
+    # UTC+14 and UTC-11: always on different calendar dates, whatever the server's.
+    zones = {1: "Pacific/Kiritimati", 2: "Pacific/Pago_Pago"}
+    with Session(engine) as session:
+        session.add_all(User(telegram_id=user_id, timezone=zone) for user_id, zone in zones.items())
+        session.commit()
+    service = HydrationService(engine, settings)
+
+    async def scenario() -> None:
+        for user_id in zones:
+            await service.record_glass(user_id)
+            await service.pause_reminders_today(user_id)
+
+    asyncio.run(scenario())
+
+    for user_id, zone in zones.items():
+        local_today = datetime.now(ZoneInfo(zone)).date()
+        assert asyncio.run(service.get_today_entry(user_id)).date == local_today
+        state = asyncio.run(service.get_day_state(user_id))
+        assert (state.day, state.reminders_paused) == (local_today, True)
+        contexts = asyncio.run(service.get_reminder_context_many([1, 2]))
+        assert contexts[user_id].today_entry.date == local_today
+        assert contexts[user_id].reminders_paused
+
+
+def test_activity_stamp_keeps_a_concurrent_preference_update(engine, settings) -> None:
+    service = HydrationService(engine, settings)
+
+    async def scenario():
+        stale = await service.ensure_user(1)
+        await service.update_user_preferences(1, daily_target_glasses=5)
+        assert await service.record_activity(stale)
+        return (await service.get_users_many([1]))[1]
+
+    user = asyncio.run(scenario())
+
+    assert user.daily_target_glasses == 5
+    assert user.last_active_at is not None
@@ -0,0 +1,384 @@
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Message, Update, User as TelegramUser
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy import update
+from sqlmodel import Session
+
+from oazis.bot import create_dispatcher
+from oazis.db import User
+from oazis.db.models import epoch_now
+from oazis.scheduler import ActivityTier, ProfileSchedule, ReminderProfile, ReminderScheduler, create_scheduler
+from oazis.scheduler.wheel import epoch_minute
+from oazis.services.hydration import HydrationService
+
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.sent: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> None:
+        self.sent.append((chat_id, text))
+
+
+class SilentSession(BaseSession):
+    """Fake Telegram API accepting every call, for feeding updates to the dispatcher."""
+
+    async def make_request(self, bot, method, timeout=None):
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+
+def test_schedule_for_user_skips_unchanged_profile(engine, settings) -> None:
+    service = HydrationService(engine, settings)
+    reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+
+    async def scenario() -> None:
+        reminders.scheduler.start(paused=True)
+        await reminders.schedule_for_user(42)
+        await reminders.schedule_for_user(42)
+        await reminders.schedule_for_user(42)
+        await service.update_user_preferences(42, reminder_interval_minutes=60)
+        await reminders.schedule_for_user(42)
+        (job,) = [job for job in reminders.scheduler.get_jobs() if job.id != ReminderScheduler.METRICS_JOB_ID]
+        assert job.trigger.interval_minutes == 60
+        reminders.scheduler.shutdown(wait=False)
+
+    asyncio.run(scenario())
+
+    assert reminders.stats() == {
+        "scheduled": 1,
+        "profiles": 2,
+        "groups": 1,
+        "reschedules": 2,
+        "skipped": 2,
+        "suspended": 0,
+        "deactivated": 0,
+        "tier_active": 1,
+        "tier_dormant": 0,
+        "tier_inactive": 0,
+    }
+
+
+def test_suspend_skips_to_tomorrow_and_resume_brings_it_back(engine, settings) -> None:
+    settings = settings.model_copy(update={"reminder_dispatcher": "wheel", "hydration_start_hour": 0, "hydration_end_hour": 24})
+    service = HydrationService(engine, settings)
+    reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+    tz = ZoneInfo(settings.timezone)
+
+    async def scenario() -> None:
+        await reminders.schedule_for_user(42)
+        scheduled = reminders.next_run(42)
+
+        await reminders.suspend_for_today(42)
+        tomorrow = datetime.now(tz).date() + timedelta(days=1)
+        assert reminders.next_run(42) == datetime.combine(tomorrow, time(0), tzinfo=tz)
+
+        await reminders.resume_today(42)
+        assert reminders.next_run(42) == scheduled
+
+    asyncio.run(scenario())
+    assert reminders.stats()["suspended"] == 1
+
+
+def test_users_with_the_same_profile_share_one_schedule(engine, settings) -> None:
+    settings = settings.model_copy(update={"reminder_dispatcher": "wheel"})
+    service = HydrationService(engine, settings)
+    reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+
+    async def scenario() -> None:
+        for user_id in range(1, 101):
+            await reminders.schedule_for_user(user_id)
+        await service.update_user_preferences(7, reminder_interval_minutes=60)
+        await reminders.schedule_for_user(7)
+
+    asyncio.run(scenario())
+
+    assert reminders.stats()["groups"] == 2
+    assert len(reminders.dispatcher.wheel) == 2
+
+
+def test_profile_fire_table_matches_the_aligned_grid() -> None:
+    profile = ReminderProfile(9, 21, 90, "Europe/Paris")
+    schedule = ProfileSchedule(profile, offset_minutes=7)
+    tz = ZoneInfo("Europe/Paris")
+    moment = datetime(2025, 3, 29, 0, 0, tzinfo=tz)
+
+    # Walk two days across the DST change, minute by minute around each slot.
+    while moment < datetime(2025, 3, 31, tzinfo=tz):
+        assert schedule.next_fire(moment) == profile.next_run(moment, offset_minutes=7)
+        moment += timedelta(minutes=13)
+
+
+def test_restart_restores_persisted_schedules_and_backfills_the_rest(engine, settings) -> None:
+    settings = settings.model_copy(update={"reminder_dispatcher": "wheel"})
+
+    async def first_run() -> dict[int, datetime]:
+        service = HydrationService(engine, settings)
+        reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+        for user_id in (1, 2, 3):
+            await reminders.schedule_for_user(user_id)
+        await service.update_user_preferences(3, reminder_interval_minutes=60)
+        await reminders.schedule_for_user(3)
+        await reminders.suspend_for_today(2)
+        # Known to the bot but never scheduled, e.g. created before schedules were persisted.
+        await service.ensure_user(4)
+        return {user_id: reminders.next_run(user_id) for user_id in (1, 2, 3)}
+
+    async def second_run() -> ReminderScheduler:
+        service = HydrationService(engine, settings)
+        reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+        assert await reminders.restore(page_size=2) == 3
+        assert await reminders.schedule_unscheduled_users(page_size=2) == 1
+        assert await service.list_unscheduled_users() == []
+        return reminders
+
+    before = asyncio.run(first_run())
+    reminders = asyncio.run(second_run())
+
+    assert {user_id: reminders.next_run(user_id) for user_id in (1, 2, 3)} == before
+    assert reminders.stats()["groups"] == 2
+    assert reminders.next_run(4) is not None
+
+
+def test_full_reschedule_streams_pages_and_stops_cleanly_when_cancelled(engine, settings) -> None:
+    settings = settings.model_copy(update={"reminder_dispatcher": "wheel"})
+    service = HydrationService(engine, settings)
+
+    async def scenario() -> None:
+        for user_id in range(1, 11):
+            await service.ensure_user(user_id)
+
+        reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+        assert await reminders.schedule_for_all_users(page_size=3) == 10
+        assert len(await service.list_reminder_schedules()) == 10
+        assert reminders.stats()["scheduled"] == 10
+
+        pages = 0
+        list_users_page = service.list_users_page
+
+        async def cancel_on_second_page(after: int, limit: int):
+            nonlocal pages
+            pages += 1
+            if pages == 2:
+                raise asyncio.CancelledError
+            return await list_users_page(after, limit)
+
+        service.list_users_page = cancel_on_second_page
+        await service.update_user_preferences(1, reminder_interval_minutes=60)
+        await service.update_user_preferences(5, reminder_interval_minutes=60)
+        reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+        try:
+            await reminders.schedule_for_all_users(page_size=3)
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("reschedule was not cancelled")
+
+        intervals = {row.user_id: row.interval_minutes for row in await service.list_reminder_schedules()}
+        assert intervals[1] == 60 and intervals[5] == 90
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_policies_and_fire_metrics(engine, settings) -> None:
+    settings = settings.model_copy(
+        update={"reminder_dispatcher": "wheel", "hydration_start_hour": 0, "hydration_end_hour": 24}
+    )
+    service = HydrationService(engine, settings)
+    reminders = ReminderScheduler(create_scheduler(settings), FakeBot(), service, settings)
+
+    async def scenario() -> None:
+        reminders.scheduler.start(paused=True)
+        job = reminders.scheduler.get_job(ReminderScheduler.METRICS_JOB_ID)
+        assert (job.coalesce, job.misfire_grace_time, job.max_instances) == (True, 300, 1)
+
+        await reminders.schedule_for_user(42)
+        key = reminders._membership[42].key
+        due = reminders.dispatcher.next_run(key)
+        # The bot comes back an hour after the slot: the fire is dropped, not replayed.
+        await reminders._handle_due(epoch_minute(due), {key}, now=due + timedelta(hours=1))
+        assert reminders.dispatcher.next_run(key) > due + timedelta(hours=1)
+        assert reminders.bot.sent == []
+
+        due = reminders.dispatcher.next_run(key)
+        await reminders._handle_due(epoch_minute(due), {key}, now=due + timedelta(seconds=5))
+        assert [chat_id for chat_id, _ in reminders.bot.sent] == [42]
+        reminders.scheduler.shutdown(wait=False)
+
+    asyncio.run(scenario())
+
+    metrics = reminders.metrics.snapshot()
+    assert (metrics["fires"], metrics["misfires"]) == (1, 1)
+    assert metrics["outcomes"] == {"sent": 1}
+    assert metrics["duration_s"]["count"] == 1
+
+
+def test_idle_users_move_to_sparse_tiers_and_come_back_on_interaction(engine, settings) -> None:
+    settings = settings.model_copy(update={"reminder_dispatcher": "wheel", "reminder_dormant_after_days": 3})
+    day = 86400
+
+    async def first_run() -> None:
+        service = HydrationService(engine, settings)
+        for user_id in (1, 2, 3, 4):
+            await service.ensure_user(user_id)
+        with Session(engine) as session:
+            for user_id, idle_days in ((1, 1), (2, 10), (3, 60), (4, 60)):
+                session.execute(
+                    update(User).where(User.telegram_id == user_id).values(last_active_at=epoch_now() - idle_days * day)
+                )
+            session.commit()
+        reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+        assert await reminders.schedule_for_all_users() == 4
+
+    async def second_run() -> ReminderScheduler:
+        service = HydrationService(engine, settings)
+        reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+        assert await reminders.restore() == 4
+        assert [reminders.tier_of(user_id) for user_id in (1, 2, 3)] == [
+            ActivityTier.ACTIVE,
+            ActivityTier.DORMANT,
+            ActivityTier.INACTIVE,
+        ]
+        tz = ZoneInfo(settings.timezone)
+        dormant = reminders.next_run(2)
+        assert dormant.time() == time(settings.hydration_start_hour)
+        assert reminders.next_run(2, dormant + timedelta(minutes=1)) - dormant == timedelta(days=1)
+        inactive = reminders.next_run(3, datetime.now(tz))
+        assert reminders.next_run(3, inactive + timedelta(minutes=1)) - inactive == timedelta(days=7)
+        # Inactive users are spread over the week by id.
+        assert reminders.next_run(4).date() != inactive.date()
+
+        update_ = Update(
+            update_id=1,
+            message=Message(
+                message_id=1,
+                date=datetime.now(tz),
+                chat=Chat(id=2, type="private"),
+                from_user=TelegramUser(id=2, is_bot=False, first_name="Léa"),
+                text="coucou",
+            ),
+        )
+        await create_dispatcher(service, reminders).feed_update(Bot("42:TEST", session=SilentSession()), update_)
+        assert reminders.tier_of(2) is ActivityTier.ACTIVE
+        assert (await service.get_users_many([2]))[2].last_active_at >= epoch_now() - 5
+        return reminders
+
+    asyncio.run(first_run())
+    reminders = asyncio.run(second_run())
+
+    assert reminders.stats()["tier_active"] == 2
+    assert reminders.stats()["tier_dormant"] == 0
+    assert reminders.stats()["tier_inactive"] == 2
+    assert reminders.next_run(2, datetime.now(ZoneInfo(settings.timezone))) is not None
+
+
+def test_nightly_retier_only_reads_users_who_crossed_a_threshold(engine, settings) -> None:
+    settings = settings.model_copy(update={"reminder_dispatcher": "wheel", "reminder_dormant_after_days": 3})
+    day = 86400
+    now = epoch_now()
+    service = HydrationService(engine, settings)
+    reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+    # Idle days at the previous pass, a day ago: 2.5 and 44.5 cross a threshold since, 9 and 1 do not.
+    idle = {1: 3.5 * day, 2: 10 * day, 3: 45.5 * day, 4: 2 * day}
+
+    async def scenario() -> list:
+        for user_id in (1, 2, 3, 4, 5):
+            await service.ensure_user(user_id)
+        with Session(engine) as session:
+            for user_id, seconds in idle.items():
+                session.execute(update(User).where(User.telegram_id == user_id).values(last_active_at=now - int(seconds)))
+            # Never stamped: tiered on its signup date.
+            session.execute(
+                update(User).where(User.telegram_id == 5).values(created_at=datetime.fromtimestamp(now - 3.5 * day, timezone.utc))
+            )
+            session.commit()
+        await service.set_app_state(ReminderScheduler.RETIER_STATE_KEY, str(now - day))
+        service.user_cache.clear()
+        assert await reminders.retier() == 3
+        return await service.list_reminder_schedules()
+
+    schedules = asyncio.run(scenario())
+
+    assert {row.user_id: row.tier for row in schedules} == {1: "dormant", 3: "inactive", 5: "dormant"}
+    assert int(asyncio.run(service.get_app_state(ReminderScheduler.RETIER_STATE_KEY))) >= now
+
+
+def test_suspending_users_without_a_schedule_row_keeps_the_others(engine, settings) -> None:
+    service = HydrationService(engine, settings)
+    reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+
+    async def scenario() -> dict[int, int | None]:
+        await reminders.schedule_for_user(1)
+        # User 2 is attached in memory while its row is still being written by the backfill.
+        await service.ensure_user(2)
+        assert reminders._assign(await service.ensure_user(2), bulk=True) is not None
+        await reminders.suspend_for_today(1, 2)
+        return {row.user_id: row.suspended_until for row in await service.list_reminder_schedules()}
+
+    persisted = asyncio.run(scenario())
+
+    assert list(persisted) == [1]
+    assert persisted[1] == int(reminders._suspended_until[1].timestamp())
+    assert reminders._is_suspended(2, datetime.now(ZoneInfo(settings.timezone)))
+
+
+def test_changed_schedule_settings_reschedule_everyone_once_after_restore(engine, settings) -> None:
+    settings = settings.model_copy(update={"reminder_dispatcher": "wheel"})
+    spread = settings.model_copy(update={"reminder_spread_fraction": 0.5})
+
+    async def run(current) -> tuple[int, ReminderScheduler]:
+        service = HydrationService(engine, current)
+        reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, current)
+        await reminders.restore()
+        return await reminders.reconcile(page_size=2), reminders
+
+    async def scenario() -> list[int]:
+        service = HydrationService(engine, settings)
+        for user_id in range(1, 6):
+            await service.ensure_user(user_id)
+        first, _ = await run(settings)
+        again, _ = await run(settings)
+        changed, reminders = await run(spread)
+        assert {row.user_id: row.offset_minutes for row in await service.list_reminder_schedules()} == {
+            user_id: reminders._offset(user_id, reminders._membership[user_id].profile) for user_id in range(1, 6)
+        }
+        settled, _ = await run(spread)
+        return [first, again, changed, settled, reminders.stats()["reschedules"]]
+
+    # Fresh database: full pass. Same settings: nothing to do. Spread changed: full pass again.
+    assert asyncio.run(scenario()) == [5, 0, 5, 0, 5]
+
+
+def test_turning_tiering_off_restores_full_schedules(engine, settings) -> None:
+    settings = settings.model_copy(update={"reminder_dispatcher": "wheel"})
+    tiered = settings.model_copy(update={"reminder_dormant_after_days": 3})
+
+    async def run(current) -> ReminderScheduler:
+        service = HydrationService(engine, current)
+        reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, current)
+        await reminders.restore()
+        await reminders.reconcile()
+        return reminders
+
+    async def scenario() -> list:
+        service = HydrationService(engine, settings)
+        await service.ensure_user(1)
+        with Session(engine) as session:
+            session.execute(update(User).values(last_active_at=epoch_now() - 10 * 86400))
+            session.commit()
+        before = (await run(tiered)).tier_of(1)
+        reminders = await run(settings)
+        (row,) = await service.list_reminder_schedules()
+        return [before, reminders.tier_of(1), row.tier]
+
+    assert asyncio.run(scenario()) == [ActivityTier.DORMANT, ActivityTier.ACTIVE, None]
@@ -0,0 +1,51 @@
+import asyncio
+from datetime import date, datetime, time
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import event
+
+import oazis.bot  # noqa: F401 - oazis.scheduler must be imported through oazis.bot
+from oazis.scheduler.jobs import send_hydration_reminders_for_slot
+from oazis.services.hydration import HydrationService
+
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.sent: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> None:
+        self.sent.append((chat_id, text))
+
+
+def test_slot_decides_in_memory_with_set_based_reads(engine, settings) -> None:
+    service = HydrationService(engine, settings)
+    bot = FakeBot()
+    noon = datetime.combine(date.today(), time(12), tzinfo=ZoneInfo(settings.timezone))
+    selects: list[str] = []
+
+    def count_selects(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    async def scenario():
+        for user_id in (1, 2, 3, 4):
+            await service.ensure_user(user_id)
+        await service.pause_reminders_today(2)
+        for user_id in (3, 4):
+            await service.record_glass(user_id, volume_ml=5000)
+        await service.record_goal_notified(4)
+
+        event.listen(engine, "before_cursor_execute", count_selects)
+        try:
+            return await send_hydration_reminders_for_slot(bot, service, settings, [1, 2, 3, 4, 99], now=noon)
+        finally:
+            event.remove(engine, "before_cursor_execute", count_selects)
+
+    outcomes = asyncio.run(scenario())
+
+    assert outcomes == {"sent": 1, "goal": 1, "skipped_paused": 1, "skipped_goal": 1}
+    assert sorted(chat_id for chat_id, _ in bot.sent) == [1, 3]
+    assert "Objectif atteint" in dict(bot.sent)[3]
+    # Unknown user lookup, today's entries and day flags: one query each for the whole slot.
+    assert len(selects) == 3
+    assert asyncio.run(service.has_goal_been_notified(3))
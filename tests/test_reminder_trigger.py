@@ -0,0 +1,77 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import oazis.bot  # noqa: F401 - oazis.scheduler must be imported through oazis.bot
+from oazis.scheduler.triggers import ReminderWindowTrigger, compute_next_aligned_run, spread_offset_minutes
+
+PARIS = ZoneInfo("Europe/Paris")
+
+
+def _fire_times(trigger: ReminderWindowTrigger, now: datetime, count: int) -> list[datetime]:
+    times = []
+    previous = None
+    for _ in range(count):
+        previous = trigger.get_next_fire_time(previous, now)
+        times.append(previous)
+        now = previous
+    return times
+
+
+def test_trigger_jumps_from_last_slot_to_next_window() -> None:
+    trigger = ReminderWindowTrigger(9, 21, 90, "Europe/Paris")
+    fires = _fire_times(trigger, datetime(2025, 6, 2, 19, 30, tzinfo=PARIS), 3)
+
+    assert [fire.strftime("%d %H:%M") for fire in fires] == ["02 19:30", "03 09:00", "03 10:30"]
+
+
+def test_trigger_never_returns_a_past_slot() -> None:
+    trigger = ReminderWindowTrigger(9, 21, 90, "Europe/Paris")
+    fire = trigger.get_next_fire_time(None, datetime(2025, 6, 2, 10, 30, 15, tzinfo=PARIS))
+
+    assert fire == datetime(2025, 6, 2, 12, 0, tzinfo=PARIS)
+
+
+def test_trigger_follows_dst_change() -> None:
+    trigger = ReminderWindowTrigger(9, 21, 90, "Europe/Paris")
+    # Paris switches to summer time during the night of 29-30 March 2025.
+    fires = _fire_times(trigger, datetime(2025, 3, 29, 19, 30, tzinfo=PARIS), 2)
+
+    assert fires[1].utcoffset() == timedelta(hours=2)
+    assert (fires[1].hour, fires[1].minute) == (9, 0)
+
+
+def test_next_run_converts_now_into_user_timezone() -> None:
+    # 06:30 UTC is 08:30 in Paris during summer time: the first slot is 09:00 local.
+    now = datetime(2025, 6, 2, 6, 30, tzinfo=timezone.utc)
+    assert compute_next_aligned_run(9, 21, 90, "Europe/Paris", now=now) == datetime(2025, 6, 2, 9, 0, tzinfo=PARIS)
+
+
+def test_spread_offset_is_stable_bounded_and_flat() -> None:
+    offsets = [spread_offset_minutes(user_id, 90, 0.5) for user_id in range(100_000)]
+
+    assert offsets[:100] == [spread_offset_minutes(user_id, 90, 0.5) for user_id in range(100)]
+    assert min(offsets) == 0 and max(offsets) == 45
+    per_minute = Counter(offsets)
+    assert max(per_minute.values()) < 1.2 * len(offsets) / 46
+    assert spread_offset_minutes(12345, 90, 0.0) == 0
+
+
+def test_offset_shifts_the_grid_inside_the_window() -> None:
+    trigger = ReminderWindowTrigger(9, 21, 90, "Europe/Paris", offset_minutes=20)
+    fires = _fire_times(trigger, datetime(2025, 6, 2, 8, 0, tzinfo=PARIS), 10)
+
+    assert [fire.strftime("%d %H:%M") for fire in fires[:2]] == ["02 09:20", "02 10:50"]
+    assert fires[7].strftime("%d %H:%M") == "02 19:50"
+    assert fires[8].strftime("%d %H:%M") == "03 09:20"
+    # Offsets never push the first slot past a short window's end.
+    assert compute_next_aligned_run(9, 10, 90, "Europe/Paris", now=fires[0], offset_minutes=80).hour == 9
+
+
+def test_sparse_trigger_fires_once_on_its_days_only() -> None:
+    trigger = ReminderWindowTrigger(9, 21, 12 * 60, "Europe/Paris", every_days=7, day_phase=3)
+    fires = _fire_times(trigger, datetime(2025, 6, 2, 12, 0, tzinfo=PARIS), 3)
+
+    assert [fire.time() for fire in fires] == [datetime(2025, 1, 1, 9).time()] * 3
+    assert [fire.date().toordinal() % 7 for fire in fires] == [3, 3, 3]
+    assert [(later - earlier).days for earlier, later in zip(fires, fires[1:])] == [7, 7]
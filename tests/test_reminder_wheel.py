@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+import oazis.bot  # noqa: F401 - oazis.scheduler must be imported through oazis.bot
+from oazis.scheduler.wheel import ReminderDispatcher, TimingWheel, epoch_minute
+
+
+def test_wheel_pops_due_buckets_in_order() -> None:
+    wheel = TimingWheel()
+    wheel.schedule(1, 100)
+    wheel.schedule(2, 100)
+    wheel.schedule(3, 101)
+    wheel.schedule(4, 105)
+
+    assert wheel.pop_due(99) == []
+    assert wheel.pop_due(101) == [(100, {1, 2}), (101, {3})]
+    assert len(wheel) == 1 and 4 in wheel
+
+
+def test_wheel_reschedule_and_cancel() -> None:
+    wheel = TimingWheel()
+    wheel.schedule(1, 100)
+    wheel.schedule(1, 110)
+    wheel.schedule(2, 100)
+    assert wheel.cancel(2)
+    assert not wheel.cancel(2)
+
+    assert wheel.pop_due(105) == []
+    assert wheel.bucket_count == 1
+    # Re-using a minute whose bucket was emptied must not fire twice.
+    wheel.schedule(3, 100)
+    assert wheel.pop_due(110) == [(100, {3}), (110, {1})]
+    assert len(wheel) == 0
+
+
+def test_dispatcher_tick_hands_over_due_users() -> None:
+    now = datetime(2025, 3, 1, 9, 0, tzinfo=timezone.utc)
+    fired: list[tuple[int, set[int]]] = []
+
+    async def handle_due(minute: int, user_ids: set[int]) -> None:
+        fired.append((minute, user_ids))
+
+    dispatcher = ReminderDispatcher(AsyncIOScheduler(timezone="UTC"), handle_due)
+    dispatcher.schedule(1, now)
+    dispatcher.schedule(2, now + timedelta(seconds=30))
+    dispatcher.schedule(3, now + timedelta(minutes=1))
+
+    asyncio.run(dispatcher.tick(now + timedelta(seconds=59)))
+
+    assert fired == [(epoch_minute(now), {1, 2})]
+    assert dispatcher.next_run(3) == now + timedelta(minutes=1)
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from oazis.config import Settings
+from oazis.db.session import get_engine
+
+
+def test_file_engine_applies_the_pragma_profile(tmp_path: Path, settings) -> None:
+    settings = settings.model_copy(
+        update={"sqlite_busy_timeout_ms": 1234, "sqlite_pool_size": 3, "sqlite_synchronous": "FULL"}
+    )
+    engine = get_engine(f"sqlite:///{tmp_path / 'tuned.db'}", settings=settings)
+    try:
+        with engine.connect() as connection:
+            pragmas = {
+                name: connection.execute(text(f"PRAGMA {name}")).scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "temp_store")
+            }
+    finally:
+        engine.dispose()
+
+    # synchronous: 2 = FULL; temp_store: 2 = MEMORY.
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 2,
+        "busy_timeout": 1234,
+        "cache_size": -settings.sqlite_cache_size_kib,
+        "temp_store": 2,
+    }
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 3
+
+
+def test_untuned_engine_keeps_sqlite_defaults(tmp_path: Path, settings) -> None:
+    engine = get_engine(f"sqlite:///{tmp_path / 'plain.db'}", settings=settings.model_copy(update={"sqlite_tuning": False}))
+    try:
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+    finally:
+        engine.dispose()
+
+
+def test_pragma_values_are_validated_at_startup() -> None:
+    base = {"TELEGRAM_BOT_TOKEN": "123456:TEST", "_env_file": None}
+
+    assert Settings(**base, sqlite_journal_mode="wal").sqlite_journal_mode == "WAL"
+    with pytest.raises(ValidationError):
+        Settings(**base, sqlite_journal_mode="WAL; DROP TABLE user")
+    with pytest.raises(ValidationError):
+        Settings(**base, sqlite_synchronous="SOMETIMES")
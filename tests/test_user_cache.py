@@ -0,0 +1,85 @@
+from dataclasses import replace
+from datetime import datetime
+
+from oazis.services import UserSnapshot
+from oazis.services.user_cache import UserCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _snapshot(telegram_id: int, timezone: str = "Europe/Paris") -> UserSnapshot:
+    return UserSnapshot(
+        telegram_id=telegram_id,
+        role="user",
+        timezone=timezone,
+        daily_target_ml=2000,
+        daily_target_glasses=8,
+        reminder_start_hour=9,
+        reminder_end_hour=21,
+        reminder_interval_minutes=90,
+        created_at=datetime(2025, 1, 1),
+    )
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = UserCache(max_size=2, ttl_seconds=60, clock=FakeClock())
+    cache.put(_snapshot(1))
+    cache.put(_snapshot(2))
+    assert cache.get(1) is not None  # 2 is now the least recently used.
+    cache.put(_snapshot(3))
+
+    assert cache.get(2) is None
+    assert [user_id for user_id in (1, 3) if cache.get(user_id) is not None] == [1, 3]
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_their_ttl() -> None:
+    clock = FakeClock()
+    cache = UserCache(max_size=10, ttl_seconds=60, clock=clock)
+    cache.put(_snapshot(1))
+
+    clock.now = 59.9
+    assert 1 in cache and cache.get(1) is not None
+    clock.now = 60
+    assert 1 not in cache
+    assert cache.get(1) is None
+    assert len(cache) == 0
+
+
+def test_loader_does_not_overwrite_a_fresher_snapshot() -> None:
+    clock = FakeClock()
+    cache = UserCache(max_size=10, ttl_seconds=60, clock=clock)
+    fresh = _snapshot(1, timezone="America/Montreal")
+    cache.put(fresh)
+
+    cache.put(_snapshot(1), replace=False)
+    assert cache.get(1) == fresh
+
+    # Once the fresh entry has expired, a loader fills the slot again.
+    clock.now = 61
+    cache.put(_snapshot(1), replace=False)
+    assert cache.get(1).timezone == "Europe/Paris"
+
+    cache.put(replace(fresh, daily_target_ml=1500))
+    assert cache.get(1).daily_target_ml == 1500
+
+
+def test_hit_and_miss_counters() -> None:
+    clock = FakeClock()
+    cache = UserCache(max_size=10, ttl_seconds=60, clock=clock)
+    assert cache.get(1) is None
+    cache.put(_snapshot(1))
+    cache.get(1)
+    cache.get(1)
+    clock.now = 120
+    cache.get(1)
+    # Membership tests do not count.
+    assert 1 not in cache
+
+    assert cache.stats() == {"size": 0, "hits": 2, "misses": 2}
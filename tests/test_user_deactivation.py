@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message, Update, User
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from oazis.bot import OutboundSender, create_dispatcher
+from oazis.scheduler import ReminderScheduler
+from oazis.scheduler.wheel import epoch_minute
+from oazis.services.hydration import HydrationService
+
+
+class FakeSession(BaseSession):
+    """Fake Telegram API where the chats in `blocked` have blocked the bot."""
+
+    def __init__(self, blocked: set[int]) -> None:
+        super().__init__()
+        self.blocked = blocked
+        self.sent: list[int] = []
+
+    async def make_request(self, bot, method, timeout=None):
+        if not isinstance(method, SendMessage):
+            return True
+        if method.chat_id in self.blocked:
+            raise TelegramForbiddenError(method, "Forbidden: bot was blocked by the user")
+        self.sent.append(method.chat_id)
+        return Message(message_id=1, date=0, chat=Chat(id=method.chat_id, type="private"), text=method.text)
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+
+def test_blocked_users_are_unscheduled_and_come_back_on_their_next_update(engine, settings) -> None:
+    settings = settings.model_copy(
+        update={"reminder_dispatcher": "wheel", "hydration_start_hour": 0, "hydration_end_hour": 24}
+    )
+    service = HydrationService(engine, settings)
+    session = FakeSession(blocked={2})
+    sender = OutboundSender()
+    bot = Bot("42:TEST", session=session)
+    bot.session.middleware(sender)
+    reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), bot, service, settings)
+    sender.on_chat_unreachable = reminders.deactivate_user
+
+    async def scenario() -> None:
+        for user_id in (1, 2):
+            await reminders.schedule_for_user(user_id)
+        key = reminders._membership[1].key
+        due = reminders.dispatcher.next_run(key)
+        await reminders._handle_due(epoch_minute(due), {key}, now=due)
+
+        assert reminders.metrics.outcomes == {"sent": 1, "blocked": 1}
+        assert reminders.next_run(2) is None
+        assert [user.telegram_id for user in await service.list_users()] == [1]
+        assert await service.list_unscheduled_users() == []
+        assert [row.user_id for row in await service.list_reminder_schedules()] == [1]
+
+        session.blocked.clear()
+        update = Update(
+            update_id=1,
+            message=Message(
+                message_id=5,
+                date=datetime.now(timezone.utc) - timedelta(seconds=1),
+                chat=Chat(id=2, type="private"),
+                from_user=User(id=2, is_bot=False, first_name="Léa"),
+                text="coucou",
+            ),
+        )
+        await create_dispatcher(service, reminders).feed_update(bot, update)
+
+        assert reminders.next_run(2) is not None
+        assert len(await service.list_users()) == 2
+
+    asyncio.run(scenario())
+
+    assert reminders.stats()["deactivated"] == 1
+    assert sender.stats()["unreachable"] == 1
+
+
+def test_only_private_chats_report_an_unreachable_user() -> None:
+    session = FakeSession(blocked={-100123, 7})
+    sender = OutboundSender()
+    bot = Bot("42:TEST", session=session)
+    bot.session.middleware(sender)
+    reported: list[int] = []
+
+    async def on_chat_unreachable(chat_id: int) -> None:
+        reported.append(chat_id)
+
+    sender.on_chat_unreachable = on_chat_unreachable
+
+    async def scenario() -> None:
+        for chat_id in (-100123, 7):
+            try:
+                await bot.send_message(chat_id, "coucou")
+            except TelegramForbiddenError:
+                pass
+
+    asyncio.run(scenario())
+
+    assert reported == [7]
+    assert sender.stats()["unreachable"] == 2
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message, Update, User
+from aiohttp.test_utils import TestClient, TestServer
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from pydantic import SecretStr, ValidationError
+
+from oazis.bot import create_dispatcher
+from oazis.bot.webhook import create_webhook_app
+from oazis.config import Settings
+from oazis.scheduler import ReminderScheduler
+from oazis.services.hydration import HydrationService
+
+SECRET = "s3cret-token_42"
+
+
+class RecordingSession(BaseSession):
+    """Fake Telegram API recording the chats the bot answered."""
+
+    def __init__(self, expected: int) -> None:
+        super().__init__()
+        self.answered: list[int] = []
+        self.expected = expected
+        self.done = asyncio.Event()
+        self.closed = False
+
+    async def make_request(self, bot, method, timeout=None):
+        if not isinstance(method, SendMessage):
+            return True
+        self.answered.append(method.chat_id)
+        if len(self.answered) >= self.expected:
+            self.done.set()
+        return Message(message_id=1, date=0, chat=Chat(id=method.chat_id, type="private"), text=method.text)
+
+    async def close(self) -> None:
+        self.closed = True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+
+def _drink_update(update_id: int, user_id: int) -> str:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=user_id, type="private"),
+            from_user=User(id=user_id, is_bot=False, first_name="Léa"),
+            text="/drink",
+        ),
+    ).model_dump_json(exclude_none=True)
+
+
+def test_webhook_handles_posted_updates_and_rejects_a_wrong_secret(engine, settings) -> None:
+    settings = settings.model_copy(
+        update={"bot_mode": "webhook", "webhook_url": "https://bot.example.com", "webhook_secret": SecretStr(SECRET)}
+    )
+    service = HydrationService(engine, settings)
+    reminders = ReminderScheduler(AsyncIOScheduler(timezone="UTC"), None, service, settings)
+    session = RecordingSession(expected=3)
+    bot = Bot("42:TEST", session=session)
+    app = create_webhook_app(create_dispatcher(service, reminders), bot, settings)
+
+    async def scenario() -> None:
+        async with TestClient(TestServer(app)) as client:
+            forged = await client.post(
+                settings.webhook_path,
+                data=_drink_update(1, 99),
+                headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": "wrong"},
+            )
+            assert forged.status == 401
+            for update_id, user_id in enumerate((1, 2, 3), start=2):
+                response = await client.post(
+                    settings.webhook_path,
+                    data=_drink_update(update_id, user_id),
+                    headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": SECRET},
+                )
+                assert response.status == 200
+            await asyncio.wait_for(session.done.wait(), timeout=5)
+
+        entries = await service.get_today_entries_many([1, 2, 3, 99])
+        assert {user_id: entry.consumed_ml for user_id, entry in entries.items()} == {
+            user_id: settings.glass_volume_ml for user_id in (1, 2, 3)
+        }
+
+    asyncio.run(scenario())
+
+    assert sorted(session.answered) == [1, 2, 3]
+    # The outbox worker may still be sending: closing the session is left to main.
+    assert not session.closed
+
+
+def test_webhook_mode_requires_a_url_and_a_valid_secret() -> None:
+    base = {"TELEGRAM_BOT_TOKEN": "123456:TEST", "_env_file": None, "bot_mode": "webhook"}
+
+    with pytest.raises(ValidationError, match="WEBHOOK_URL"):
+        Settings(**base, webhook_secret=SECRET)
+    with pytest.raises(ValidationError, match="WEBHOOK_SECRET"):
+        Settings(**base, webhook_url="https://bot.example.com", webhook_secret="not allowed!")
+    assert Settings(**base, webhook_url="https://bot.example.com", webhook_secret=SECRET).webhook_port == 8080
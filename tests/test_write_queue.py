@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from oazis.services.hydration import HydrationService
+from oazis.services.write_queue import WriteQueue
+
+
+class Ledger:
+    """Stand-in for a database: `run` applies operations to a dict and counts transactions."""
+
+    def __init__(self) -> None:
+        self.totals: dict[int, int] = {}
+        self.transactions = 0
+
+    async def run(self, operation, *args):
+        self.transactions += 1
+        staged = dict(self.totals)
+        result = operation(staged, *args)
+        self.totals = staged  # Committed only if every operation succeeded.
+        return result
+
+
+def add(totals: dict[int, int], user_id: int, volume_ml: int) -> int:
+    if volume_ml < 0:
+        raise ValueError("negative volume")
+    totals[user_id] = totals.get(user_id, 0) + volume_ml
+    return totals[user_id]
+
+
+def test_batch_returns_running_totals_in_one_transaction() -> None:
+    ledger = Ledger()
+    queue = WriteQueue(ledger.run, max_batch=10, flush_interval=0.01)
+
+    async def scenario() -> list[int]:
+        return await asyncio.gather(*(queue.submit(add, 1, 250) for _ in range(4)), queue.submit(add, 2, 100))
+
+    assert asyncio.run(scenario()) == [250, 500, 750, 1000, 100]
+    assert ledger.transactions == 1
+    assert (queue.batches_flushed, queue.writes_flushed) == (1, 5)
+
+
+def test_failed_batch_is_retried_write_by_write() -> None:
+    ledger = Ledger()
+    queue = WriteQueue(ledger.run, max_batch=10, flush_interval=0.01)
+
+    async def scenario() -> list:
+        return await asyncio.gather(
+            queue.submit(add, 1, 250), queue.submit(add, 1, -1), queue.submit(add, 2, 100), return_exceptions=True
+        )
+
+    first, failed, third = asyncio.run(scenario())
+
+    assert (first, third) == (250, 100)
+    assert isinstance(failed, ValueError)
+    assert ledger.totals == {1: 250, 2: 100}
+    # One failed shared transaction, then one per write.
+    assert ledger.transactions == 4
+
+
+def test_close_flushes_queued_writes_and_later_writes_run_directly() -> None:
+    ledger = Ledger()
+    queue = WriteQueue(ledger.run, max_batch=100, flush_interval=60)
+
+    async def scenario() -> int:
+        pending = [asyncio.create_task(queue.submit(add, 1, 250)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert queue.depth == 3
+        await queue.close()
+        assert [task.result() for task in pending] == [250, 500, 750]
+        return await queue.submit(add, 1, 250)
+
+    assert asyncio.run(scenario()) == 1000
+    assert ledger.transactions == 2
+
+
+@pytest.mark.parametrize("write_queue_enabled", [False, True])
+def test_service_glasses_share_batches_and_keep_totals(engine, settings, write_queue_enabled) -> None:
+    settings = settings.model_copy(update={"write_queue_enabled": write_queue_enabled})
+    service = HydrationService(engine, settings)
+
+    async def scenario() -> list[int]:
+        entries = await asyncio.gather(*(service.record_glass(user_id % 3, volume_ml=100) for user_id in range(30)))
+        await service.close()
+        return [entry.consumed_ml for entry in entries]
+
+    totals = asyncio.run(scenario())
+
+    for user_id in range(3):
+        assert sorted(totals[user_id::3]) == [100 * n for n in range(1, 11)]